@@ -0,0 +1,247 @@
+""" Замеры скорости и памяти этапов проверки на синтетическом коде C# """
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from benchmarks.corpus import CorpusGenerator
+from linter.tokenizer import Tokenizer
+from linter.settings import Settings
+from linter.errors_checker import ErrorsChecker
+from linter.code_analyzer import CodeAnalyzer
+from linter.project_index import ProjectIndex
+from linter.stylecheck import Stylecheck
+from linter.style_profile import StyleProfile
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_STYLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir, 'default.style')
+
+
+class Benchmark:
+    """Замеры этапов проверки на коде из CorpusGenerator для каждого размера из sizes (в строках)
+
+    Каждый этап (токенизация, каждая настройка Settings, ErrorsChecker, каждый анализ CodeAnalyzer и проверка
+    целиком) замеряется отдельно: строки файла строятся заново перед каждым повтором, поэтому индексы, которые
+    хранятся вместе со строками (BracketIndex, StatementIndex, CodeModel), и кэш анализа функций не переходят из
+    одного замера в другой. Время - лучшее из repeat повторов, память - наибольший объём, выделенный за один
+    запуск (tracemalloc, отдельным запуском, чтобы не замедлять замер времени)"""
+    # рост времени с размером: показатель степени n^k, при котором замер считается ухудшением
+    EXPONENT_TOLERANCE = 0.3
+    # замеры короче этого времени слишком неточны для сравнения
+    MIN_SECONDS = 0.001
+
+    def __init__(self, generator, sizes, style=DEFAULT_STYLE, repeat=3, memory=True):
+        self.generator = generator
+        self.sizes = sorted(sizes)
+        self.profile = StyleProfile.of(style)
+        self.repeat = repeat
+        self.memory = memory
+        self.tokenizer = Tokenizer()
+
+    def phases(self):
+        """Пары (имя этапа, функция от кода и строк)"""
+        settings = Settings()
+        phases = [('tokenizer.get_tokens', lambda code, lines, index: self.tokenizer.get_tokens(code)),
+                  ('tokenizer.get_lines', lambda code, lines, index: self.tokenizer.get_lines(code))]
+        for name, value in self.profile.properties.items():
+            phases.append((f'settings.{name}', self._setting(settings, name, Settings.get_arguments(value))))
+        phases += [
+            ('errors_checker', lambda code, lines, index: ErrorsChecker.checking_for_errors(lines)),
+            ('code_analyzer.find_unused_objects',
+             lambda code, lines, index: CodeAnalyzer.find_unused_objects(lines)),
+            ('code_analyzer.find_unreachable_methods',
+             lambda code, lines, index: CodeAnalyzer.find_unreachable_methods(lines, index)),
+            ('code_analyzer.get_cyclomatic_complexity_by_function',
+             lambda code, lines, index: CodeAnalyzer.get_cyclomatic_complexity_by_function(lines)),
+            ('stylecheck.check', lambda code, lines, index: Stylecheck().check(lines, self.profile)),
+        ]
+        return phases
+
+    @staticmethod
+    def _setting(settings, name, args):
+        function = getattr(settings, name)
+        return lambda code, lines, index: function(*args, lines)
+
+    def run(self, only=None):
+        """{этап: {'sizes': {размер: замер}, 'exponent': рост времени}}. Замер - seconds, lines_per_second,
+        megabytes_per_second и peak_kb (если замерялась память). only - имена этапов (или их начала)"""
+        results = {}
+        phases = [(name, function) for name, function in self.phases()
+                  if not only or any(name.startswith(prefix) for prefix in only)]
+        for size in self.sizes:
+            code = self.generator.generate(size)
+            line_count = code.count('\n')
+            index = ProjectIndex()
+            index.update_file('Benchmark.cs', code)
+            for name, function in phases:
+                seconds = min(self._measure(function, code, index) for _ in range(self.repeat))
+                measurement = {'lines': line_count,
+                               'seconds': round(seconds, 6),
+                               'lines_per_second': round(line_count / seconds) if seconds else None,
+                               'megabytes_per_second': round(len(code) / seconds / 1e6, 3) if seconds else None}
+                if self.memory:
+                    measurement['peak_kb'] = self._peak_memory(function, code, index)
+                results.setdefault(name, {'sizes': {}})['sizes'][str(size)] = measurement
+        for result in results.values():
+            result['exponent'] = self.exponent(result['sizes'])
+        return results
+
+    def _measure(self, function, code, index):
+        lines = self.tokenizer.get_lines(code)
+        CodeAnalyzer.function_cache.clear()
+        begin = time.perf_counter()
+        function(code, lines, index)
+        return time.perf_counter() - begin
+
+    def _peak_memory(self, function, code, index):
+        lines = self.tokenizer.get_lines(code)
+        CodeAnalyzer.function_cache.clear()
+        tracemalloc.start()
+        try:
+            function(code, lines, index)
+            return tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+
+    @staticmethod
+    def exponent(sizes):
+        """Показатель k в time ~ lines^k между наименьшим и наибольшим размером (1 - линейный рост)
+        или None, если размер один или замеры слишком короткие"""
+        measurements = sorted(sizes.values(), key=lambda measurement: measurement['lines'])
+        if len(measurements) < 2:
+            return None
+        small, large = measurements[0], measurements[-1]
+        if small['seconds'] < Benchmark.MIN_SECONDS or large['lines'] <= small['lines']:
+            return None
+        return round(math.log(large['seconds'] / small['seconds']) / math.log(large['lines'] / small['lines']), 3)
+
+    @staticmethod
+    def calibrate():
+        """Время (в секундах) эталонной работы на этой машине - чтобы сравнивать замеры разных машин"""
+        best = None
+        for _ in range(5):
+            begin = time.perf_counter()
+            values = {}
+            for i in range(200000):
+                values[i % 1000] = values.get(i % 1000, 0) + len(str(i))
+            elapsed = time.perf_counter() - begin
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    @staticmethod
+    def compare(report, baseline, tolerance):
+        """Ухудшения report по сравнению с baseline (списком строк); сравниваются только замеры на одинаковом коде
+        с одинаковыми настройками стиля. Время сравнивается с учётом скорости машин
+        (calibration); время и память - на наибольшем общем размере, ухудшение - больше чем в 1 + tolerance раз.
+        Рост времени с размером (exponent) ухудшается, если показатель вырос больше чем на EXPONENT_TOLERANCE"""
+        for key in ('corpus', 'style'):
+            if report[key] != baseline[key]:
+                return [f'the {key} differs from the baseline: {report[key]} != {baseline[key]}']
+        speed = report['calibration'] / baseline['calibration']
+        regressions = []
+        for name, result in report['phases'].items():
+            expected = baseline['phases'].get(name)
+            if expected is None:
+                continue
+            common = [size for size in result['sizes'] if size in expected['sizes']]
+            if common:
+                size = max(common, key=int)
+                now, before = result['sizes'][size], expected['sizes'][size]
+                if before['seconds'] >= Benchmark.MIN_SECONDS and \
+                        now['seconds'] > before['seconds'] * speed * (1 + tolerance):
+                    regressions.append(f'{name}: {now["seconds"]:.4f} s on {size} lines, '
+                                       f'baseline {before["seconds"] * speed:.4f} s')
+                if 'peak_kb' in now and 'peak_kb' in before and before['peak_kb'] > 0 and \
+                        now['peak_kb'] > before['peak_kb'] * (1 + tolerance):
+                    regressions.append(f'{name}: peak memory {now["peak_kb"]} KB on {size} lines, '
+                                       f'baseline {before["peak_kb"]} KB')
+            if result['exponent'] is not None and expected['exponent'] is not None and \
+                    result['exponent'] > expected['exponent'] + Benchmark.EXPONENT_TOLERANCE:
+                regressions.append(f'{name}: time grows as lines^{result["exponent"]}, '
+                                   f'baseline lines^{expected["exponent"]}')
+        return regressions
+
+
+def parse_args():
+    """Разбор аргументов запуска"""
+    parser = argparse.ArgumentParser(description='Benchmarks of the linter on generated C# code')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 20000],
+                        help='the sizes of the generated files in lines (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=4, help='the nesting depth of statements (default: 4)')
+    parser.add_argument('--bracket-density', type=float, default=0.3,
+                        help='the probability of one more level of brackets in an expression (default: 0.3)')
+    parser.add_argument('--strings', type=float, default=0.2,
+                        help='the share of operands that are string constants (default: 0.2)')
+    parser.add_argument('--comments', type=float, default=0.1,
+                        help='the share of lines with comments (default: 0.1)')
+    parser.add_argument('--unpaired', type=float, default=0.0,
+                        help='the share of lines with an unpaired bracket (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the generator (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='repeats of each measurement, the best is taken')
+    parser.add_argument('--only', type=str, nargs='+', default=None,
+                        help='measure only these phases (names or their beginnings, for example "settings.")')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure the peak memory')
+    parser.add_argument('-c', '--config', type=str, default=DEFAULT_STYLE, help='the style settings file')
+    parser.add_argument('--baseline', type=str, default=BASELINE,
+                        help='the stored results to compare with (default: benchmarks/baseline.json)')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed slowdown or memory growth, 0.5 - 50%% (default: 0.5)')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--corpus', type=str, default=None, metavar='DIR',
+                        help='only write the generated files of the sizes into the folder DIR')
+    parser.add_argument('-o', '--output', type=str, default=None, help='also write the results as JSON here')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    generator = CorpusGenerator(args.seed, args.depth, args.bracket_density, args.strings, args.comments,
+                                args.unpaired)
+    if args.corpus is not None:
+        for size in args.sizes:
+            for path in generator.write(os.path.join(args.corpus, str(size)), 1, size):
+                print(path)
+        return 0
+
+    benchmark = Benchmark(generator, args.sizes, args.config, args.repeat, not args.no_memory)
+    report = {'corpus': generator.options(), 'style': benchmark.profile.digest,
+              'calibration': round(Benchmark.calibrate(), 6),
+              'phases': benchmark.run(args.only)}
+
+    largest = str(benchmark.sizes[-1])
+    print(f'{"phase":<55}{"seconds":>10}{"lines/s":>12}{"peak KB":>10}{"growth":>8}')
+    for name, result in report['phases'].items():
+        measurement = result['sizes'][largest]
+        print(f'{name:<55}{measurement["seconds"]:>10.4f}{measurement["lines_per_second"] or 0:>12}'
+              f'{measurement.get("peak_kb", ""):>10}{result["exponent"] if result["exponent"] is not None else "":>8}')
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f'\nThe baseline has been recorded into "{args.baseline}"')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'\nNo baseline "{args.baseline}" (run with --save to record it)')
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = Benchmark.compare(report, baseline, args.tolerance)
+    if regressions:
+        print('\nRegressions:')
+        print('\n'.join(regressions))
+        return 1
+    print('\nNo regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+""" Модуль с генератором синтетического кода C# для замеров """
+import os
+import random
+
+
+class CorpusGenerator:
+    """Синтетический код C# заданного размера
+
+    Код похож на обычный: пространство имён, классы, методы, которые вызывают друг друга, объявления, вызовы,
+    управляющие конструкции, строки и комментарии. Параметры:
+    depth - наибольшая вложенность управляющих конструкций в методе;
+    bracket_density - вероятность (0..1) ещё одного уровня скобок в выражении ((), [] и вызовы), от неё зависят
+    количество и вложенность скобок;
+    strings - доля выражений со строковыми константами (обычные, @"", $"" и многострочные);
+    comments - доля строк с комментариями (//, /* */ в одной и в нескольких строках, ///);
+    unpaired - доля операторов с лишней скобкой (чтобы замерять поиск непарных скобок в ErrorsChecker).
+    Один и тот же seed даёт один и тот же код"""
+    NAMES = ['count', 'index', 'total', 'value', 'result', 'items', 'buffer', 'offset', 'limit', 'name',
+             'position', 'length', 'sum', 'data', 'key']
+    TYPES = ['int', 'long', 'double', 'string', 'bool', 'var']
+    OPERATORS = [' + ', ' - ', ' * ', ' / ', ' % ', ' == ', ' != ', ' < ', ' >= ', ' && ', ' || ']
+    WORDS = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'value', 'file', 'line', 'error', 'state']
+    # наибольшая вложенность скобок в одном выражении
+    MAX_EXPRESSION_DEPTH = 8
+
+    def __init__(self, seed=0, depth=4, bracket_density=0.3, strings=0.2, comments=0.1, unpaired=0.0):
+        self.seed = seed
+        self.depth = depth
+        self.bracket_density = bracket_density
+        self.strings = strings
+        self.comments = comments
+        self.unpaired = unpaired
+
+    def options(self):
+        """Параметры генератора (для сравнения результатов замеров)"""
+        return {'seed': self.seed, 'depth': self.depth, 'bracket_density': self.bracket_density,
+                'strings': self.strings, 'comments': self.comments, 'unpaired': self.unpaired}
+
+    def generate(self, lines, seed=None):
+        """Код из примерно lines строк (не меньше lines, лишними могут быть только закрывающие строки)"""
+        self._random = random.Random(self.seed if seed is None else seed)
+        self._lines = ['using System;', 'using System.Collections.Generic;', '', 'namespace Benchmark', '{']
+        class_number = 0
+        while len(self._lines) < lines:
+            self._class(class_number, lines)
+            class_number += 1
+        self._lines.append('}')
+        return '\n'.join(self._lines) + '\n'
+
+    def write(self, directory, files, lines):
+        """Запись files файлов по lines строк в папку directory. Возвращает пути файлов"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for number in range(files):
+            path = os.path.join(directory, f'File{number}.cs')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.generate(lines, seed=self.seed * 1000003 + number))
+            paths.append(path)
+        return paths
+
+    def _class(self, number, lines):
+        r = self._random
+        if number > 0:
+            self._add(0, '')
+        self._comment(4)
+        self._add(4, f'public class Generated{number}')
+        self._add(4, '{')
+        methods = [f'Method{number}x{i}' for i in range(r.randint(2, 6))]
+        if number == 0:
+            methods[0] = 'Main'
+        for i, method in enumerate(methods):
+            if len(self._lines) >= lines and i > 0:
+                break
+            if i > 0:
+                self._add(0, '')
+            self._method(method, methods, lines)
+        self._add(4, '}')
+
+    def _method(self, name, methods, lines):
+        r = self._random
+        arguments = [f'{r.choice(self.TYPES[:-1])} {argument}' for argument in r.sample(self.NAMES, r.randint(0, 3))]
+        if name == 'Main':
+            arguments = ['string[] args']
+        returns = r.random() < 0.5 and name != 'Main'
+        if r.random() < self.comments:
+            self._add(8, '/// <summary>')
+            self._add(8, f'/// {" ".join(r.sample(self.WORDS, 4))}')
+            self._add(8, '/// </summary>')
+        self._add(8, f'static {"int" if returns else "void"} {name}({", ".join(arguments)})')
+        self._add(8, '{')
+        self._locals = [argument.split()[-1] for argument in arguments]
+        self._methods = methods
+        body_end = min(len(self._lines) + r.randint(10, 60), max(lines, len(self._lines) + 3))
+        while len(self._lines) < body_end:
+            self._statement(12, 0)
+        if returns:
+            self._add(0, '')
+            self._add(12, f'return {self._expression(0)};')
+        self._add(8, '}')
+
+    def _statement(self, indent, depth):
+        r = self._random
+        self._comment(indent)
+        choice = r.random()
+        if depth < self.depth and choice < 0.3:
+            self._control(indent, depth)
+        elif choice < 0.55 or not self._locals:
+            name = f'{r.choice(self.NAMES)}{len(self._lines)}'
+            self._add(indent, f'{r.choice(self.TYPES)} {name} = {self._expression(0)};')
+            self._locals.append(name)
+        elif choice < 0.75:
+            self._add(indent, f'{r.choice(self._locals)} = {self._expression(0)};')
+        else:
+            self._add(indent, f'{self._call(0)};')
+
+    def _control(self, indent, depth):
+        r = self._random
+        kind = r.choice(['if', 'for', 'foreach', 'while', 'switch', 'try'])
+        if kind == 'if':
+            self._add(indent, f'if ({self._expression(0)})')
+            self._block(indent, depth)
+            if r.random() < 0.4:
+                self._add(indent, 'else')
+                self._block(indent, depth)
+        elif kind == 'for':
+            counter = f'i{depth}'
+            self._add(indent, f'for (int {counter} = 0; {counter} < {self._expression(1)}; {counter}++)')
+            self._block(indent, depth, [counter])
+        elif kind == 'foreach':
+            item = f'item{depth}'
+            self._add(indent, f'foreach (var {item} in {r.choice(self._locals or self.NAMES)})')
+            self._block(indent, depth, [item])
+        elif kind == 'while':
+            self._add(indent, f'while ({self._expression(0)})')
+            self._block(indent, depth)
+        elif kind == 'switch':
+            self._add(indent, f'switch ({self._expression(1)})')
+            self._add(indent, '{')
+            for case in range(r.randint(1, 3)):
+                self._add(indent + 4, f'case {case}:')
+                self._statement(indent + 8, depth + 1)
+                self._add(indent + 8, 'break;')
+            self._add(indent + 4, 'default:')
+            self._add(indent + 8, 'break;')
+            self._add(indent, '}')
+        else:
+            self._add(indent, 'try')
+            self._block(indent, depth)
+            self._add(indent, 'catch (Exception error)')
+            self._block(indent, depth, ['error'])
+
+    def _block(self, indent, depth, names=()):
+        scope = len(self._locals)
+        self._locals.extend(names)
+        self._add(indent, '{')
+        for _ in range(self._random.randint(1, 4)):
+            self._statement(indent + 4, depth + 1)
+        self._add(indent, '}')
+        # переменные блока снаружи не видны
+        del self._locals[scope:]
+
+    def _expression(self, depth):
+        r = self._random
+        if depth < self.MAX_EXPRESSION_DEPTH and r.random() < self.bracket_density:
+            choice = r.random()
+            if choice < 0.4:
+                return f'({self._expression(depth + 1)}){r.choice(self.OPERATORS)}{self._operand()}'
+            if choice < 0.7:
+                return self._call(depth + 1)
+            return f'{r.choice(self._locals or self.NAMES)}[{self._expression(depth + 1)}]'
+        if r.random() < 0.5:
+            return self._operand()
+        return f'{self._operand()}{r.choice(self.OPERATORS)}{self._operand()}'
+
+    def _call(self, depth):
+        r = self._random
+        arguments = ', '.join(self._expression(depth + 1) for _ in range(r.randint(0, 3)))
+        return f'{r.choice(self._methods)}({arguments})'
+
+    def _operand(self):
+        r = self._random
+        if r.random() < self.strings:
+            return self._string()
+        if self._locals and r.random() < 0.7:
+            return r.choice(self._locals)
+        return str(r.randint(0, 1000))
+
+    def _string(self):
+        r = self._random
+        words = ' '.join(r.sample(self.WORDS, r.randint(1, 4)))
+        choice = r.random()
+        if choice < 0.5:
+            return f'"{words} \\"{r.choice(self.WORDS)}\\""'
+        if choice < 0.7:
+            return f'@"{words} ""quoted"""'
+        if choice < 0.85 and self._locals:
+            return f'$"{words} {{{r.choice(self._locals)}}}"'
+        if choice < 0.95:
+            return f"'{r.choice('abcxyz')}'"
+        # многострочная строка: продолжение попадает в следующую строку файла
+        return f'@"{words}\n{" ".join(r.sample(self.WORDS, 2))}"'
+
+    def _comment(self, indent):
+        r = self._random
+        if r.random() >= self.comments:
+            return
+        words = ' '.join(r.sample(self.WORDS, r.randint(2, 6)))
+        choice = r.random()
+        if choice < 0.6:
+            self._add(indent, f'// {words}')
+        elif choice < 0.8:
+            self._add(indent, f'/* {words} */')
+        else:
+            self._add(indent, '/*')
+            self._add(indent, f' * {words} {{ ( [')
+            self._add(indent, ' */')
+
+    def _add(self, indent, line):
+        if line and self.unpaired and self._random.random() < self.unpaired:
+            line += self._random.choice(['(', ')', '[', ']', '{', '}'])
+        self._lines.extend((' ' * indent + line if line else '').split('\n'))
@@ -1,6 +1,16 @@
 from linter.stylecheck import Stylecheck
 from linter.tokenizer import Tokenizer
+from linter.project_index import ProjectIndex
+from linter.style_profile import StyleProfile, StyleError
+from linter.runner import Runner
+from linter.result_cache import ResultCache
+from linter.reporters import Reporter, FORMATS
+from linter.daemon import Daemon
+from linter.git_diff import GitDiff, GitError
+from linter.stats import Stats
 import argparse
+import os
+import sys
 
 
 def parse_args():
@@ -14,39 +24,220 @@ def parse_args():
         default='default.style', help='style settings file (default: "default.style")')
 
     parser.add_argument(
-        '-s', '--source', type=str, default='tests/example.cs',
-        help='the source file for checking the style (default: "tests/example.cs")'
+        '-s', '--source', type=str, nargs='+', default=None,
+        help='the source files for checking the style: files, folders (all .cs files in them), glob patterns '
+             '(for example "src/**/*.cs") or "-" to read a NUL-separated list of files from stdin '
+             '(default: "tests/example.cs"); with --diff or --staged - git pathspecs limiting the changed files'
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='the number of processes for checking files (default: the number of available CPUs)'
+    )
+
+    parser.add_argument(
+        '--stream', action='store_true',
+        help='read the source file gradually and check only the rules that need a single line '
+             '(for huge files: memory does not grow with the file size)'
+    )
+
+    parser.add_argument(
+        '--fix', action='store_true',
+        help='fix the problems that can be fixed automatically (spaces at the end of lines and after commas, colons '
+             'and keywords, empty lines before return) and rewrite the source files, then check them'
+    )
+
+    parser.add_argument(
+        '-f', '--format', choices=sorted(FORMATS), default='text',
+        help='the result format: text, JSON Lines (one JSON object per problem) or SARIF (default: text)'
+    )
+
+    parser.add_argument(
+        '-o', '--output', type=str, default=None,
+        help='the result file, "-" - the standard output '
+             '(default: "result.txt" for the text format and the standard output for the others)'
+    )
+
+    parser.add_argument(
+        '--cache', type=str, default=None, metavar='DIR',
+        help='keep the results in the folder DIR: unchanged files are not checked again '
+             '(the results depend on the file, the style settings and the linter version)'
+    )
+
+    parser.add_argument(
+        '--cache-size', type=int, default=ResultCache.DEFAULT_SIZE // (1024 * 1024), metavar='MB',
+        help='the maximum size of the cache folder, the results used long ago are removed first (default: %(default)s)'
+    )
+
+    parser.add_argument(
+        '-p', '--project', type=str, default=None,
+        help='the project folder: methods used in other .cs files of the project are not reported as unused, '
+             f'methods unreachable from Main are reported (the index is kept in "{ProjectIndex.FILE_NAME}")'
+    )
+
+    parser.add_argument(
+        '--diff', type=str, default=None, metavar='REV',
+        help='check only the .cs files changed since the git revision REV (for example "HEAD" or "origin/main") '
+             'and report only the problems in the changed lines'
+    )
+
+    parser.add_argument(
+        '--staged', action='store_true',
+        help='like --diff, but for the changes added to the git index (what will be committed); '
+             'the files are read from the index'
+    )
+
+    parser.add_argument(
+        '--stats', nargs='?', choices=['text', 'json'], const='text', default=None,
+        help='write to stderr the time of each phase (reading, tokenizing, rules, checking for errors, code '
+             'analysis) and of each style setting, files/s, tokens/s and the peak memory, as text or JSON '
+             '(the settings are checked one by one to be timed separately)'
+    )
+
+    parser.add_argument(
+        '--profile', type=str, default=None, metavar='DIR',
+        help='like --stats, and also write a cProfile profile of each phase into DIR/<phase>.prof '
+             '(the files are checked in one process)'
+    )
+
+    parser.add_argument(
+        '--daemon', action='store_true',
+        help='do not exit: read JSON-RPC requests (check, fix, stats, shutdown) from stdin, one per line, '
+             'and write the answers to stdout; "-c" is the default style for the requests'
+    )
+
+    parser.add_argument(
+        '--socket', type=str, default=None, metavar='PATH',
+        help='like --daemon, but the requests are accepted through the Unix socket PATH'
+    )
+
+    args = parser.parse_args()
+    if (args.diff is not None or args.staged) and (args.fix or args.stream):
+        parser.error('--fix and --stream cannot be used with --diff or --staged')
+    return args
+
+
+def check_stream(source_file, profile):
+    """Потоковая проверка: строки результата выдаются по мере чтения файла"""
+    stylecheck = Stylecheck()
+    tokenizer = Tokenizer()
+    with open(source_file, encoding='utf-8') as source:
+        yield from stylecheck.check_stream(tokenizer.iter_lines(source), profile)
+
+
+def serve(args):
+    """Работа в режиме постоянно запущенного процесса (--daemon или --socket)"""
+    daemon = Daemon(args.config)
+    try:
+        if args.socket is not None:
+            print(f'Listening on "{args.socket}"', file=sys.stderr)
+            daemon.serve_socket(args.socket)
+        else:
+            daemon.serve_stream(sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    except FileExistsError as error:
+        print(error, file=sys.stderr)
+        return
+    p50, p99 = daemon.latency()
+    print(f'Requests: {daemon.requests}, p50: {p50} ms, p99: {p99} ms', file=sys.stderr)
 
 
 def main():
     args = parse_args()
+    if args.daemon or args.socket is not None:
+        serve(args)
+        return
+    stats = None
+    if args.stats is not None or args.profile is not None:
+        stats = Stats(args.profile)
     config_file = args.config
-    source_file = args.source
+    output_file = args.output or ('result.txt' if args.format == 'text' else '-')
+    # если результат выводится в stdout, сообщения о ходе проверки выводятся в stderr
+    log = sys.stderr if output_file == '-' else sys.stdout
+    diff = None
+    if args.diff is not None or args.staged:
+        # проверяются только изменённые файлы, выводятся только замечания об изменённых строках
+        try:
+            diff = GitDiff(args.diff, args.staged, args.source or ())
+        except GitError as error:
+            print(error, file=log)
+            return
+        source_files = list(diff.changes)
+    else:
+        source_files = Runner.find_files(args.source or ['tests/example.cs'], sys.stdin)
 
-    print(f'Your file: "{source_file}"')
-    print(f'Your style: "{config_file}"')
-    print()
+    if len(source_files) == 1:
+        print(f'Your file: "{source_files[0]}"', file=log)
+    else:
+        print(f'Your files: {len(source_files)}', file=log)
+    print(f'Your style: "{config_file}"', file=log)
+    print(file=log)
 
-    with open(source_file, encoding='utf-8') as file:
-        code = file.read()
+    # настройки разбираются и проверяются до чтения исходных файлов
+    try:
+        profile = StyleProfile.load(config_file)
+    except StyleError as error:
+        print(error, file=log)
+        return
+    if not source_files:
+        print('No files to check', file=log)
+        return
 
-    print(f'"{source_file}" has been loaded successfully.\n')
+    project_index = None
+    if args.project is not None and not args.stream:
+        with Stats.measure(stats, 'project_index'):
+            project_index = ProjectIndex.open(args.project, args.jobs)
+        # проверяемые файлы вне папки проекта тоже попадают в индекс
+        for source_file in source_files:
+            if os.path.normpath(source_file) not in project_index.files:
+                project_index.update_file(source_file)
+        print(f'Project index: {len(project_index.files)} files in "{args.project}"\n', file=log)
 
-    stylecheck = Stylecheck()
-    tokenizer = Tokenizer()
-    lines = tokenizer.get_lines(code)
-    result = stylecheck.check(lines, config_file)
+    cache = None
+    if args.cache is not None:
+        cache = ResultCache(args.cache, args.cache_size * 1024 * 1024)
 
-    with open('result.txt', 'w', encoding='utf-8') as file:
-        file.write(f'Your file: "{source_file}"\n')
-        file.write(f'Your style: "{config_file}"\n\n')
-        file.write('\n'.join(result))
+    output = sys.stdout if output_file == '-' else open(output_file, 'w', encoding='utf-8')
+    try:
+        reporter = Reporter.create(args.format, output, config_file)
+        reporter.start()
+        if args.stream:
+            for source_file in source_files:
+                with Stats.measure(stats, 'stream'):
+                    reporter.report(source_file, check_stream(source_file, profile))
+                if stats is not None:
+                    stats.files += 1
+        else:
+            # профили этапов собираются только в этом процессе
+            jobs = 1 if args.profile is not None else args.jobs
+            runner = Runner(profile, jobs, project_index, args.fix, cache,
+                            diff.changes if diff is not None else None, diff.contents if diff is not None else None,
+                            stats)
+            for source_file, (fixed, result) in runner.check_files(source_files):
+                if args.fix:
+                    if fixed is None:
+                        print(f'"{source_file}": the file has errors, nothing has been fixed', file=log)
+                    elif fixed > 0 or len(source_files) == 1:
+                        print(f'"{source_file}": fixed problems: {fixed}', file=log)
+                if len(source_files) == 1:
+                    print(f'"{source_file}" has been checked successfully.', file=log)
+                reporter.report(source_file, result)
+        reporter.finish()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if cache is not None:
+        cache.prune()
+    if stats is not None:
+        stats.dump_profiles()
+        print(stats.report(args.stats or 'text'), file=sys.stderr)
 
-    print('\nResult has been recorded into "result.txt"')
-    input("\nPress Enter to quit...")
+    if output_file != '-':
+        print(f'\nResult has been recorded into "{output_file}"')
+        # при запуске из скрипта или с файлами из stdin ждать нажатия Enter не нужно
+        if sys.stdin.isatty() and sys.stdout.isatty():
+            input("\nPress Enter to quit...")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+""" Модуль с индексом парных скобок """
+from bisect import bisect_right
+from .tokenizer import TokenType, TokenStream
+
+
+class BracketIndex:
+    """Пары скобок, найденные за один проход стеком
+
+    Позиции - индексы токенов в последовательности, по которой построен индекс. Соседние парные скобки
+    сокращаются сразу, поэтому для правильного кода это обычное сопоставление скобок, а скобки, которым
+    не нашлось пары, попадают в unpaired"""
+    PAIRS = {')': '(', ']': '[', '}': '{'}
+    BRACKETS = '()[]{}'
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.positions = []  # позиции всех скобок по порядку
+        self.partners = {}  # позиция скобки -> позиция парной скобки
+        self.depths = {}  # позиция скобки -> количество открытых скобок вокруг неё
+        self.line_starts = None
+
+        pairs = self.PAIRS
+        stack = []
+        opened = 0
+        for position, value in self._find_brackets(tokens):
+            self.positions.append(position)
+            if stack and stack[-1][1] == pairs.get(value):
+                open_position = stack.pop()[0]
+                opened -= 1
+                self.partners[open_position] = position
+                self.partners[position] = open_position
+                self.depths[position] = self.depths[open_position]
+                continue
+            self.depths[position] = opened
+            stack.append((position, value))
+            if value not in pairs:
+                opened += 1
+        self.unpaired = [position for position, value in stack]
+
+    @staticmethod
+    def _find_brackets(tokens):
+        if isinstance(tokens, TokenStream):
+            # значения остальных токенов вырезать из кода не нужно
+            return ((position, tokens.value(position))
+                    for position in tokens.positions_of(TokenType.Symbol.value, BracketIndex.BRACKETS))
+        return ((position, token.value)
+                for position, token in enumerate(tokens)
+                if token.token_type is TokenType.Symbol and token.value in BracketIndex.BRACKETS)
+
+    @staticmethod
+    def of(lines):
+        """Индекс для строк файла. Если строки получены из Tokenizer.get_lines, индекс строится один раз
+        и сохраняется вместе с ними"""
+        indexes = getattr(lines, 'indexes', None)
+        if indexes is not None and BracketIndex in indexes:
+            return indexes[BracketIndex]
+
+        stream = getattr(lines, 'stream', None)
+        if stream is not None:
+            index = BracketIndex(stream)
+            index.line_starts = stream.line_offsets
+        else:
+            line_starts = []
+            tokens = []
+            for line in lines:
+                line_starts.append(len(tokens))
+                tokens.extend(line)
+            index = BracketIndex(tokens)
+            index.line_starts = line_starts
+        if indexes is not None:
+            indexes[BracketIndex] = index
+        return index
+
+    def partner(self, position):
+        """Позиция парной скобки или None, если пары нет"""
+        return self.partners.get(position)
+
+    def depth(self, position):
+        return self.depths.get(position)
+
+    def partner_in_lines(self, line_index, index):
+        """То же, что и partner, но позиции задаются номером строки и индексом токена в ней
+        (индекс должен быть построен через BracketIndex.of)"""
+        partner = self.partners.get(self.line_starts[line_index] + index)
+        if partner is None:
+            return None
+        partner_line = bisect_right(self.line_starts, partner) - 1
+        return partner_line, partner - self.line_starts[partner_line]
@@ -1,54 +1,100 @@
 from . import tokenizer
+from . import brackets
+from .diagnostic import Diagnostic
+import hashlib
 from dataclasses import dataclass
 
+SPACE = tokenizer.TokenType.Space.value
+COMMENT = tokenizer.TokenType.Comment.value
+
+
+class FunctionCache:
+    """Результаты анализа функций по хэшу их токенов
+
+    Ключ - хэш значений токенов функции (от '(' до '}' тела) без пробелов и комментариев, поэтому заново
+    анализируются только функции, в которых что-то изменилось, а правки форматирования и сдвиг функции в файле
+    ключ не меняют. Хранится не больше size результатов, при переполнении удаляется результат, к которому
+    дольше всего не обращались. hits и misses - счётчики попаданий и промахов"""
+    DEFAULT_SIZE = 1 << 14
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._results = {}
+
+    def __len__(self):
+        return len(self._results)
+
+    @staticmethod
+    def key(tokens, begin, end):
+        data = '\0'.join(token.value for token in tokens[begin:end])
+        return hashlib.blake2b(data.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def get(self, key):
+        result = self._results.pop(key, None)
+        if result is None:
+            self.misses += 1
+            return None
+        self._results[key] = result
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        if len(self._results) >= self.size:
+            del self._results[next(iter(self._results))]
+        self._results[key] = result
+
+    def clear(self):
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
+
 
 class CodeAnalyzer:
+    # общий кэш результатов анализа функций (см. FunctionCache)
+    function_cache = FunctionCache()
+
     @staticmethod
-    def find_unused_objects(lines):
-        tokens = [token
-                  for line in lines
-                  for token in CodeAnalyzer._remove_excess_tokens(line)]
-        warnings = [f"""Line {token.row}: local variable '{token.value}' value is not used"""
-                    for token in CodeAnalyzer._find_unused_vars(tokens)]
+    def find_unused_objects(lines, project_index=None):
+        """Неиспользуемые переменные, аргументы и методы. Если задан индекс проекта (ProjectIndex), метод
+        считается используемым, если на него ссылаются в любом файле проекта"""
+        model = CodeModel.of(lines)
+        warnings = [Diagnostic(token.row, token.column, f"local variable '{token.value}' value is not used",
+                               'unused_objects')
+                    for token in CodeAnalyzer._find_unused_vars(model.tokens, model)]
 
-        warnings.extend([f"""Line {token.row}: method '{token.value}' is not used"""
-                         for token in CodeAnalyzer._find_unused_functions(tokens)
+        warnings.extend([Diagnostic(token.row, token.column, f"method '{token.value}' is not used", 'unused_objects')
+                         for token in CodeAnalyzer._find_unused_functions(model.tokens, model, project_index)
                          ])
         return warnings
 
+    @staticmethod
+    def find_unreachable_methods(lines, project_index):
+        """Методы файла, недостижимые из точек входа проекта (если в проекте нет точки входа, проверка
+        не выполняется)"""
+        if not project_index.has_entry_point():
+            return []
+        reachable = project_index.reachable()
+        return [Diagnostic(function.name_token.row, function.name_token.column,
+                           f"method '{function.name_token.value}' is not reachable from the entry point",
+                           'unreachable_methods')
+                for function in CodeModel.of(lines).functions
+                if function.name_token.value not in reachable]
+
     @staticmethod
     def get_cyclomatic_complexity_by_function(lines):
-        tokens = [token
-                  for line in lines
-                  for token in CodeAnalyzer._remove_excess_tokens(line)]
-        cyclomatic_complexity = CodeAnalyzer._calculate_cyclomatic_complexity_by_function(tokens)
+        model = CodeModel.of(lines)
+        cyclomatic_complexity = CodeAnalyzer._calculate_cyclomatic_complexity_by_function(model.tokens, model)
         cyclomatic_sum = sum(complexity for function_token, complexity in cyclomatic_complexity)
         return [f'Cyclomatic complexity of the entire code: {cyclomatic_sum}'] + \
             [f"""Function: '{function_token.value}', cyclomatic complexity: {complexity}"""
              for function_token, complexity in cyclomatic_complexity]
 
     @staticmethod
-    def _find_unused_vars(tokens):
-        vars = []
-        stack = [{}]
-        nesting_level = 0
-        for i, token in enumerate(tokens):
-            if token.value == '{':
-                stack.append({**stack[-1]})
-                nesting_level += 1
-            elif token.value == '}':
-                vars.extend(token for used_count, token, nest_lvl in stack[-1].values()
-                            if used_count <= 1 and nest_lvl == nesting_level)
-                stack.pop()
-                nesting_level -= 1
-            var_token = CodeAnalyzer._check_if_variable(i, tokens)
-            if var_token is not None:
-                stack[-1][var_token.value] = [0, var_token, nesting_level]
-            elif token.value in stack[-1].keys():
-                stack[-1][token.value][0] += 1
-        vars.extend(token for used_count, token, nest_lvl in stack[-1].values() if used_count <= 1)
-        vars.extend(CodeAnalyzer._find_unused_function_arguments(tokens))
-        return vars
+    def _find_unused_vars(tokens, model=None):
+        unused_vars, unused_arguments = CodeAnalyzer._resolve_symbols(tokens, model)
+        return unused_vars + unused_arguments
 
     @staticmethod
     def _check_if_variable(i, tokens):
@@ -60,78 +106,133 @@ class CodeAnalyzer:
         return None
 
     @staticmethod
-    def _find_unused_function_arguments(tokens):
-        function_structures = CodeAnalyzer._find_function_structures(tokens)
+    def _find_unused_function_arguments(tokens, model=None):
+        return CodeAnalyzer._resolve_symbols(tokens, model)[1]
+
+    @staticmethod
+    def _get_function_arguments(tokens, function):
+        """Позиции аргументов функции"""
+        arguments = [i
+                     for i in range(function.begin_arguments_pos, function.end_arguments_pos - 1)
+                     if tokens[i + 1].value == ',']
+        # добавление последнего аргумента (так как за ним нет ',')
+        if function.end_arguments_pos - function.begin_arguments_pos - 1 > 0:
+            arguments.append(function.end_arguments_pos - 1)
+        return arguments
+
+    @staticmethod
+    def _resolve_symbols(tokens, model=None, cache=None):
+        """Объявления и использования локальных переменных и аргументов функций за один проход по токенам
+
+        Аргументы объявляются в области тела функции, переменная (var) - в текущей области, использование
+        относится к ближайшему видимому объявлению. Тело функции разбирается отдельно (см. _analyze_function),
+        а имена, которые в нём не объявлены, засчитываются объявлениям снаружи. Возвращает неиспользуемые
+        переменные и аргументы"""
+        if model is None:
+            model = CodeModel(tokens)
+        if cache is None:
+            cache = CodeAnalyzer.function_cache
+        bodies = {function.begin_body_pos: function for function in model.functions}
+        unused_vars = []
         unused_arguments = []
-        for function in function_structures:
-            arguments = [tokens[i]
-                         for i in range(function.begin_arguments_pos, function.end_arguments_pos - 1)
-                         if tokens[i + 1].value == ',']
-            # добавление последнего аргумента (так как за ним нет ',')
-            if function.end_arguments_pos - function.begin_arguments_pos - 1 > 0:
-                arguments.append(tokens[function.end_arguments_pos - 1])
-            end = CodeAnalyzer._find_pair_bracket_position(function.begin_arguments_pos, '{', '}', tokens)
-            for token in tokens[function.end_arguments_pos:end]:
-                for i, argument in enumerate(arguments):
-                    if argument.value == token.value:
-                        arguments.pop(i)
-                        break
-            unused_arguments.extend(arguments)
-        return unused_arguments
-
-    @staticmethod
-    def _find_unused_functions(tokens):
-        function_names = [structure.name_token for structure in CodeAnalyzer._find_function_structures(tokens)]
-        all_token_values = [token.value for token in tokens]
-        return [function for function in function_names if all_token_values.count(function.value) == 1]
-
-    @staticmethod
-    def _find_function_structures(tokens):
-        function_names = []
-        skip_until = -1
-        for i, token in enumerate(tokens):
-            if i <= skip_until:
-                continue
-            if token.value == '(':
-                end_bracket_pos = CodeAnalyzer._find_pair_bracket_position(i, '(', ')', tokens)
-                if tokens[end_bracket_pos + 1].value != '{':
-                    continue
-                possible_name_token = tokens[i - 1]
-                if possible_name_token.value not in tokenizer.Tokenizer.KEYWORDS:
-                    begin_body = end_bracket_pos + 1
-                    end_body = CodeAnalyzer._find_pair_bracket_position(end_bracket_pos + 1, '{', '}', tokens)
-                    function_names.append(
-                        FunctionStructure(possible_name_token, i + 1, end_bracket_pos, begin_body, end_body))
-                    skip_until = end_body
-        return function_names
-
-    @staticmethod
-    def _find_pair_bracket_position(start, open, close, tokens):
-        stack = 0
-        for end, token in enumerate(tokens[start:]):
-            if token.value not in open + close:
+
+        def report(declarations):
+            for uses, position, is_argument in declarations:
+                if CodeAnalyzer._is_unused(uses, is_argument):
+                    (unused_arguments if is_argument else unused_vars).append(position)
+
+        table = SymbolTable()
+        i = 0
+        while i < len(tokens):
+            function = bodies.get(i)
+            if function is None:
+                CodeAnalyzer._walk_symbols(tokens, i, i + 1, table, report)
+                i += 1
                 continue
-            if token.value == open:
-                stack += 1
-            else:
-                if stack == 1:
-                    return end + start
-                else:
-                    stack -= 1
+            begin = function.begin_arguments_pos - 1
+            variables, arguments, free_uses = CodeAnalyzer._analyze_function(tokens, function, cache)
+            unused_vars.extend(begin + offset for offset in variables)
+            unused_arguments.extend(begin + offset for offset in arguments)
+            for name, count in free_uses:
+                table.use(name, count)
+            i = function.end_body_pos + 1
+        report(table.visible_declarations())
+        return [tokens[i] for i in unused_vars], [tokens[i] for i in unused_arguments]
+
+    @staticmethod
+    def _analyze_function(tokens, function, cache):
+        """Неиспользуемые переменные и аргументы функции (смещения от '(') и имена, которые использованы в теле,
+        но не объявлены в нём, с количеством использований. Результат берётся из кэша по хэшу токенов функции"""
+        begin = function.begin_arguments_pos - 1
+        key = cache.key(tokens, begin, function.end_body_pos + 1)
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        variables = []
+        arguments = []
+        free_uses = {}
+
+        def report(declarations):
+            for uses, position, is_argument in declarations:
+                if CodeAnalyzer._is_unused(uses, is_argument):
+                    (arguments if is_argument else variables).append(position - begin)
+
+        CodeAnalyzer._walk_symbols(tokens, function.begin_body_pos, function.end_body_pos + 1, SymbolTable(), report,
+                                   free_uses, CodeAnalyzer._get_function_arguments(tokens, function))
+        result = (tuple(variables), tuple(arguments), tuple(free_uses.items()))
+        cache.put(key, result)
+        return result
 
     @staticmethod
-    def _calculate_cyclomatic_complexity_by_function(tokens):
+    def _walk_symbols(tokens, begin, end, table, report, free_uses=None, arguments=()):
+        """Объявления и использования на токенах [begin, end): закрытые области передаются в report, аргументы
+        (позиции) объявляются в области, открытой первым токеном, а использования имён, которых нет в таблице,
+        подсчитываются в free_uses"""
+        for i in range(begin, end):
+            value = tokens[i].value
+            if value == '{':
+                table.open_scope()
+                if i == begin:
+                    for position in arguments:
+                        table.declare(tokens[position].value, position, True)
+            elif value == '}' and table.depth() > 0:
+                report(table.close_scope())
+            var_token = CodeAnalyzer._check_if_variable(i, tokens)
+            if var_token is not None:
+                table.declare(var_token.value, i + 1, False)
+            elif not table.use(value) and free_uses is not None:
+                free_uses[value] = free_uses.get(value, 0) + 1
+
+    @staticmethod
+    def _is_unused(uses, is_argument):
+        # имя переменной после var тоже считается использованием
+        return uses == 0 if is_argument else uses <= 1
+
+    @staticmethod
+    def _find_unused_functions(tokens, model=None, project_index=None):
+        if model is None:
+            model = CodeModel(tokens)
+        if project_index is not None:
+            return [function.name_token for function in model.functions
+                    if not project_index.is_referenced(function.name_token.value)]
+        return [function.name_token for function in model.functions if model.count(function.name_token.value) == 1]
+
+    @staticmethod
+    def _find_function_structures(tokens, model=None):
+        """Функции верхнего уровня (функции внутри найденной функции не рассматриваются)"""
+        if model is None:
+            model = CodeModel(tokens)
+        return model.functions
+
+    @staticmethod
+    def _calculate_cyclomatic_complexity_by_function(tokens, model=None):
         # Рассчитывал по формуле CC = π − s + 2 из википедии, где s = 1 всегда
         # Решил сделать так, как реализовано в Visual Studio (там можно посчитать СС)
         # Узнал эмпирически, анализируя несколько программ
-        cyclomatic_complexity = []
-        decision_tokens = ['if', 'for', 'while', 'foreach']
-        for function in CodeAnalyzer._find_function_structures(tokens):
-            count = 1
-            for token in tokens[function.begin_body_pos:function.end_body_pos]:
-                count += 1 if token.value in decision_tokens else 0
-            cyclomatic_complexity.append((function.name_token, count))
-        return cyclomatic_complexity
+        # Ветвления в теле каждой функции (if, for, while, foreach) подсчитываются при построении CodeModel
+        return [(function.name_token, 1 + function.decisions)
+                for function in CodeAnalyzer._find_function_structures(tokens, model)]
 
     @staticmethod
     def _get_line(i, tokens):
@@ -152,3 +253,141 @@ class FunctionStructure:
     end_arguments_pos: int
     begin_body_pos: int
     end_body_pos: int
+    decisions: int = 0
+
+
+class SymbolTable:
+    """Таблица имён с цепочкой областей видимости
+
+    Области не копируются: для каждого имени хранится стек видимых объявлений (ближайшее - последнее), а каждая
+    область помнит объявленные в ней имена и при закрытии снимает их со стеков. Поэтому объявление, использование
+    и закрытие области стоят O(1) на имя при любой глубине вложенности. Объявление - список
+    [количество использований, позиция токена, аргумент ли это]"""
+
+    def __init__(self):
+        self.scopes = [{}]  # открытые области: имя -> объявление в этой области
+        self.visible = {}  # имя -> стек видимых объявлений
+
+    def depth(self):
+        return len(self.scopes) - 1
+
+    def open_scope(self):
+        self.scopes.append({})
+
+    def close_scope(self):
+        """Закрытие внутренней области, возвращает её объявления в порядке объявления"""
+        scope = self.scopes.pop()
+        for name in scope:
+            declarations = self.visible[name]
+            declarations.pop()
+            if not declarations:
+                del self.visible[name]
+        return list(scope.values())
+
+    def declare(self, name, position, is_argument):
+        declaration = [0, position, is_argument]
+        scope = self.scopes[-1]
+        if name in scope:
+            # повторное объявление в той же области заменяет прежнее
+            self.visible[name][-1] = declaration
+        else:
+            self.visible.setdefault(name, []).append(declaration)
+        scope[name] = declaration
+
+    def use(self, name, count=1):
+        """Использование имени, возвращает False, если имя не объявлено"""
+        declarations = self.visible.get(name)
+        if declarations is None:
+            return False
+        declarations[-1][0] += count
+        return True
+
+    def visible_declarations(self):
+        """Объявления, видимые в текущей области: имена упорядочены по первому объявлению
+        (от внешних областей к внутренним)"""
+        names = {}
+        for scope in self.scopes:
+            for name in scope:
+                names.setdefault(name, self.visible[name][-1])
+        return list(names.values())
+
+
+class CodeModel:
+    """Структура файла, общая для всех анализов CodeAnalyzer
+
+    Строится за один проход по токенам без пробелов и комментариев (tokens): скобки сопоставляются стеком,
+    как в BracketIndex, по ходу находятся функции (FunctionStructure) с диапазонами аргументов и тела и
+    числом ветвлений в теле. По ходу же строится индекс вхождений (occurrences: значение токена -> позиции по возрастанию), так что
+    вопрос "сколько раз встречается имя" решается без просмотра токенов"""
+    DECISION_TOKENS = ('if', 'for', 'while', 'foreach')
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.functions = []
+        self.occurrences = {}
+
+        pairs = brackets.BracketIndex.PAIRS
+        bracket_values = brackets.BracketIndex.BRACKETS
+        keywords = tokenizer.Tokenizer.KEYWORDS
+        symbol = tokenizer.TokenType.Symbol
+        stack = []
+        candidates = {}  # позиция '{' возможного тела функции -> (позиция '(', позиция ')', ветвлений до тела)
+        decisions = 0
+        occurrences = self.occurrences
+        for position, token in enumerate(tokens):
+            value = token.value
+            positions = occurrences.get(value)
+            if positions is None:
+                occurrences[value] = [position]
+            else:
+                positions.append(position)
+            if value in self.DECISION_TOKENS:
+                decisions += 1
+                continue
+            if token.token_type is not symbol or value not in bracket_values:
+                continue
+            if not stack or stack[-1][1] != pairs.get(value):
+                stack.append((position, value))
+                continue
+            open_position = stack.pop()[0]
+            if value == ')':
+                if position + 1 < len(tokens) and tokens[position + 1].value == '{' and \
+                        tokens[open_position - 1].value not in keywords:
+                    candidates[position + 1] = (open_position, position, decisions)
+            elif value == '}':
+                candidate = candidates.pop(open_position, None)
+                if candidate is not None:
+                    self._add_function(candidate, open_position, position, decisions)
+
+    def count(self, value):
+        """Количество токенов с данным значением"""
+        return len(self.occurrences.get(value, ()))
+
+    def _add_function(self, candidate, begin_body, end_body, decisions):
+        open_position, close_position, decisions_before = candidate
+        # функции, вложенные в эту, закончились раньше неё и уже добавлены - они не рассматриваются
+        while self.functions and self.functions[-1].begin_arguments_pos > open_position:
+            self.functions.pop()
+        self.functions.append(FunctionStructure(self.tokens[open_position - 1], open_position + 1,
+                                                close_position, begin_body, end_body, decisions - decisions_before))
+
+    @staticmethod
+    def of(lines):
+        """Модель для строк файла. Если строки получены из Tokenizer.get_lines, модель строится один раз
+        и сохраняется вместе с ними"""
+        indexes = getattr(lines, 'indexes', None)
+        if indexes is not None and CodeModel in indexes:
+            return indexes[CodeModel]
+
+        stream = getattr(lines, 'stream', None)
+        if stream is not None:
+            types = stream.types
+            tokens = [stream[i] for i in range(len(types)) if types[i] != SPACE and types[i] != COMMENT]
+        else:
+            tokens = [token
+                      for line in lines
+                      for token in CodeAnalyzer._remove_excess_tokens(line)]
+        model = CodeModel(tokens)
+        if indexes is not None:
+            indexes[CodeModel] = model
+        return model
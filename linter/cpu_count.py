@@ -0,0 +1,38 @@
+""" Модуль с количеством процессоров, доступных процессу """
+import math
+import os
+
+
+class CpuCount:
+    @staticmethod
+    def available():
+        """Количество процессоров, доступных процессу: учитываются привязка процесса к процессорам и
+        ограничение процессорного времени в cgroup (например, в контейнере)"""
+        try:
+            count = len(os.sched_getaffinity(0))
+        except AttributeError:
+            count = os.cpu_count() or 1
+        quota = CpuCount._cgroup_quota()
+        if quota is not None:
+            count = min(count, max(1, math.ceil(quota)))
+        return count
+
+    @staticmethod
+    def _cgroup_quota():
+        """Квота процессорного времени cgroup в процессорах или None, если ограничения нет"""
+        try:
+            # cgroup v2: "<квота> <период>" или "max <период>"
+            with open('/sys/fs/cgroup/cpu.max') as f:
+                quota, period = f.read().split()[:2]
+            return None if quota == 'max' else int(quota) / int(period)
+        except (OSError, ValueError):
+            pass
+        try:
+            # cgroup v1: квота -1 - ограничения нет
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            return None if quota <= 0 or period <= 0 else quota / period
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,227 @@
+""" Модуль с постоянно работающим процессом проверки """
+import errno
+import inspect
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from stat import S_ISSOCK
+from .tokenizer import Tokenizer
+from .stylecheck import Stylecheck
+from .style_profile import StyleProfile, StyleError
+from .fixer import Fixer
+from .reporters import Reporter
+
+
+class DaemonError(Exception):
+    """Ошибка запроса: code - код ошибки JSON-RPC"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class Daemon:
+    """Проверка файлов по запросам JSON-RPC 2.0 (по одному запросу или ответу в строке)
+
+    Процесс запускается один раз (для редактора или pre-commit), поэтому запуск интерпретатора, импорт модулей,
+    компиляция регулярных выражений токенизатора и разбор .style файлов не повторяются для каждого файла.
+    Настройки стиля хранятся в памяти и перечитываются, если .style файл изменился. Запросы принимаются из потока
+    (serve_stream, например stdin) или через Unix сокет (serve_socket).
+
+    Методы:
+    check {path, code?, style?} - результат проверки (строки как в Stylecheck.check и замечания как в
+    Reporter.diagnostics); если code не задан, файл читается с диска.
+    fix {path?, code?, style?} - исправленный код и количество правок; если code не задан, исправляется файл.
+    stats {} - количество запросов и время ответа (p50, p99) в миллисекундах.
+    shutdown {} - завершение работы"""
+    DEFAULT_STYLE = 'default.style'
+    # по скольким последним запросам считается время ответа
+    LATENCY_WINDOW = 10000
+    PARSE_ERROR = -32700
+    INVALID_REQUEST = -32600
+    METHOD_NOT_FOUND = -32601
+    INVALID_PARAMS = -32602
+    SERVER_ERROR = -32000
+
+    def __init__(self, default_style=DEFAULT_STYLE):
+        self.default_style = default_style
+        self.tokenizer = Tokenizer()
+        self.stylecheck = Stylecheck()
+        self.profiles = {}  # путь к .style файлу -> (mtime, размер, StyleProfile, Fixer)
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.requests = 0
+        self.running = True
+        self._lock = threading.RLock()
+
+    def handle(self, line):
+        """Ответ (строка JSON) на запрос или None, если это уведомление (запрос без id)"""
+        begin = time.perf_counter()
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise DaemonError(self.PARSE_ERROR, 'parse error')
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise DaemonError(self.INVALID_REQUEST, 'invalid request')
+            request_id = request.get('id')
+            params = request.get('params', {})
+            if not isinstance(params, dict):
+                raise DaemonError(self.INVALID_PARAMS, 'params must be an object')
+            method = getattr(self, '_method_' + request['method'], None)
+            if method is None:
+                raise DaemonError(self.METHOD_NOT_FOUND, f'method not found: {request["method"]}')
+            try:
+                inspect.signature(method).bind(**params)
+            except TypeError as error:
+                raise DaemonError(self.INVALID_PARAMS, str(error))
+            with self._lock:
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': method(**params)}
+        except DaemonError as error:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': error.code, 'message': str(error)}}
+        except Exception as error:
+            # ошибка при проверке одного файла не должна останавливать процесс
+            response = {'jsonrpc': '2.0', 'id': request_id,
+                        'error': {'code': self.SERVER_ERROR, 'message': f'{type(error).__name__}: {error}'}}
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - begin)
+        if request_id is None and 'error' not in response:
+            return None
+        return json.dumps(response, ensure_ascii=False)
+
+    def profile(self, path=None):
+        """Настройки из .style файла; файл перечитывается, только если изменились время изменения или размер"""
+        path = os.path.abspath(path or self.default_style)
+        try:
+            stat = os.stat(path)
+        except OSError as error:
+            raise DaemonError(self.SERVER_ERROR, f'cannot read the style file: {error}')
+        cached = self.profiles.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        try:
+            profile = StyleProfile.load(path)
+        except (StyleError, OSError) as error:
+            raise DaemonError(self.SERVER_ERROR, str(error))
+        self.profiles[path] = (stat.st_mtime_ns, stat.st_size, profile, Fixer(profile, self.tokenizer))
+        return profile
+
+    def latency(self):
+        """(p50, p99) времени ответа в миллисекундах по последним LATENCY_WINDOW запросам"""
+        with self._lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return None, None
+        return tuple(round(latencies[min(len(latencies) - 1, int(len(latencies) * quantile))] * 1000, 3)
+                     for quantile in (0.5, 0.99))
+
+    def serve_stream(self, input, output):
+        """Чтение запросов из input (по одному в строке) и запись ответов в output до shutdown или конца input"""
+        for line in input:
+            if not line.strip():
+                continue
+            response = self.handle(line)
+            if response is not None:
+                output.write(response + '\n')
+                output.flush()
+            if not self.running:
+                break
+
+    def serve_socket(self, path):
+        """Приём запросов через Unix сокет path до shutdown. Каждое соединение обслуживается в своём потоке,
+        а проверки выполняются по одной. Если путь path занят (не сокетом или сокетом, который слушает другой
+        процесс), - FileExistsError"""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    response = daemon.handle(line.decode('utf-8'))
+                    if response is not None:
+                        self.wfile.write(response.encode('utf-8') + b'\n')
+                        self.wfile.flush()
+                    if not daemon.running:
+                        threading.Thread(target=self.server.shutdown).start()
+                        break
+
+        self._remove_stale_socket(path)
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            server.daemon_threads = True
+            try:
+                server.serve_forever()
+            finally:
+                os.remove(path)
+
+    @staticmethod
+    def _remove_stale_socket(path):
+        """Удаление сокета path, оставшегося от завершившегося процесса. Другие файлы и сокет работающего
+        процесса не удаляются"""
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            return
+        if not S_ISSOCK(mode):
+            raise FileExistsError(errno.EEXIST, 'the path exists and is not a socket', path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            try:
+                client.connect(path)
+            except ConnectionRefusedError:
+                # сокет никто не слушает
+                os.remove(path)
+                return
+        raise FileExistsError(errno.EEXIST, 'the socket is used by another process', path)
+
+    @staticmethod
+    def request(path, method, params=None, request_id=1):
+        """Отправка одного запроса процессу, слушающему Unix сокет path. Возвращает ответ (словарь)"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            message = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params or {}}
+            client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            with client.makefile('rb') as response:
+                return json.loads(response.readline())
+
+    def _read(self, path, code):
+        if code is not None:
+            return code
+        if path is None:
+            raise DaemonError(self.INVALID_PARAMS, 'path or code is required')
+        try:
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError) as error:
+            raise DaemonError(self.SERVER_ERROR, f'cannot read the file: {error}')
+
+    def _method_check(self, path=None, code=None, style=None):
+        profile = self.profile(style)
+        result = self.stylecheck.check(self.tokenizer.get_lines(self._read(path, code)), profile)
+        return {'result': result, 'diagnostics': list(Reporter.diagnostics(path, result))}
+
+    def _method_fix(self, path=None, code=None, style=None):
+        profile = self.profile(style)
+        fixer = self.profiles[os.path.abspath(profile.source)][3]
+        if code is None:
+            if path is None:
+                raise DaemonError(self.INVALID_PARAMS, 'path or code is required')
+            try:
+                fixed = fixer.fix_file(path)
+            except (OSError, UnicodeDecodeError) as error:
+                raise DaemonError(self.SERVER_ERROR, f'cannot fix the file: {error}')
+            return {'fixed': fixed, 'code': self._read(path, None)}
+        code, fixed = fixer.fix_code(code)
+        return {'fixed': fixed, 'code': code}
+
+    def _method_stats(self):
+        p50, p99 = self.latency()
+        return {'requests': self.requests, 'p50_ms': p50, 'p99_ms': p99, 'styles': len(self.profiles)}
+
+    def _method_shutdown(self):
+        self.running = False
+        return self._method_stats()
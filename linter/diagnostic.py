@@ -0,0 +1,56 @@
+""" Модуль с замечанием о месте в файле """
+import re
+
+
+class Diagnostic(str):
+    """Замечание о месте в файле
+
+    Это строка сообщения, как её выводит текстовый отчёт ('Line N: текст', или 'Line N, column M: текст', если
+    with_column), поэтому замечание можно выводить и сравнивать как обычную строку результата. Место и правило
+    хранятся отдельно: row и column (с 1, None - если неизвестны), rule (настройка из .style файла или раздел
+    дополнительной информации, None - если задаётся разделом результата) и message (текст без места), - из них
+    форматы для машинной обработки получают замечания без разбора текста (см. reporters.Reporter.diagnostics)"""
+    # строка результата, которая была замечанием (например, после чтения из кэша)
+    TEXT = re.compile(r'Line (\d+)(?:, column (\d+))?: (.*)', re.DOTALL)
+
+    def __new__(cls, row, column, message, rule=None, with_column=False):
+        if with_column:
+            text = f'Line {row}, column {column}: {message}'
+        else:
+            text = f'Line {row}: {message}'
+        diagnostic = super().__new__(cls, text)
+        diagnostic.row = row
+        diagnostic.column = column
+        diagnostic.message = message
+        diagnostic.rule = rule
+        diagnostic.with_column = with_column
+        return diagnostic
+
+    def __getnewargs__(self):
+        # для pickle (передача результатов между процессами)
+        return self.row, self.column, self.message, self.rule, self.with_column
+
+    @staticmethod
+    def parse(line, rule=None):
+        """Замечание из строки результата 'Line N[, column M]: текст' (столбец - None, если его нет в тексте)
+        или None, если строка - не замечание о месте в файле. rule - правило замечания"""
+        if isinstance(line, Diagnostic):
+            return line
+        match = Diagnostic.TEXT.fullmatch(line)
+        if match is None:
+            return None
+        row, column, message = match.groups()
+        return Diagnostic(int(row), int(column) if column is not None else None, message, rule,
+                          with_column=column is not None)
+
+    @staticmethod
+    def dump(lines):
+        """Строки результата для JSON (например, для кэша): замечание - список [row, column, message, rule,
+        with_column], остальные строки - как есть"""
+        return [[line.row, line.column, line.message, line.rule, line.with_column]
+                if isinstance(line, Diagnostic) else line for line in lines]
+
+    @staticmethod
+    def load(lines):
+        """Строки результата из Diagnostic.dump"""
+        return [Diagnostic(*line) if isinstance(line, list) else line for line in lines]
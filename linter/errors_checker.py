@@ -1,36 +1,36 @@
-from .tokenizer import TokenType
-import re
+from .tokenizer import TokenType, Lines
+from .brackets import BracketIndex
+from .diagnostic import Diagnostic
+from bisect import bisect_left
+from collections import defaultdict
 
 
 class ErrorsChecker:
+    # Наибольший участок из непарных скобок, на котором запускается точное ДП (O(N^3) по времени, O(N^2) по памяти):
+    # на 1000 скобках - до пары секунд и десятков мегабайт
+    DP_WINDOW_LIMIT = 1000
+
     @staticmethod
     def checking_for_errors(lines):
-        """Проверка анализируемого кода на корректность"""
-        errors = []
-        regx_string_constant = re.compile(r"""(?:(?:\$@)|(?:@\$)|(?:@)|(?:\$))?(["'])[\W\w]*?(?<!\\)(?:\\\\)*\1""")
-        regx_multiline_comment = re.compile(r'\/\*[\w\W]*?(?<!\\)(?:\\\\)*\*\/')
-        regx_oneline_comment = re.compile(r'//.*?(?=\n|$)')
-        for token in (token for line in lines for token in line):
-            if token.token_type is TokenType.StringConstant and \
-                    regx_string_constant.match(token.value) is None:
-                errors.append((TokenType.StringConstant,
-                               f'Line {token.row}: the string does not have a closing quotation mark'))
-            if token.token_type is TokenType.Comment and \
-                    regx_multiline_comment.match(token.value) is None and \
-                    regx_oneline_comment.match(token.value) is None:
-                errors.append((TokenType.Comment,
-                               f'Line {token.row}: the multiline comment has no closing characters'))
-
-        # Упорядочивание ошибок
-        errors = [error[1] for error in sorted(errors, key=lambda pair: pair[0])]
-
-        wrong_brackets = ErrorsChecker._checking_brackets_by_dp(lines)[1]
-        # если анализ работает слишком медленно, следует использовать _checking_brackets_by_stack
-        # for open, close in [('(', ')'), ('[', ']'), ('{', '}')]:
-        #     wrong_brackets.extend(ErrorsChecker._checking_brackets_by_stack(lines, open, close))
-        for bracket in wrong_brackets[::-1]:
-            errors.append(
-                f"""Line {bracket.row}, column {bracket.column}: it looks like this bracket doesn't have a pair""")
+        """Проверка анализируемого кода на корректность. Возвращает замечания (Diagnostic)"""
+        lines = Lines.of(lines)
+        stream = lines.stream
+        # незакрытые строковые константы и комментарии отмечает токенизатор во время разбора,
+        # сначала выводятся ошибки в строках, затем в комментариях
+        unterminated = [(stream.types[i], stream.rows[i], stream.columns[i]) for i in stream.unterminated]
+        errors = [Diagnostic(row, column, 'the string does not have a closing quotation mark', 'errors')
+                  for token_code, row, column in unterminated if token_code == TokenType.StringConstant.value]
+        errors.extend(Diagnostic(row, column, 'the multiline comment has no closing characters', 'errors')
+                      for token_code, row, column in unterminated if token_code == TokenType.Comment.value)
+
+        wrong_brackets, oversized = ErrorsChecker._find_wrong_brackets(lines)
+        for bracket in oversized:
+            errors.append(Diagnostic(bracket.row, bracket.column,
+                                     'too many brackets without a pair depend on each other from here, '
+                                     'the brackets below may be more than the minimal set', 'errors', with_column=True))
+        for bracket in wrong_brackets:
+            errors.append(Diagnostic(bracket.row, bracket.column, "it looks like this bracket doesn't have a pair",
+                                     'errors', with_column=True))
 
         return errors
 
@@ -95,3 +95,204 @@ class ErrorsChecker:
                     wrong_brackets.append(bracket)
         wrong_brackets.extend(stack)
         return wrong_brackets
+
+    @staticmethod
+    def _checking_brackets_by_windows(lines):
+        """Решение той же задачи, что и _checking_brackets_by_dp (с тем же ответом), но за почти линейное время"""
+        wrong_brackets = ErrorsChecker._find_wrong_brackets(lines)[0]
+        return len(wrong_brackets), wrong_brackets
+
+    @staticmethod
+    def _find_wrong_brackets(lines):
+        """Непарные скобки (по порядку) и первые скобки участков, на которых ответ может быть не минимальным
+
+        Соседние парные скобки всегда можно оставить в оптимальном ответе, поэтому они сокращаются
+        стеком (см. BracketIndex). Оставшиеся скобки разбиваются на независимые участки (ни одна возможная
+        пара не пересекает границу участка), и точное ДП запускается только на них. Ответ восстанавливается
+        так же, как в _checking_brackets_by_dp (см. _restore_wrong_brackets)"""
+        lines = Lines.of(lines)
+        bracket_index = BracketIndex.of(lines)
+        if not bracket_index.unpaired:
+            return [], []
+        stream = lines.stream
+        positions = bracket_index.positions
+        numbers = {position: number for number, position in enumerate(positions)}
+        values = [stream.value(position) for position in positions]
+        partners = [numbers.get(bracket_index.partner(position)) for position in positions]
+        residue = [numbers[position] for position in bracket_index.unpaired]
+
+        windows = []
+        oversized = []
+        for window in ErrorsChecker._split_into_windows([values[number] for number in residue]):
+            window_values = [values[residue[k]] for k in window]
+            if len(window) <= ErrorsChecker.DP_WINDOW_LIMIT:
+                windows.append((window, ErrorsChecker._solve_window_by_dp(window_values), None))
+            else:
+                # на таких участках точное решение слишком дорого, ответ может быть не минимальным
+                windows.append((window, None, ErrorsChecker._solve_window_by_stack(window_values)))
+                oversized.append(stream[positions[residue[window[0]]]])
+        wrong = ErrorsChecker._restore_wrong_brackets(values, partners, residue, windows)
+        return [stream[positions[number]] for number in sorted(wrong)], oversized
+
+    @staticmethod
+    def _restore_wrong_brackets(values, partners, residue, windows):
+        """Номера непарных скобок - тот же ответ, что и у _checking_brackets_by_dp
+
+        Как и там, отрезок [l, r] разбирается с конца: последняя скобка удаляется, если это не хуже, иначе
+        получает самую левую из парных ей скобок, с которой ответ минимален. Ответ на отрезке - количество скобок,
+        пара которых (partners) за его границами, плюс ответ ДП на непарных скобках (residue) внутри него, поэтому:
+        - открывающая скобка и закрывающая, пара которой левее отрезка, удаляются;
+        - непарная закрывающая скобка делает тот же выбор, что и в ДП её участка;
+        - закрывающая скобка с парой j на отрезке получает самую левую из: открывающих скобок того же вида вокруг j
+          с парой правее отрезка, непарных открывающих скобок, которые можно удалить без потерь, и j.
+        Скобки между j и его парой образуют правильную последовательность, поэтому при паре j они пропускаются"""
+        # внешняя парная открывающая скобка для каждой парной скобки
+        parents = [None] * len(values)
+        opened = []
+        for number, partner in enumerate(partners):
+            if partner is None:
+                continue
+            if partner > number:
+                parents[number] = opened[-1] if opened else None
+                opened.append(number)
+            else:
+                opened.pop()
+        places = {}  # номер непарной скобки в residue -> (участок, номер в участке)
+        for window_number, (window, tables, pairs) in enumerate(windows):
+            for local, k in enumerate(window):
+                places[k] = window_number, local
+
+        def removable(k, first, last):
+            """Можно ли удалить непарную скобку k без потерь, если рассматриваются непарные скобки first..last"""
+            window, tables, pairs = windows[places[k][0]]
+            if tables is None:
+                return False
+            columns = tables[0]
+            local = places[k][1]
+            start = max(first - window[0], 0)
+            end = min(last - window[0], len(window) - 1) + 1
+            return columns[local][start] + 1 + columns[end][local + 1] == columns[end][start]
+
+        first_removable = {}
+
+        def find_removable(value, first, last):
+            key = value, first, last
+            if key not in first_removable:
+                first_removable[key] = next((k for k in range(first, last + 1)
+                                             if values[residue[k]] == value and removable(k, first, last)), None)
+            return first_removable[key]
+
+        wrong = []
+        segments = [(0, len(values) - 1)]
+        while segments:
+            l, r = segments.pop()
+            if l > r:
+                continue
+            partner = partners[r]
+            if values[r] not in BracketIndex.PAIRS or partner is not None and partner < l:
+                wrong.append(r)
+                segments.append((l, r - 1))
+                continue
+            if partner is None:
+                window, tables, pairs = windows[places[bisect_left(residue, r)][0]]
+                local = places[bisect_left(residue, r)][1]
+                if tables is not None:
+                    start = max(bisect_left(residue, l) - window[0], 0)
+                    choice = tables[1][local][start]
+                else:
+                    choice = pairs.get(local, -1)
+                    if choice != -1 and residue[window[choice]] < l:
+                        choice = -1
+                if choice == -1:
+                    wrong.append(r)
+                    segments.append((l, r - 1))
+                else:
+                    i = residue[window[choice]]
+                    segments.append((l, i - 1))
+                    segments.append((i + 1, r - 1))
+                continue
+            value = values[partner]
+            i = partner
+            parent = parents[partner]
+            while parent is not None and parent >= l:
+                if values[parent] == value:
+                    i = parent
+                parent = parents[parent]
+            first = bisect_left(residue, l)
+            last = bisect_left(residue, partner) - 1
+            k = find_removable(value, first, last) if first <= last else None
+            if k is not None and residue[k] < i:
+                i = residue[k]
+            if i == partner:
+                segments.append((l, i - 1))
+            else:
+                segments.append((l, i - 1))
+                segments.append((i + 1, r - 1))
+        return wrong
+
+    @staticmethod
+    def _split_into_windows(values):
+        """Разбиение скобок на участки (списки номеров), между которыми не может быть пар"""
+        pairs = BracketIndex.PAIRS
+        last_close = {}
+        for i, value in enumerate(values):
+            if value in pairs:
+                last_close[pairs[value]] = i
+
+        windows = []
+        window_end = -1
+        for i, value in enumerate(values):
+            if i > window_end:
+                windows.append([])
+            windows[-1].append(i)
+            window_end = max(window_end, last_close.get(value, -1))
+        return windows
+
+    @staticmethod
+    def _solve_window_by_dp(values):
+        """То же ДП, что и в _checking_brackets_by_dp, но вместо списков скобок в ячейках хранится выбор
+        (O(N^2) памяти вместо O(N^3)). Возвращает (columns, choice): columns[r][l] - ответ на отрезке [l, r - 1],
+        choice[r][l] - скобка, которая получает в пару скобку r на отрезке [l, r], или -1, если r удаляется.
+        Для одного r все l обрабатываются вместе, поэтому таблицы хранятся по столбцам"""
+        pairs = BracketIndex.PAIRS
+        columns = [[0]]
+        choice = []
+        for r, value in enumerate(values):
+            column = [cost + 1 for cost in columns[r]] + [0]
+            chosen = [-1] * (r + 1)
+            opening = pairs.get(value)
+            if opening is not None:
+                inner = columns[r]
+                for i in range(r):
+                    if values[i] != opening:
+                        continue
+                    # ответ на [l, i - 1] плюс ответ на [i + 1, r - 1]; при равенстве остаётся меньшее i
+                    outer = columns[i]
+                    rest = inner[i + 1]
+                    for l in [l for l in range(i + 1) if outer[l] + rest < column[l]]:
+                        column[l] = outer[l] + rest
+                        chosen[l] = i
+            columns.append(column)
+            choice.append(chosen)
+        return columns, choice
+
+    @staticmethod
+    def _solve_window_by_stack(values):
+        """Жадное решение для больших участков: закрывающая скобка забирает ближайшую парную открывающую
+        из стека, а открывающие скобки над ней считаются лишними. Возвращает пары {закрывающая: открывающая}"""
+        pairs = BracketIndex.PAIRS
+        result = {}
+        stack = []
+        opened = defaultdict(int)
+        for i, value in enumerate(values):
+            if value not in pairs:
+                stack.append(i)
+                opened[value] += 1
+                continue
+            if opened[pairs[value]] == 0:
+                continue
+            while values[stack[-1]] != pairs[value]:
+                opened[values[stack.pop()]] -= 1
+            opened[pairs[value]] -= 1
+            result[i] = stack.pop()
+        return result
@@ -0,0 +1,74 @@
+""" Модуль с автоматическим исправлением стиля """
+import os
+from .tokenizer import Tokenizer
+from .errors_checker import ErrorsChecker
+from .style_profile import StyleProfile
+
+
+class Fixer:
+    """Исправление файлов по настройкам стиля
+
+    Правила, которые умеют исправлять найденное (см. rules.Rule.fix), предлагают правки - замены отрезков исходного
+    кода. Все правки файла собираются за одну проверку и применяются за один проход по исходному тексту (apply),
+    без повторного разбора после каждой правки. Правки, пересекающиеся с уже принятыми, пропускаются - они будут
+    применены следующим запуском. Файлы с ошибками (незакрытые строки, комментарии или скобки) не исправляются:
+    по ним нельзя быть уверенным, где заканчиваются токены"""
+
+    def __init__(self, style, tokenizer=None):
+        self.profile = StyleProfile.of(style)
+        self.tokenizer = tokenizer or Tokenizer()
+
+    def fix_code(self, code):
+        """(исправленный код, количество применённых правок) или (code, None), если в коде есть ошибки"""
+        lines = self.tokenizer.get_lines(code)
+        if ErrorsChecker.checking_for_errors(lines):
+            return code, None
+        edits = []
+        self.profile.check(lines, edits)
+        return self.apply(code, edits)
+
+    def fix_file(self, path):
+        """Исправление файла. Файл перезаписывается (через временный файл), только если он изменился.
+        Возвращает количество применённых правок или None, если в файле есть ошибки"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        code = data.decode('utf-8')
+        # переводы строк \r\n сохраняются, а правила проверяют код с \n, как при обычной проверке
+        newline = '\r\n' if code.count('\r\n') == code.count('\n') > 0 else '\n'
+        if newline != '\n':
+            code = code.replace(newline, '\n')
+        fixed, applied = self.fix_code(code)
+        if not applied:
+            return applied
+        fixed_data = fixed.replace('\n', newline).encode('utf-8')
+        if fixed_data != data:
+            self._write(path, fixed_data)
+        return applied
+
+    @staticmethod
+    def apply(code, edits):
+        """Применение правок (start, end, text) к коду за один проход. Правки упорядочиваются по позиции,
+        правка, пересекающаяся с уже принятой (или вставка в то же место), пропускается.
+        Возвращает (код, количество применённых правок)"""
+        parts = []
+        position = 0
+        last_insert = -1
+        applied = 0
+        for start, end, text in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+            if start < position or start == end == last_insert:
+                continue
+            parts.append(code[position:start])
+            parts.append(text)
+            position = end
+            last_insert = start if start == end else -1
+            applied += 1
+        parts.append(code[position:])
+        return ''.join(parts), applied
+
+    @staticmethod
+    def _write(path, data):
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(temp_path, path)
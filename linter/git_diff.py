@@ -0,0 +1,109 @@
+""" Модуль с поиском изменённых файлов и строк в git репозитории """
+import os
+import re
+import subprocess
+
+
+class GitError(Exception):
+    """Ошибка при вызове git (нет git, папка не в репозитории, неизвестная ревизия и т.п.)"""
+
+
+class GitDiff:
+    """Изменённые .cs файлы и номера добавленных или изменённых в них строк
+
+    rev - ревизия, с которой сравниваются файлы (например, HEAD или origin/main), staged - сравнивать индекс
+    (то, что будет в коммите), а не рабочую папку. Изменения всех файлов получаются одним вызовом git diff,
+    а при staged содержимое файлов из индекса читается одним вызовом git cat-file --batch (contents), потому что
+    в рабочей папке файл может отличаться от того, что попадёт в коммит. Пути - относительно текущей папки"""
+    HUNK = re.compile(r'@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+    # экранирование в путях, которые git выводит в кавычках
+    ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v', '"': '"', '\\': '\\'}
+
+    def __init__(self, rev=None, staged=False, pathspecs=(), cwd='.'):
+        self.root = self._git(['rev-parse', '--show-toplevel'], cwd).decode('utf-8').strip()
+        command = ['-c', 'core.quotepath=off', 'diff', '--no-color', '--no-ext-diff', '--unified=0',
+                   '--diff-filter=d', '--src-prefix=a/', '--dst-prefix=b/']
+        if staged:
+            command.append('--cached')
+        if rev is not None:
+            command.append(rev)
+        command.append('--')
+        command.extend(pathspecs)
+        changes = self.parse(self._git(command, cwd).decode('utf-8', 'replace'))
+        # пути в выводе git - относительно корня репозитория
+        self.changes = {os.path.relpath(os.path.join(self.root, path), cwd): rows
+                        for path, rows in changes.items() if path.endswith('.cs') and rows}
+        self.contents = {}
+        if staged:
+            names = [os.path.relpath(os.path.join(cwd, path), self.root).replace(os.sep, '/')
+                     for path in self.changes]
+            self.contents = dict(zip(self.changes, self._read_index(names)))
+
+    @staticmethod
+    def parse(diff):
+        """{путь: множество номеров строк} по выводу git diff --unified=0. Файлы, где строки только удалены,
+        получают пустое множество"""
+        changes = {}
+        rows = None
+        in_header = False  # заголовок файла: от 'diff --git' до первого фрагмента
+        for line in diff.split('\n'):
+            if line.startswith('diff --git '):
+                in_header = True
+                rows = None
+            elif in_header and line.startswith('+++ '):
+                path = GitDiff._unquote(line[4:])
+                rows = None if path == '/dev/null' else changes.setdefault(path[2:], set())
+            elif line.startswith('@@ ') and rows is not None:
+                in_header = False
+                match = GitDiff.HUNK.match(line)
+                start, count = int(match.group(1)), int(match.group(2) or 1)
+                rows.update(range(start, start + count))
+        return changes
+
+    @staticmethod
+    def _unquote(path):
+        if not path.startswith('"'):
+            return path.rstrip('\t')
+        # "b/\320\270\t.cs": восьмеричные коды - байты UTF-8
+        data = bytearray()
+        i = 1
+        while i < len(path) - 1:
+            symbol = path[i]
+            if symbol == '\\' and path[i + 1] in GitDiff.ESCAPES:
+                data.extend(GitDiff.ESCAPES[path[i + 1]].encode('utf-8'))
+                i += 2
+            elif symbol == '\\':
+                data.append(int(path[i + 1:i + 4], 8))
+                i += 4
+            else:
+                data.extend(symbol.encode('utf-8'))
+                i += 1
+        return data.decode('utf-8', 'replace')
+
+    def _read_index(self, names):
+        """Содержимое файлов из индекса (bytes) в порядке names"""
+        if not names:
+            return []
+        output = self._git(['cat-file', '--batch'], self.root, ''.join(f':{name}\n' for name in names).encode())
+        contents = []
+        position = 0
+        for name in names:
+            end = output.index(b'\n', position)
+            header = output[position:end].split()
+            if len(header) != 3:
+                raise GitError(f'cannot read "{name}" from the index')
+            size = int(header[2])
+            contents.append(output[end + 1:end + 1 + size])
+            position = end + 1 + size + 1
+        return contents
+
+    @staticmethod
+    def _git(arguments, cwd, input=None):
+        try:
+            process = subprocess.run(['git'] + arguments, cwd=cwd, input=input,
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as error:
+            raise GitError(f'cannot run git: {error}')
+        if process.returncode != 0:
+            raise GitError(process.stderr.decode('utf-8', 'replace').strip() or f'git {arguments[0]} failed')
+        return process.stdout
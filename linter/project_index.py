@@ -0,0 +1,217 @@
+""" Модуль с индексом имён всего проекта """
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .tokenizer import Tokenizer, TokenType
+from .code_analyzer import CodeModel
+from .cpu_count import CpuCount
+
+
+class ProjectIndex:
+    """Индекс имён всех .cs файлов проекта
+
+    Для каждого файла хранится сводка (см. summarize): хэш содержимого, объявленные методы, количество вхождений
+    каждого идентификатора и имена, на которые ссылаются тела методов. Сводки файлов не зависят друг от друга и
+    строятся параллельно в отдельных процессах (map), а общие счётчики складываются из сводок (reduce), поэтому
+    при изменении файла пересчитывается только его сводка. Имена не различают классы и перегрузки: метод
+    используется, если его имя встречается в проекте не только в объявлениях методов"""
+    FORMAT_VERSION = 1
+    FILE_NAME = '.linter_index.json'
+    ENTRY_POINTS = ('Main',)
+    # при меньшем количестве файлов сводки строятся без запуска процессов
+    PARALLEL_THRESHOLD = 8
+
+    def __init__(self):
+        self.files = {}  # путь -> сводка файла
+        self.definitions = {}  # имя метода -> количество объявлений в проекте
+        self.references = {}  # идентификатор -> количество вхождений в проекте
+        self._graph = None
+
+    @staticmethod
+    def summarize(code):
+        """Сводка файла: методы [имя, строка], вхождения идентификаторов, имена из тела каждого метода и имена
+        вне тел методов (код вне методов, например инициализаторы полей, считается достижимым всегда)"""
+        model = CodeModel.of(Tokenizer().get_lines(code))
+        tokens = model.tokens
+        identifier = TokenType.Identifier
+
+        def names(begin, end):
+            return {token.value for token in tokens[begin:end] if token.token_type is identifier}
+
+        references = {}
+        for token in tokens:
+            if token.token_type is identifier:
+                references[token.value] = references.get(token.value, 0) + 1
+        methods = []
+        calls = {}
+        outside = set()
+        position = 0
+        for function in model.functions:
+            name = function.name_token.value
+            # имя метода и его аргументы - объявление, а не ссылка
+            outside |= names(position, function.begin_arguments_pos - 2)
+            methods.append([name, function.name_token.row])
+            calls.setdefault(name, set()).update(names(function.begin_body_pos, function.end_body_pos))
+            position = function.end_body_pos + 1
+        outside |= names(position, len(tokens))
+        return {'methods': methods,
+                'references': references,
+                'calls': {name: sorted(values) for name, values in calls.items()},
+                'outside': sorted(outside)}
+
+    def update(self, paths, jobs=None):
+        """Приведение индекса к списку файлов: новые и изменённые файлы разбираются заново (параллельно,
+        jobs - количество процессов), сводки файлов, которых нет в списке, удаляются.
+        Возвращает количество разобранных файлов"""
+        paths = sorted({os.path.normpath(path) for path in paths})
+        for path in set(self.files) - set(paths):
+            self._remove(path)
+
+        changed = []
+        for path in paths:
+            code, digest = self._read(path)
+            if path not in self.files or self.files[path]['hash'] != digest:
+                changed.append((path, code, digest))
+        summaries = self._map([code for path, code, digest in changed], jobs)
+        for (path, code, digest), summary in zip(changed, summaries):
+            summary['hash'] = digest
+            self._remove(path)
+            self._add(path, summary)
+        return len(changed)
+
+    def update_file(self, path, code=None):
+        """Обновление сводки одного файла (code - новое содержимое, по умолчанию файл читается с диска).
+        Возвращает False, если содержимое не изменилось"""
+        path = os.path.normpath(path)
+        if code is None:
+            code, digest = self._read(path)
+        else:
+            digest = self._hash(code.encode('utf-8'))
+        if path in self.files and self.files[path]['hash'] == digest:
+            return False
+        summary = self.summarize(code)
+        summary['hash'] = digest
+        self._remove(path)
+        self._add(path, summary)
+        return True
+
+    def remove_file(self, path):
+        self._remove(os.path.normpath(path))
+
+    def is_referenced(self, name):
+        """Встречается ли имя в проекте где-то кроме объявлений методов"""
+        return self.references.get(name, 0) > self.definitions.get(name, 0)
+
+    def has_entry_point(self, entry_points=ENTRY_POINTS):
+        return any(name in self.definitions for name in entry_points)
+
+    def reachable(self, entry_points=ENTRY_POINTS):
+        """Имена методов, достижимых из точек входа и из кода вне методов по ссылкам из тел методов"""
+        graph, outside = self._call_graph()
+        seen = set()
+        stack = [name for name in entry_points if name in self.definitions]
+        stack.extend(outside)
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            stack.extend(graph.get(name, ()))
+        return {name for name in seen if name in self.definitions}
+
+    def digest(self):
+        """Хэш содержимого всех файлов индекса: меняется, если изменился, появился или удалён любой файл"""
+        digest = hashlib.sha1()
+        for path in sorted(self.files):
+            digest.update(f'{path}\0{self.files[path]["hash"]}\0'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def save(self, path):
+        """Запись индекса на диск (через временный файл, чтобы не оставить недописанный индекс)"""
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.FORMAT_VERSION, 'files': self.files}, f)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def load(path):
+        """Индекс, сохранённый через save. Если файла нет или он другой версии, индекс пустой"""
+        index = ProjectIndex()
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if not isinstance(data, dict) or data.get('version') != ProjectIndex.FORMAT_VERSION:
+            return index
+        for file_path, summary in data['files'].items():
+            index._add(file_path, summary)
+        return index
+
+    @staticmethod
+    def open(root, jobs=None):
+        """Индекс проекта в папке root: загружается из root/FILE_NAME, обновляется по .cs файлам и сохраняется"""
+        path = os.path.join(root, ProjectIndex.FILE_NAME)
+        index = ProjectIndex.load(path)
+        if index.update(ProjectIndex.find_sources(root), jobs) > 0 or not os.path.exists(path):
+            index.save(path)
+        return index
+
+    @staticmethod
+    def find_sources(root):
+        """Все .cs файлы в папке root (скрытые папки пропускаются)"""
+        sources = []
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = sorted(name for name in subdirectories if not name.startswith('.'))
+            sources.extend(os.path.join(directory, name) for name in sorted(files) if name.endswith('.cs'))
+        return sources
+
+    def _map(self, codes, jobs):
+        if jobs == 1 or len(codes) < self.PARALLEL_THRESHOLD:
+            return [self.summarize(code) for code in codes]
+        jobs = jobs or CpuCount.available()
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(ProjectIndex.summarize, codes, chunksize=max(1, len(codes) // (jobs * 4))))
+
+    def _add(self, path, summary):
+        self.files[path] = summary
+        for name, count in summary['references'].items():
+            self.references[name] = self.references.get(name, 0) + count
+        for name, row in summary['methods']:
+            self.definitions[name] = self.definitions.get(name, 0) + 1
+        self._graph = None
+
+    def _remove(self, path):
+        summary = self.files.pop(path, None)
+        if summary is None:
+            return
+        for counts, names in ((self.references, summary['references'].items()),
+                              (self.definitions, ((name, 1) for name, row in summary['methods']))):
+            for name, count in names:
+                counts[name] -= count
+                if counts[name] == 0:
+                    del counts[name]
+        self._graph = None
+
+    def _call_graph(self):
+        """(имя метода -> имена из тел всех методов с этим именем, имена вне тел методов)"""
+        if self._graph is None:
+            graph = {}
+            outside = set()
+            for summary in self.files.values():
+                for name, values in summary['calls'].items():
+                    graph.setdefault(name, set()).update(values)
+                outside.update(summary['outside'])
+            self._graph = graph, outside
+        return self._graph
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        return data.decode('utf-8', errors='replace'), ProjectIndex._hash(data)
+
+    @staticmethod
+    def _hash(data):
+        return hashlib.sha1(data).hexdigest()
@@ -0,0 +1,148 @@
+""" Модуль с выводом результатов проверки в разных форматах """
+import json
+import os
+from .diagnostic import Diagnostic
+
+
+class Reporter:
+    """Вывод результатов проверки файлов по мере их получения
+
+    report вызывается для каждого файла сразу после его проверки и записывает результат в output, поэтому в памяти
+    не копятся результаты всех файлов. Результат файла - строки, как в Stylecheck.check (или Stylecheck.check_stream);
+    форматы для машинной обработки получают из них диагностики (см. diagnostics)"""
+    # раздел результата -> (правило, уровень) или None, если раздел не содержит замечаний
+    SECTIONS = {'ERRORS': ('errors', 'error'),
+                'UNUSED VARIABLES': ('unused_objects', 'warning'),
+                'UNREACHABLE METHODS': ('unreachable_methods', 'warning'),
+                'CYCLOMATIC COMPLEXITY': None}
+
+    def __init__(self, output, style):
+        """output - открытый текстовый файл, style - путь к .style файлу"""
+        self.output = output
+        self.style = style
+        self.files = 0
+
+    def start(self):
+        pass
+
+    def report(self, path, result):
+        self.files += 1
+
+    def finish(self):
+        pass
+
+    @staticmethod
+    def create(name, output, style):
+        return FORMATS[name](output, style)
+
+    @staticmethod
+    def diagnostics(path, result):
+        """Замечания из строк результата: словари file, line, column, rule, level, message. Строка, столбец,
+        правило и текст берутся из замечания (Diagnostic); строки результата без них (например, из кэша другой
+        версии) разбираются как 'Line N[, column M]: ...', а чего нет в тексте - None. Правило, если его нет
+        в замечании, - раздел результата (настройка из .style файла или раздел дополнительной информации);
+        цикломатическая сложность замечанием не считается"""
+        in_banner = False
+        section = ('linter', 'error')  # до первого раздела - сообщения о файле в целом
+        for line in result:
+            if line.startswith('####'):
+                in_banner = not in_banner
+                section = None
+                continue
+            if in_banner or not line:
+                continue
+            if line.startswith('--- ') and line.endswith(' ---'):
+                name = line[4:-4]
+                section = Reporter.SECTIONS[name] if name in Reporter.SECTIONS else (name, 'warning')
+                continue
+            if line.startswith('Total errors: '):
+                section = None
+                continue
+            if section is None:
+                continue
+            diagnostic = Diagnostic.parse(line)
+            if diagnostic is None:
+                yield {'file': path, 'line': None, 'column': None, 'rule': section[0], 'level': section[1],
+                       'message': line}
+                continue
+            yield {'file': path,
+                   'line': diagnostic.row,
+                   'column': diagnostic.column,
+                   'rule': diagnostic.rule or section[0],
+                   'level': section[1],
+                   'message': diagnostic.message}
+
+
+class TextReporter(Reporter):
+    """Текстовый отчёт (как в result.txt): для каждого файла - заголовок и все строки результата"""
+
+    def report(self, path, result):
+        if self.files > 0:
+            self.output.write('\n\n')
+        super().report(path, result)
+        self.output.write(f'Your file: "{path}"\n')
+        self.output.write(f'Your style: "{self.style}"\n\n')
+        # строки записываются по мере получения (результат может выдаваться построчно, см. Stylecheck.check_stream)
+        separator = ''
+        for line in result:
+            self.output.write(separator + line)
+            separator = '\n'
+        self.output.flush()
+
+
+class JsonLinesReporter(Reporter):
+    """JSON Lines: одна строка с объектом JSON на каждое замечание"""
+
+    def report(self, path, result):
+        super().report(path, result)
+        for diagnostic in self.diagnostics(path, result):
+            self.output.write(json.dumps(diagnostic, ensure_ascii=False) + '\n')
+        self.output.flush()
+
+
+class SarifReporter(Reporter):
+    """SARIF 2.1.0 (формат, который понимают системы CI). Документ пишется по частям: заголовок в start,
+    замечания каждого файла в report, окончание в finish"""
+    SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+    TOOL = 'linter-cs'
+
+    def __init__(self, output, style):
+        super().__init__(output, style)
+        self.results = 0
+
+    def start(self):
+        header = json.dumps({'version': '2.1.0', '$schema': self.SCHEMA,
+                             'runs': [{'tool': {'driver': {'name': self.TOOL}},
+                                       'properties': {'style': self.style},
+                                       'results': []}]})
+        # всё до закрывающих скобок массива results
+        self.output.write(header[:-len(']}]}')])
+
+    def report(self, path, result):
+        super().report(path, result)
+        uri = path.replace(os.sep, '/')
+        for diagnostic in self.diagnostics(path, result):
+            location = {'artifactLocation': {'uri': uri}}
+            if diagnostic['line'] is not None:
+                location['region'] = {'startLine': diagnostic['line']}
+                if diagnostic['column'] is not None:
+                    location['region']['startColumn'] = diagnostic['column']
+            sarif_result = {'ruleId': diagnostic['rule'],
+                            'level': diagnostic['level'],
+                            'message': {'text': diagnostic['message']},
+                            'locations': [{'physicalLocation': location}]}
+            self.output.write((',\n' if self.results > 0 else '\n') + json.dumps(sarif_result, ensure_ascii=False))
+            self.results += 1
+        self.output.flush()
+
+    def finish(self):
+        self.output.write('\n]}]}\n')
+        self.output.flush()
+
+
+# формат для --format -> класс отчёта
+FORMATS = {
+    'text': TextReporter,
+    'jsonl': JsonLinesReporter,
+    'sarif': SarifReporter,
+}
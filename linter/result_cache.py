@@ -0,0 +1,119 @@
+""" Модуль с кэшем результатов проверки на диске """
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+
+class ResultCache:
+    """Результаты проверки файлов, сохранённые на диске по хэшу содержимого
+
+    Ключ - хэш содержимого файла вместе с хэшем настроек стиля (StyleProfile.digest), версией линтера (хэш
+    исходного кода пакета linter, см. linter_version) и всем остальным, от чего зависит результат (например,
+    хэш индекса проекта). Каждый результат - отдельный файл в папке кэша, который записывается через временный
+    файл, поэтому кэш можно использовать из нескольких процессов одновременно: читатель видит либо целый
+    результат, либо никакого. Время изменения файла обновляется при каждом чтении, и prune удаляет давно не
+    использованные результаты, пока кэш не станет меньше max_size байт"""
+    DEFAULT_SIZE = 100 * 1024 * 1024
+    # файлы, которые пишет сам кэш (см. _path и put): папка - первые 2 символа ключа, в ней - результаты
+    # и оставшиеся после сбоев временные файлы. Остальные файлы в папке кэша prune не трогает
+    DIRECTORY = re.compile(r'[0-9a-f]{2}')
+    ENTRY = re.compile(r'[0-9a-f]{38}\.json|tmp\w+\.tmp')
+    _version = None
+
+    def __init__(self, directory, max_size=DEFAULT_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data, *parts):
+        """Ключ для содержимого файла data (bytes) и строк parts, от которых зависит результат"""
+        digest = hashlib.blake2b(digest_size=20)
+        for part in (ResultCache.linter_version(),) + parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def linter_version():
+        """Хэш исходного кода пакета linter: после любого изменения линтера старые результаты не используются"""
+        if ResultCache._version is None:
+            digest = hashlib.blake2b(digest_size=20)
+            package = os.path.dirname(os.path.abspath(__file__))
+            for name in sorted(os.listdir(package)):
+                if name.endswith('.py'):
+                    with open(os.path.join(package, name), 'rb') as f:
+                        digest.update(name.encode('utf-8') + b'\0' + f.read())
+            ResultCache._version = digest.hexdigest()
+        return ResultCache._version
+
+    def get(self, key):
+        """Сохранённый результат или None"""
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = json.load(f)
+            # время изменения - время последнего использования (для prune)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Сохранение результата (value должен записываться в JSON)"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='tmp', suffix='.tmp')
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(temp_path, path)
+        except OSError:
+            # без кэша проверка всё равно работает
+            pass
+
+    def prune(self):
+        """Удаление давно не использованных результатов, пока размер кэша больше max_size. Считаются и удаляются
+        только файлы, записанные кэшем (DIRECTORY, ENTRY). Возвращает количество удалённых результатов"""
+        entries = []
+        total = 0
+        for directory in self._scan(self.directory, self.DIRECTORY):
+            if not directory.is_dir(follow_symlinks=False):
+                continue
+            for entry in self._scan(directory.path, self.ENTRY):
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+                total += stat.st_size
+        removed = 0
+        for mtime, path, size in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            total -= size
+        return removed
+
+    @staticmethod
+    def _scan(directory, pattern):
+        try:
+            with os.scandir(directory) as entries:
+                return [entry for entry in entries if pattern.fullmatch(entry.name)]
+        except OSError:
+            return []
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + '.json')
@@ -0,0 +1,497 @@
+""" Модуль с правилами стиля, которые проверяются за один общий проход по токенам """
+import bisect
+from array import array
+import re
+import time
+from . import tokenizer
+from .diagnostic import Diagnostic
+
+SPACE = tokenizer.TokenType.Space.value
+SYMBOL = tokenizer.TokenType.Symbol.value
+KEYWORD = tokenizer.TokenType.Keyword.value
+IDENTIFIER = tokenizer.TokenType.Identifier.value
+OPERATION = tokenizer.TokenType.Operation.value
+COMMENT = tokenizer.TokenType.Comment.value
+
+
+class RuleEngine:
+    """Проверка нескольких настроек за один проход по строкам и токенам файла
+
+    Правило (Rule) сообщает, какие токены ему нужны (коды типов и, если нужно, значения) и нужны ли ему строки,
+    а движок при проходе вызывает visit_token для подходящих токенов строки и затем visit_line для неё. Поэтому
+    стоимость проверки файла - один проход по токенам, а не по проходу на каждую настройку. Настройки, для которых
+    правила нет (например, indent_style_and_size или новые функции в Settings), вызываются как обычно -
+    settings.<настройка>(*аргументы, lines)"""
+
+    def __init__(self, settings, rules):
+        """rules - пары (настройка, список аргументов). Классы правил и методы Settings находятся здесь один раз,
+        после чего движок можно применять к любому количеству файлов"""
+        self.settings = settings
+        self.rules = [(name, RULES.get(name), args) for name, args in rules]
+        self.fallbacks = {name: getattr(settings, name) for name, rule, args in self.rules if rule is None}
+
+    def run(self, lines, edits=None, rows=None, timings=None, diagnostics=False):
+        """{настройка: сообщения} в порядке self.rules. Если передан список edits, в него добавляются
+        исправления правил (start, end, text) в порядке настроек. Сообщения - строки 'Line N: ...', а если
+        diagnostics - замечания (Diagnostic) со столбцом и настройкой (для отчётов о проверке файла)
+
+        rows - множество номеров строк файла (как в сообщениях, с 1), например изменённые строки: тогда остаются
+        только сообщения об этих строках, а правила без состояния между строками (Rule.STATELESS) проверяют только
+        строки, в которые они попадают. timings - словарь {настройка: секунды}, к которому прибавляется время
+        каждой настройки; для замера каждая настройка проверяется своим проходом, результат тот же"""
+        if timings is not None:
+            result = {}
+            for name, rule, args in self.rules:
+                begin = time.perf_counter()
+                engine = RuleEngine(self.settings, [(name, args)])
+                result.update(engine.run(lines, edits, rows, diagnostics=diagnostics))
+                timings[name] = timings.get(name, 0) + time.perf_counter() - begin
+            return result
+        view = tokenizer.Lines.of(lines)
+        visitors = {}
+        # ([visit_line], {код типа токена -> ([visit_token для всех значений], {значение: [visit_token]})})
+        every_line = ([], {})
+        selected_lines = ([], {})
+        for name, rule, args in self.rules:
+            if rule is None:
+                continue
+            visitor = rule(view, *args)
+            visitor.rule = name
+            visitors[name] = visitor
+            line_visitors, handlers = selected_lines if rows is not None and visitor.STATELESS else every_line
+            if visitor.lines:
+                line_visitors.append(visitor.visit_line)
+            for token_code in visitor.token_types:
+                any_value, by_value = handlers.setdefault(token_code, ([], {}))
+                if visitor.values is None:
+                    any_value.append(visitor.visit_token)
+                else:
+                    for value in visitor.values:
+                        by_value.setdefault(value, []).append(visitor.visit_token)
+
+        if any(every_line):
+            self._traverse(view, *every_line)
+        if any(selected_lines):
+            self._traverse(view, *selected_lines, self.line_numbers(view, rows))
+
+        result = {}
+        for name, rule, args in self.rules:
+            if rule is None:
+                result[name] = self.fallbacks[name](*args, lines)
+                if diagnostics:
+                    result[name] = [Diagnostic.parse(message, name) or message for message in result[name]]
+            else:
+                result[name] = visitors[name].diagnostics() if diagnostics else visitors[name].messages
+                if edits is not None:
+                    edits.extend(visitors[name].edits)
+            if rows is not None:
+                result[name] = self.select(result[name], rows)
+        return result
+
+    @staticmethod
+    def line_numbers(lines, rows):
+        """Номера строк Lines (по возрастанию), в которые попадают строки файла rows. Строка Lines может занимать
+        несколько строк файла (например, с многострочным комментарием)"""
+        first_rows = [lines.row(line) for line in range(len(lines))]
+        return sorted({bisect.bisect_right(first_rows, row) - 1 for row in rows
+                       if first_rows and row >= first_rows[0]})
+
+    @staticmethod
+    def select(messages, rows):
+        """Сообщения об отдельных строках (Diagnostic или 'Line N: ...'), если их строка есть в rows, и все сообщения
+        о файле в целом"""
+        selected = []
+        for message in messages:
+            diagnostic = Diagnostic.parse(message)
+            if diagnostic is None or diagnostic.row in rows:
+                selected.append(message)
+        return selected
+
+    @staticmethod
+    def _traverse(lines, line_visitors, handlers, line_numbers=None):
+        stream = lines.stream
+        code, starts, ends, types, offsets = stream.code, stream.starts, stream.ends, stream.types, stream.line_offsets
+        # обработчики по коду типа, для кодов без обработчиков - None
+        table = [handlers.get(token_code) for token_code in range(256)]
+        for line in range(len(lines)) if line_numbers is None else line_numbers:
+            if handlers:
+                for i in range(offsets[line], offsets[line + 1]):
+                    token_handlers = table[types[i]]
+                    if token_handlers is None:
+                        continue
+                    any_value, by_value = token_handlers
+                    for visit_token in any_value:
+                        visit_token(i, line)
+                    if by_value:
+                        for visit_token in by_value.get(code[starts[i]:ends[i]], ()):
+                            visit_token(i, line)
+            for visit_line in line_visitors:
+                visit_line(line)
+
+
+class Rule:
+    """Правило для RuleEngine: token_types - коды типов токенов, для которых вызывается visit_token(i, line)
+    (values - если задано, только для токенов с этими значениями), lines - вызывать ли visit_line(line) для
+    каждой строки после её токенов. i - индекс токена в потоке, line - номер строки. Сообщения собираются
+    в messages, а их строки и столбцы - отдельно, в rows и columns (см. add_message, diagnostics), исправления,
+    если правило умеет исправлять найденное, - в edits (см. fix). STATELESS - правило не переносит состояние
+    с одной строки на другую, и его можно применять только к части строк"""
+    TOKEN_TYPES = ()
+    VALUES = None
+    LINES = False
+    STATELESS = True
+
+    def __init__(self, lines, enabled=True):
+        self.view = lines
+        self.stream = lines.stream
+        self.messages = []
+        # место каждого сообщения; столбец 0 - неизвестен. Массивы вместо объекта на каждое сообщение: правило
+        # может выдать сообщение почти на каждую строку файла
+        self.rows = array('I')
+        self.columns = array('I')
+        self.edits = []
+        # настройка, которую проверяет правило (задаёт RuleEngine)
+        self.rule = None
+        self.token_types = self.TOKEN_TYPES if enabled else ()
+        self.values = self.VALUES
+        self.lines = self.LINES and enabled
+
+    def visit_line(self, line):
+        pass
+
+    def visit_token(self, i, line):
+        pass
+
+    def report(self, i, message, row=None):
+        """Замечание о токене i. row - строка в тексте замечания, если это не строка токена (например, первая
+        строка Lines); тогда столбец токена указывается, только если он в этой строке"""
+        stream = self.stream
+        column = stream.columns[i]
+        if row is None:
+            row = stream.rows[i]
+        elif row != stream.rows[i]:
+            column = None
+        self.add_message(row, column, message)
+
+    def add_message(self, row, column, message):
+        """Сообщение 'Line row: message' о строке row (column - столбец или None)"""
+        self.messages.append(f'Line {row}: {message}')
+        self.rows.append(row)
+        self.columns.append(column or 0)
+
+    def diagnostics(self):
+        """Сообщения в виде замечаний (Diagnostic)"""
+        return [Diagnostic(row, column or None, text[text.index(': ') + 2:], self.rule)
+                for text, row, column in zip(self.messages, self.rows, self.columns)]
+
+    def fix(self, start, end, text):
+        """Исправление: замена кода с позиции start до end (позиции символов в stream.code) на text"""
+        self.edits.append((start, end, text))
+
+
+class MaxLineLength(Rule):
+    LINES = True
+
+    def __init__(self, lines, max_length):
+        super().__init__(lines)
+        self.max_length = max_length
+        stream = self.stream
+        # обычно токены идут в коде подряд, и длина строки - расстояние от начала первого токена до конца последнего
+        self.contiguous = len(stream) > 0 and stream.starts[0] == 0 and \
+            sum(stream.ends) - sum(stream.starts) == len(stream.code)
+        # начала строк кода (stream.row_offsets) совпадают с местами токенов - тогда строки, в которых есть
+        # многострочная константа или комментарий, измеряются по строкам кода (см. _check_rows)
+        last = len(stream) - 1
+        self.by_rows = self.contiguous and stream.position(stream.starts[last]) == (stream.rows[last],
+                                                                                    stream.columns[last])
+        self.last_row = len(stream.row_offsets) - 1
+
+    def visit_line(self, line):
+        stream, offsets = self.stream, self.stream.line_offsets
+        begin, end = offsets[line], offsets[line + 1]
+        if self.contiguous:
+            start, stop = stream.starts[begin], stream.ends[end - 1]
+            if self.by_rows:
+                k = stream.rows[begin] - stream.first_row
+                if start != stream.row_offsets[k] or k < self.last_row and stop > stream.row_offsets[k + 1]:
+                    # многострочная константа или комментарий - один токен в строке, где он начинается, поэтому
+                    # строка может занимать несколько строк кода, а начинаться - в середине строки кода
+                    self._check_rows(k if start == stream.row_offsets[k] else k + 1, stop)
+                    return
+            count_symbols = stop - start
+        else:
+            count_symbols = sum(stream.ends[begin:end]) - sum(stream.starts[begin:end])
+        if stream.is_newline(end - 1):
+            count_symbols -= 1
+        if count_symbols > self.max_length:
+            # столбец - первый символ сверх max_length
+            column = stream.columns[begin] + self.max_length if self.contiguous else None
+            self.add_message(
+                stream.rows[begin], column,
+                f'the number of characters in the line has been exceeded ({count_symbols} > {self.max_length})')
+
+    def _check_rows(self, k, stop):
+        """Проверка строк кода, которые начинаются в строке (с k-й по stream.row_offsets) до позиции stop.
+        Длина строки кода - расстояние до начала следующей без перевода строки"""
+        stream = self.stream
+        row_offsets = stream.row_offsets
+        while k < len(row_offsets) and row_offsets[k] < stop:
+            row_end = row_offsets[k + 1] - 1 if k < self.last_row else len(stream.code)
+            count_symbols = row_end - row_offsets[k]
+            if count_symbols > self.max_length:
+                self.add_message(
+                    k + stream.first_row, self.max_length + 1,
+                    f'the number of characters in the line has been exceeded ({count_symbols} > {self.max_length})')
+            k += 1
+
+
+class AllowTrailingWhitespace(Rule):
+    LINES = True
+
+    def visit_line(self, line):
+        stream, offsets = self.stream, self.stream.line_offsets
+        begin, end = offsets[line], offsets[line + 1]
+        if end - begin == 1: return
+        if stream.types[end - 2] == SPACE and stream.is_newline(end - 1):
+            self.report(end - 2, "don't expected spaces in the end of line", stream.rows[begin])
+            self.fix(stream.starts[end - 2], stream.ends[end - 2], '')
+
+
+class TrimWhitespace(Rule):
+    TOKEN_TYPES = (SPACE,)
+
+    def visit_token(self, i, line):
+        stream = self.stream
+        if stream.ends[i] - stream.starts[i] != 1 and stream.line_offsets[line] != i:
+            value = stream.value(i)
+            self.report(i, f"expected \' \'. Actual: \'{value}\'")
+            # перевод строки не заменяется
+            if '\n' not in value and '\r' not in value:
+                self.fix(stream.starts[i], stream.ends[i], ' ')
+
+
+class SpaceAfter(Rule):
+    """Пробел после символа SYMBOL_VALUE"""
+    TOKEN_TYPES = (SYMBOL,)
+    SYMBOL_VALUE = None
+
+    def __init__(self, lines, value):
+        super().__init__(lines, value)
+        self.values = {self.SYMBOL_VALUE}
+
+    def visit_token(self, i, line):
+        stream = self.stream
+        if i + 1 < stream.line_offsets[line + 1] and stream.types[i + 1] != SPACE:
+            self.report(i, f"expected space after \'{self.SYMBOL_VALUE}\'")
+            self.fix(stream.ends[i], stream.ends[i], ' ')
+
+
+class SpaceBefore(SpaceAfter):
+    """Пробел перед символом SYMBOL_VALUE"""
+
+    def visit_token(self, i, line):
+        stream = self.stream
+        if i - 1 >= stream.line_offsets[line] and stream.types[i - 1] != SPACE:
+            self.report(i, f"expected space before \'{self.SYMBOL_VALUE}\'", stream.rows[i - 1])
+            self.fix(stream.starts[i], stream.starts[i], ' ')
+
+
+class SpaceAfterComma(SpaceAfter):
+    SYMBOL_VALUE = ','
+
+
+class SpaceBeforeComma(SpaceBefore):
+    SYMBOL_VALUE = ','
+
+
+class SpaceAfterColon(SpaceAfter):
+    SYMBOL_VALUE = ':'
+
+
+class SpaceBeforeColon(SpaceBefore):
+    SYMBOL_VALUE = ':'
+
+
+class LineRule(Rule):
+    """Правило, которое проверяет один раз каждую строку, где есть подходящий токен (check_line; i - первый такой
+    токен строки)"""
+
+    def __init__(self, lines, value):
+        super().__init__(lines, value)
+        self.last_line = -1
+
+    def visit_token(self, i, line):
+        if line != self.last_line:
+            self.last_line = line
+            self.check_line(line, i)
+
+    def check_line(self, line, i):
+        pass
+
+
+class NewlineAfterOpenBrace(LineRule):
+    TOKEN_TYPES = (SYMBOL,)
+    VALUES = {'{'}
+
+    def check_line(self, line, i):
+        if not self.view.contains(line, SYMBOL, '}') and self.view.count_not_spaces(line) != 1:
+            self.report(i, 'expected newline before \'{\'', self.view.row(line))
+
+
+class NewlineBeforeCloseBrace(LineRule):
+    TOKEN_TYPES = (SYMBOL,)
+    VALUES = {'}'}
+
+    def check_line(self, line, i):
+        if self.view.count_not_spaces(line) != 1 and not self.view.contains(line, SYMBOL, '{'):
+            self.report(i, 'expected newline before \'}\'', self.view.row(line))
+
+
+class AlwaysUseBraces(LineRule):
+    TOKEN_TYPES = (KEYWORD,)
+    VALUES = {"if", "else", "for", "foreach", "while", "do", "switch", "try", "catch", "finally", "lock"}
+
+    def check_line(self, line, i):
+        view = self.view
+        if line < len(view) - 1 and not view.contains(line, SYMBOL, '{') and not view.contains(line + 1, SYMBOL, '{'):
+            self.report(i, 'expected \'{\'', view.row(line))
+
+
+class NewlineBeforeReturn(Rule):
+    LINES = True
+    # считает пустые строки перед return
+    STATELESS = False
+
+    def __init__(self, lines, value):
+        super().__init__(lines)
+        self.value = int(value)
+        self.empty_line_count = 0
+
+    def visit_line(self, line):
+        stream, offsets, types = self.stream, self.stream.line_offsets, self.stream.types
+        begin, end = offsets[line], offsets[line + 1]
+        if types.count(SPACE, begin, end) == end - begin:
+            self.empty_line_count += 1
+            return
+        for j in range(begin, end):
+            if (types[j] == KEYWORD or types[j] == IDENTIFIER) and not stream.is_value(j, 'return'): break
+            if stream.is_value(j, 'return'):
+                if self.empty_line_count < self.value:
+                    self.report(j, f'there must be {self.value} empty line before the return '
+                                   f'(was: {self.empty_line_count})', stream.rows[begin])
+                    self.fix(stream.starts[begin], stream.starts[begin], '\n' * (self.value - self.empty_line_count))
+        self.empty_line_count = 0
+
+
+class RequireSemicolons(Rule):
+    LINES = True
+    # ключевые слова, после которых обычно не идет ;, и комментарии - строка с ними не проверяется
+    TOKEN_TYPES = (KEYWORD, COMMENT)
+    BLOCK_KEYWORDS = {"if", "else", "for", "foreach", "while", "do", "switch", "try", "catch", "finally", "lock",
+                      "class", "static", "case", "default"}
+
+    def __init__(self, lines, value):
+        super().__init__(lines, value)
+        self.skipped_line = -1
+
+    def visit_token(self, i, line):
+        if self.stream.types[i] == COMMENT or self.stream.value(i) in self.BLOCK_KEYWORDS:
+            self.skipped_line = line
+
+    def visit_line(self, line):
+        view, stream = self.view, self.stream
+        offsets, types = stream.line_offsets, stream.types
+        if line >= len(view) - 1 or line == self.skipped_line:
+            return
+        begin, end = offsets[line], offsets[line + 1]
+        if end - begin <= 1 or stream.value(end - 2) in ["{", "}", "else", "do", "catch", "finally"] or \
+                types[end - 2] == SPACE:
+            return
+
+        first = view.first_not_space(line + 1)
+        if first is not None and stream.is_value(first, '{'):
+            return
+
+        if not stream.is_value(end - 2, ';'):
+            # столбец - сразу после последнего токена строки, где не хватает ;
+            row, column = stream.rows[begin], None
+            if stream.rows[end - 2] == row:
+                column = stream.columns[end - 2] + stream.ends[end - 2] - stream.starts[end - 2]
+            self.add_message(row, column, 'expected ;')
+
+
+class SpaceAfterKeywords(Rule):
+    TOKEN_TYPES = (KEYWORD,)
+
+    def __init__(self, lines, value):
+        super().__init__(lines)
+        self.value = value
+
+    def visit_token(self, i, line):
+        stream = self.stream
+        types = stream.types
+        if i + 1 >= stream.line_offsets[line + 1] or types[i + 1] != SYMBOL or \
+                stream.value(i + 1) in ['>', '>>', '[', ']', ';', ',', '.', ')']:
+            return
+        if (types[i + 1] == SPACE) != self.value:
+            self.report(i, f'{"do not " if not self.value else ""}expected space after \'{stream.value(i)}\'')
+            self.fix(stream.ends[i], stream.ends[i], ' ')
+
+
+class CamelCase(Rule):
+    TOKEN_TYPES = (IDENTIFIER,)
+    # то же самое, что и '^[a-zA-Z]+([A-Z0-9a-z]*)*$', но без экспоненциального перебора на длинных именах
+    PATTERN = re.compile(r'[a-zA-Z][A-Z0-9a-z]*')
+
+    def visit_token(self, i, line):
+        stream = self.stream
+        if not self.PATTERN.fullmatch(stream.code, stream.starts[i], stream.ends[i]):
+            self.report(i, f'expected camelCase in \'{stream.value(i)}\'')
+
+
+class SpaceAroundOperators(Rule):
+    TOKEN_TYPES = (OPERATION,)
+
+    def __init__(self, lines, value):
+        super().__init__(lines, value)
+        self.last_line = -1
+        self.close_generic_indexes = []
+
+    def visit_token(self, j, line):
+        view, stream = self.view, self.stream
+        types, offsets = stream.types, stream.line_offsets
+        if line != self.last_line:
+            self.last_line = line
+            self.close_generic_indexes = []
+        begin, end = offsets[line], offsets[line + 1]
+        if j == begin or j >= end - 1:
+            return
+        if (types[j - 1] == IDENTIFIER or types[j - 1] == KEYWORD) and \
+                (types[j + 1] == IDENTIFIER or types[j + 1] == KEYWORD) and stream.is_value(j, '<'):
+            close_generic_index = view.find_value(line, '>', j)
+            if close_generic_index is not None and view.find_value(line, '<', j + 1, close_generic_index) is None:
+                self.close_generic_indexes.append(close_generic_index)
+                return
+
+        if stream.value(j) not in ['++', '--'] and types[j - 1] != SPACE and j not in self.close_generic_indexes:
+            self.report(j, f"expected spaces around \'{stream.value(j)}\'", stream.rows[begin])
+
+
+# настройка из .style файла -> правило
+RULES = {
+    'max_line_length': MaxLineLength,
+    'allow_trailing_whitespace': AllowTrailingWhitespace,
+    'trim_whitespace': TrimWhitespace,
+    'space_after_comma': SpaceAfterComma,
+    'space_before_comma': SpaceBeforeComma,
+    'space_after_colon': SpaceAfterColon,
+    'space_before_colon': SpaceBeforeColon,
+    'newline_after_open_brace': NewlineAfterOpenBrace,
+    'newline_before_close_brace': NewlineBeforeCloseBrace,
+    'newline_before_return': NewlineBeforeReturn,
+    'require_semicolons': RequireSemicolons,
+    'space_after_keywords': SpaceAfterKeywords,
+    'camel_case': CamelCase,
+    'always_use_braces': AlwaysUseBraces,
+    'space_around_operators': SpaceAroundOperators,
+}
@@ -0,0 +1,223 @@
+""" Модуль с проверкой многих файлов в отдельных процессах """
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .tokenizer import Tokenizer
+from .stylecheck import Stylecheck
+from .style_profile import StyleProfile
+from .project_index import ProjectIndex
+from .fixer import Fixer
+from .result_cache import ResultCache
+from .stats import Stats
+from .cpu_count import CpuCount
+from .diagnostic import Diagnostic
+
+
+class Runner:
+    """Проверка (и, если нужно, исправление) списка файлов
+
+    Файлы разбираются и проверяются в пуле процессов (jobs - количество процессов, по умолчанию - количество
+    доступных процессоров, см. available_cpus). Настройки стиля и индекс проекта передаются каждому процессу один
+    раз при его запуске. Результаты выдаются в порядке списка файлов, независимо от того, какой процесс закончит
+    раньше. Если задан кэш (ResultCache), неизменившиеся файлы не проверяются заново, а файлы с одинаковым
+    содержимым проверяются один раз за запуск. changes - {путь: множество номеров строк}: для этих файлов выводятся
+    только замечания об этих строках (см. GitDiff), contents - {путь: содержимое (bytes)} для файлов, которые
+    берутся не с диска (например, из индекса git). Если задан stats (Stats), в него записываются замеры всех
+    процессов"""
+    # при меньшем количестве файлов они проверяются без запуска процессов
+    PARALLEL_THRESHOLD = 8
+    # Runner процесса-исполнителя (см. _start_worker)
+    _worker = None
+
+    def __init__(self, style, jobs=None, project_index=None, fix=False, cache=None, changes=None, contents=None,
+                 stats=None):
+        self.profile = StyleProfile.of(style)
+        self.jobs = jobs or self.available_cpus()
+        self.project_index = project_index
+        self.fix = fix
+        self.cache = cache
+        self.changes = changes or {}
+        self.contents = contents or {}
+        self.stats = stats
+        self.fixer = Fixer(self.profile) if fix else None
+        self.tokenizer = Tokenizer()
+        self.stylecheck = Stylecheck()
+        # всё, кроме содержимого файла, от чего зависит результат
+        self.key_parts = (self.profile.digest, project_index.digest() if project_index is not None else '',
+                          'fix' if fix else 'check')
+
+    def check_files(self, paths):
+        """Пары (путь, результат) в порядке paths. Результат - (количество исправлений или None, если файл не
+        исправлялся или в нём есть ошибки, строки результата проверки как в Stylecheck.check)"""
+        paths = list(paths)
+        initargs = (self.profile.properties, self.profile.source, self.project_index, self.fix, self.cache,
+                    self.changes, self.contents, self.stats is not None)
+        if self.jobs == 1 or len(paths) < self.PARALLEL_THRESHOLD:
+            Runner._worker = self
+            yield from self._check_in_order(paths, map)
+            return
+        if self.stats is not None:
+            self.stats.workers = self.jobs
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=Runner._start_worker,
+                                 initargs=initargs) as executor:
+            chunksize = max(1, min(64, len(paths) // (self.jobs * 4)))
+            yield from self._check_in_order(
+                paths, lambda function, tasks: executor.map(function, tasks, chunksize=chunksize))
+
+    def _check_in_order(self, paths, map_function):
+        if self.fix:
+            # исправляемые файлы меняются на месте, поэтому каждый путь обрабатывается отдельно
+            for path, (result, stats) in zip(paths, map_function(Runner._fix_path, paths)):
+                self._merge_stats(stats)
+                yield path, result
+            return
+        keys = []
+        results = {}  # ключ -> результат (для файлов, которые нельзя прочитать, ключ - номер пути)
+        counts = {}  # ключ -> сколько путей ещё ждут этот результат
+        tasks = {}  # ключ -> путь файла, который нужно проверить
+        for number, path in enumerate(paths):
+            try:
+                # чтение для ключа кэша - отдельный этап: процесс-исполнитель читает файл ещё раз
+                with Stats.measure(self.stats, 'hash'):
+                    data = self._read(path)
+                    key = self._key(data, path)
+            except OSError as error:
+                key = number
+                results[key] = self._error(error)
+            keys.append(key)
+            counts[key] = counts.get(key, 0) + 1
+            if key in results or key in tasks:
+                # файлы с одинаковым содержимым проверяются один раз
+                continue
+            cached = self._get_cached(key)
+            if cached is not None:
+                results[key] = cached
+                if self.stats is not None:
+                    self.stats.cached += 1
+            else:
+                tasks[key] = path
+
+        checked = zip(tasks, map_function(Runner._check_path, tasks.values()))
+        for path, key in zip(paths, keys):
+            while key not in results:
+                task_key, (checked_key, result, stats) = next(checked)
+                results[task_key] = result
+                self._merge_stats(stats)
+                # файл мог измениться после чтения - результат сохраняется по ключу проверенного содержимого
+                if checked_key is not None:
+                    self._put_cached(checked_key, *result)
+            counts[key] -= 1
+            if self.stats is not None:
+                self.stats.files += 1
+            yield path, results[key] if counts[key] > 0 else results.pop(key)
+
+    def _get_cached(self, key):
+        """Результат из кэша (как в check_files) или None"""
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is None:
+            return None
+        fixed, lines = cached
+        return fixed, Diagnostic.load(lines)
+
+    def _put_cached(self, key, fixed, lines):
+        # замечания сохраняются вместе с местом и правилом (см. Diagnostic.dump)
+        if self.cache is not None:
+            self.cache.put(key, [fixed, Diagnostic.dump(lines)])
+
+    def _key(self, data, path=None):
+        rows = self.changes.get(path)
+        if rows is None:
+            return ResultCache.key(data, *self.key_parts)
+        return ResultCache.key(data, *self.key_parts, ','.join(map(str, sorted(rows))))
+
+    def _check_code(self, data, path=None):
+        with Stats.measure(self.stats, 'tokenize'):
+            # как при чтении файла в текстовом режиме
+            code = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+            lines = self.tokenizer.get_lines(code)
+        if self.stats is not None:
+            self.stats.count(len(data), lines)
+        return self.stylecheck.check(lines, self.profile, self.project_index, self.changes.get(path), self.stats)
+
+    def _read(self, path):
+        if path in self.contents:
+            return self.contents[path]
+        with open(path, 'rb') as file:
+            return file.read()
+
+    @staticmethod
+    def _error(error):
+        return None, [f'The file cannot be checked: {error}']
+
+    @staticmethod
+    def _start_worker(properties, source, project_index, fix, cache, changes, contents, stats):
+        Runner._worker = Runner(StyleProfile(properties, source), 1, project_index, fix, cache, changes, contents,
+                                Stats() if stats else None)
+
+    def _merge_stats(self, stats):
+        if stats is not None:
+            self.stats.merge(stats)
+
+    @staticmethod
+    def _check_path(path):
+        """(ключ проверенного содержимого, результат, замеры процесса для Stats.merge или None)"""
+        runner = Runner._worker
+        try:
+            with Stats.measure(runner.stats, 'read'):
+                data = runner._read(path)
+            checked = runner._key(data, path), (None, runner._check_code(data, path))
+        except (OSError, UnicodeDecodeError) as error:
+            checked = None, runner._error(error)
+        return checked + (runner.stats.take() if runner.stats is not None else None,)
+
+    @staticmethod
+    def _fix_path(path):
+        """(результат, замеры процесса для Stats.merge или None)"""
+        runner = Runner._worker
+        result = runner._fix(path)
+        return result, runner.stats.take() if runner.stats is not None else None
+
+    def _fix(self, path):
+        try:
+            data = self._read(path)
+            key = self._key(data)
+            cached = self._get_cached(key)
+            if cached is not None:
+                if self.stats is not None:
+                    self.stats.cached += 1
+                return cached
+            with Stats.measure(self.stats, 'fix'):
+                fixed = self.fixer.fix_file(path)
+            if fixed:
+                data = self._read(path)
+                key = self._key(data)
+            result = self._check_code(data)
+        except (OSError, UnicodeDecodeError) as error:
+            return self._error(error)
+        # результат сохраняется, только если исправлять было нечего: правки, пересекающиеся с применёнными,
+        # пропускаются (см. Fixer), и после исправления следующий запуск может исправить что-то ещё
+        if not fixed:
+            self._put_cached(key, fixed, result)
+        return fixed, result
+
+    @staticmethod
+    def find_files(sources, stdin=None):
+        """Файлы для проверки. Каждый источник - файл, папка (все .cs файлы в ней, см. ProjectIndex.find_sources),
+        шаблон glob (например, src/**/*.cs) или '-' - список файлов из stdin, разделённых символом NUL
+        (например, вывод find -print0 или git ls-files -z). Порядок - как в sources, без повторов"""
+        paths = []
+        for source in sources:
+            if source == '-':
+                paths.extend(name for name in stdin.read().split('\0') if name)
+            elif os.path.isdir(source):
+                paths.extend(ProjectIndex.find_sources(source))
+            elif any(symbol in source for symbol in '*?['):
+                paths.extend(sorted(glob.glob(source, recursive=True)))
+            else:
+                paths.append(source)
+        return list(dict.fromkeys(paths))
+
+    @staticmethod
+    def available_cpus():
+        """Количество процессоров, доступных процессу (см. CpuCount.available)"""
+        return CpuCount.available()
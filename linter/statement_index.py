@@ -0,0 +1,80 @@
+""" Модуль с индексом управляющих конструкций файла """
+from array import array
+from bisect import bisect_right
+from .tokenizer import TokenType, Lines
+from .brackets import BracketIndex
+
+SPACE = TokenType.Space.value
+KEYWORD = TokenType.Keyword.value
+COMMENT = TokenType.Comment.value
+
+
+class StatementIndex:
+    """Управляющие конструкции (if, for, while, ...) и фигурные скобки по строкам, найденные за один проход
+
+    statements - номер строки -> (номер строки с закрывающей скобкой условия, номер строки с началом тела, выделено
+    ли тело фигурными скобками); для строки берётся последнее ключевое слово конструкции, после которого (через
+    не больше чем один токен) идёт '('. braces - для каждой строки количество '{' минус количество '}'.
+    Индекс не зависит от настроек, поэтому строится один раз на файл, и проверка отступов тратит на строку O(1)"""
+    STATEMENT_WORDS = {"if", "else", "for", "foreach", "while", "do", "lock"}
+
+    def __init__(self, lines):
+        self.lines = Lines.of(lines)
+        stream = self.lines.stream
+        offsets = stream.line_offsets
+        self.braces = array('i', bytes(4 * len(self.lines)))
+        self.statements = {}
+
+        bracket_index = BracketIndex.of(self.lines)
+        code, starts = stream.code, stream.starts
+        line = 0
+        for position in bracket_index.positions:
+            bracket = code[starts[position]]
+            if bracket == '{' or bracket == '}':
+                line = bisect_right(offsets, position, line) - 1
+                self.braces[line] += 1 if bracket == '{' else -1
+
+        last_words = {}  # номер строки -> позиция последнего ключевого слова конструкции в ней
+        line = 0
+        for position in stream.positions_of(KEYWORD, self.STATEMENT_WORDS):
+            line = bisect_right(offsets, position, line) - 1
+            last_words[line] = position
+        partners = bracket_index.partners
+        for line, position in last_words.items():
+            statement = self._find_statement(position, offsets[line + 1], partners)
+            if statement is not None:
+                self.statements[line] = statement
+
+    def _find_statement(self, position, line_end, partners):
+        stream = self.lines.stream
+        if position + 1 < line_end and stream.is_value(position + 1, '('):
+            begin = position + 1
+        elif position + 2 < line_end and stream.is_value(position + 2, '('):
+            begin = position + 2
+        else:
+            return None
+        end = partners.get(begin)
+        if end is None:
+            # у скобки нет пары - об этом сообщит errors_checker
+            return None
+        # первый токен после ')', не считая пробелов и комментариев, - начало тела
+        types = stream.types
+        body = end + 1
+        while body < len(types) and (types[body] == SPACE or types[body] == COMMENT):
+            body += 1
+        if body == len(types):
+            return None
+        offsets = stream.line_offsets
+        return bisect_right(offsets, end) - 1, bisect_right(offsets, body) - 1, stream.is_value(body, '{')
+
+    @staticmethod
+    def of(lines):
+        """Индекс для строк файла. Если строки получены из Tokenizer.get_lines, индекс строится один раз
+        и сохраняется вместе с ними"""
+        indexes = getattr(lines, 'indexes', None)
+        if indexes is not None and StatementIndex in indexes:
+            return indexes[StatementIndex]
+        index = StatementIndex(lines)
+        if indexes is not None:
+            indexes[StatementIndex] = index
+        return index
@@ -0,0 +1,161 @@
+""" Модуль с замерами времени и памяти при проверке """
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # нет в Windows - тогда память считается через tracemalloc
+    resource = None
+
+
+class Stats:
+    """Время этапов проверки (индекс проекта, чтение, токенизация, правила стиля, поиск ошибок, анализ кода), время
+    каждой настройки стиля, количество файлов и токенов и наибольшая память процесса
+
+    Замеры из процессов-исполнителей передаются вместе с результатами (take) и складываются (merge); тогда время
+    этапов - процессорное время, сложенное по workers процессам, и долей от общего времени оно не выводится.
+    Если задана папка profile_directory, каждый этап дополнительно профилируется cProfile, профили записываются
+    в <папка>/<этап>.prof (см. dump_profiles, смотреть - python -m pstats)"""
+    # порядок этапов в отчёте; hash - чтение файла для ключа кэша в основном процессе, read - чтение для проверки
+    PHASES = ('project_index', 'hash', 'read', 'tokenize', 'fix', 'rules', 'checking_for_errors', 'code_analyzer', 'stream')
+    COUNTERS = ('cached', 'checked', 'tokens', 'lines', 'bytes')
+
+    def __init__(self, profile_directory=None):
+        self.phases = {}  # этап -> секунды
+        self.rules = {}  # настройка -> секунды
+        self.workers = 1  # процессы, замеры которых складываются
+        self.files = 0  # все файлы, для которых получен результат
+        self.cached = 0  # результаты из кэша
+        self.checked = 0
+        self.tokens = 0
+        self.lines = 0
+        self.bytes = 0
+        self.profile_directory = profile_directory
+        self.profilers = {}
+        self.started = time.perf_counter()
+        if resource is None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Замер этапа name (время складывается для всех файлов)"""
+        profiler = None
+        if self.profile_directory is not None:
+            profiler = self.profilers.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - begin
+            if profiler is not None:
+                profiler.disable()
+
+    @staticmethod
+    def measure(stats, name):
+        """stats.phase(name) или ничего не замеряющий контекст, если stats - None"""
+        return stats.phase(name) if stats is not None else contextlib.nullcontext()
+
+    def count(self, size, lines):
+        """Учёт проверенного файла: size - размер в байтах, lines - строки токенов"""
+        self.checked += 1
+        self.tokens += len(lines.stream)
+        self.lines += len(lines)
+        self.bytes += size
+
+    def take(self):
+        """Замеры, накопленные с прошлого вызова (для передачи из процесса-исполнителя), счётчики обнуляются"""
+        data = {'phases': self.phases, 'rules': self.rules}
+        data.update((name, getattr(self, name)) for name in self.COUNTERS)
+        self.phases, self.rules = {}, {}
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        return data
+
+    def merge(self, data):
+        for name in ('phases', 'rules'):
+            totals = getattr(self, name)
+            for key, seconds in data[name].items():
+                totals[key] = totals.get(key, 0) + seconds
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + data[name])
+
+    @staticmethod
+    def peak_memory():
+        """{'rss_kb': ..., 'children_rss_kb': ...} - наибольший размер процесса и самого большого из завершившихся
+        процессов-исполнителей, или {'tracemalloc_kb': ...}, если размер процесса узнать нельзя"""
+        if resource is None:
+            return {'tracemalloc_kb': tracemalloc.get_traced_memory()[1] // 1024}
+        # в macOS ru_maxrss - в байтах, в Linux - в килобайтах
+        scale = 1024 if sys.platform == 'darwin' else 1
+        return {'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+                'children_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale}
+
+    def summary(self):
+        """Все замеры словарем (для JSON)"""
+        wall = time.perf_counter() - self.started
+        tokenize = self.phases.get('tokenize', 0)
+        phases = sorted(self.phases, key=lambda name: (self.PHASES + (name,)).index(name))
+        return {
+            'wall_seconds': round(wall, 6),
+            'workers': self.workers,
+            'files': self.files,
+            'checked_files': self.checked,
+            'cached_files': self.cached,
+            'tokens': self.tokens,
+            'lines': self.lines,
+            'bytes': self.bytes,
+            'files_per_second': round(self.files / wall, 3) if wall else None,
+            'tokens_per_second': round(self.tokens / wall) if wall else None,
+            'tokenizer_tokens_per_second': round(self.tokens / tokenize) if tokenize else None,
+            'phases': {name: round(self.phases[name], 6) for name in phases},
+            # самые медленные настройки - первыми
+            'rules': {name: round(seconds, 6)
+                      for name, seconds in sorted(self.rules.items(), key=lambda item: -item[1])},
+            'peak_memory': self.peak_memory(),
+            'profiles': sorted(self._profile_path(name) for name in self.profilers),
+        }
+
+    def report(self, format='text'):
+        """Отчёт: text - для чтения, json - одна строка JSON"""
+        summary = self.summary()
+        if format == 'json':
+            return json.dumps(summary)
+        wall = summary['wall_seconds']
+        result = ['--- STATS ---',
+                  f'Files: {summary["files"]} (checked: {summary["checked_files"]}, '
+                  f'from the cache: {summary["cached_files"]}), {wall:.3f} s, {summary["files_per_second"]} files/s',
+                  f'Tokens: {summary["tokens"]}, {summary["tokens_per_second"]} tokens/s '
+                  f'(tokenizer: {summary["tokenizer_tokens_per_second"]} tokens/s)',
+                  'Peak memory: ' + ', '.join(f'{name[:-3].replace("_", " ")} {value} KB'
+                                              for name, value in summary['peak_memory'].items())]
+        if summary['phases'] and self.workers > 1:
+            # время процессов-исполнителей идёт одновременно, доля от общего времени может быть больше 100%
+            result.append(f'Phases (CPU seconds summed over {self.workers} worker processes):')
+            result.extend(f'  {name:<40}{seconds:>10.4f} s' for name, seconds in summary['phases'].items())
+        elif summary['phases']:
+            result.append('Phases:')
+            result.extend(f'  {name:<40}{seconds:>10.4f} s{seconds / wall * 100 if wall else 0:>7.1f}%'
+                          for name, seconds in summary['phases'].items())
+        if summary['rules']:
+            result.append('Rules:')
+            result.extend(f'  {name:<40}{seconds:>10.4f} s' for name, seconds in summary['rules'].items())
+        if summary['profiles']:
+            result.append('Profiles: ' + ', '.join(summary['profiles']))
+        return '\n'.join(result)
+
+    def dump_profiles(self):
+        """Запись профилей этапов (если задана папка profile_directory)"""
+        if self.profile_directory is None:
+            return
+        os.makedirs(self.profile_directory, exist_ok=True)
+        for name, profiler in self.profilers.items():
+            profiler.dump_stats(self._profile_path(name))
+
+    def _profile_path(self, name):
+        return os.path.join(self.profile_directory, f'{name}.prof')
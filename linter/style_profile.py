@@ -0,0 +1,68 @@
+""" Модуль со скомпилированными настройками стиля """
+import hashlib
+import inspect
+import json
+from . import settings
+
+
+class StyleError(ValueError):
+    """Ошибка в .style файле: неизвестная настройка или неверное количество аргументов"""
+
+
+class StyleProfile:
+    """Настройки стиля, подготовленные для проверки любого количества файлов
+
+    При создании каждая настройка проверяется (есть ли такая функция-настройка и подходят ли к ней аргументы) и
+    связывается с правилом или методом Settings (см. rules.RuleEngine). Поэтому ошибка в .style файле
+    обнаруживается до проверки первого файла, а при проверке файла не повторяются чтение JSON и поиск функций"""
+
+    def __init__(self, properties, source=None):
+        """properties - {настройка: значение или список аргументов}, как в .style файле,
+        source - откуда взяты настройки (для сообщений об ошибках)"""
+        if not isinstance(properties, dict):
+            raise StyleError(f'{source or "style"}: expected a JSON object with style settings')
+        self.source = source
+        self.properties = dict(properties)
+        self.settings = settings.Settings()
+        errors = [error for name, value in self.properties.items()
+                  for error in self._validate(name, settings.Settings.get_arguments(value))]
+        if errors:
+            raise StyleError('\n'.join(f'{source or "style"}: {error}' for error in errors))
+        self.engine = self.settings.compile_rules(self.properties)
+        # порядок настроек важен: в нём выводятся результаты
+        self.digest = hashlib.blake2b(json.dumps(self.properties).encode('utf-8'), digest_size=20).hexdigest()
+
+    @staticmethod
+    def load(path):
+        """Настройки из .style файла"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                properties = json.loads(f.read())
+        except ValueError as error:
+            raise StyleError(f'{path}: invalid JSON ({error})')
+        return StyleProfile(properties, path)
+
+    @staticmethod
+    def of(style):
+        """StyleProfile по пути к .style файлу или уже готовый профиль"""
+        return style if isinstance(style, StyleProfile) else StyleProfile.load(style)
+
+    def check(self, lines, edits=None, rows=None, timings=None, diagnostics=False):
+        """{настройка: сообщения} в порядке настроек в .style файле
+        (edits, rows, timings и diagnostics - см. rules.RuleEngine.run)"""
+        return self.engine.run(lines, edits, rows, timings, diagnostics)
+
+    def local(self):
+        """Настройки профиля, которым для проверки строки нужна только сама строка (Settings.LOCAL_RULES)"""
+        return {name: value for name, value in self.properties.items() if name in settings.Settings.LOCAL_RULES}
+
+    def _validate(self, name, args):
+        if name.startswith('_') or name in settings.Settings.SERVICE_METHODS or \
+                not callable(getattr(self.settings, name, None)):
+            return [f'unknown setting "{name}"']
+        try:
+            # последний аргумент функции-настройки - строки файла
+            inspect.signature(getattr(self.settings, name)).bind(*args, None)
+        except TypeError:
+            return [f'wrong number of arguments for "{name}": {len(args)}']
+        return []
@@ -1,37 +1,67 @@
-import json
 from . import settings
+from .rules import RuleEngine
+from .style_profile import StyleProfile
+from .stats import Stats
 
 
 class Stylecheck:
-    def check(self, lines, settings_path):
+    def check(self, lines, style, project_index=None, rows=None, stats=None):
+        """style - путь к .style файлу или StyleProfile (чтобы не разбирать настройки для каждого файла заново).
+        rows - множество номеров строк (например, изменённых): выводятся только замечания об этих строках.
+        Ошибки в коде (раздел ERRORS) выводятся все - из-за них остальные проверки могут быть неверными.
+        stats - Stats, в который записывается время этапов и каждой настройки"""
         setting = settings.Settings()
         result = ['####################################################',
                   '                 CHECKING THE STYLE                 ',
                   '####################################################']
-        result.extend(self._check_style(lines, settings_path))
+        with Stats.measure(stats, 'rules'):
+            result.extend(self._check_style(lines, style, rows, stats.rules if stats is not None else None))
 
         result += ['####################################################',
                    '               ADDITIONAL INFORMATION               ',
                    '####################################################']
-        result.extend(setting.checking_for_errors(lines))
-        result.extend(setting.analyze_code(lines))
+        with Stats.measure(stats, 'checking_for_errors'):
+            result.extend(setting.checking_for_errors(lines))
+        with Stats.measure(stats, 'code_analyzer'):
+            analysis = setting.analyze_code(lines, project_index)
+        result.extend(analysis if rows is None else self._select(analysis, rows))
         return result
 
-    def _check_style(self, lines, settings_path):
-        setting = settings.Settings()
+    def check_stream(self, lines, style):
+        """Проверка только локальных настроек (Settings.LOCAL_RULES) по мере поступления строк.
+        Результат выдаётся построчно, не дожидаясь конца файла"""
+        yield from ['####################################################',
+                    '             CHECKING THE STYLE (STREAM)            ',
+                    '####################################################']
+        count = 0
+        last_property = None
+        for property, message in settings.Settings().iter_local_rules(StyleProfile.of(style).local(), lines):
+            if property != last_property:
+                yield f'--- {property} ---'
+                last_property = property
+            yield message
+            count += 1
+        yield from ['', f'Total errors: {count}']
+
+    def _check_style(self, lines, style, rows=None, timings=None):
         count = 0
         result = []
-        with open(settings_path, 'r', encoding='utf-8') as f:
-            properties = json.loads(f.read())
-        for property in properties:
-            preresult = []
-            if type(properties[property]) is list:
-                preresult.extend(getattr(setting, property)(*properties[property], lines))
-            else:
-                preresult.extend(getattr(setting, property)(properties[property], lines))
+        # все настройки проверяются за один общий проход по токенам
+        results = StyleProfile.of(style).check(lines, rows=rows, timings=timings, diagnostics=True)
+        for property, preresult in results.items():
             if len(preresult) > 0:
                 result.append(f'--- {property} ---')
                 result.extend(preresult)
                 count += len(preresult)
         result.extend(['', f'Total errors: {count}'])
         return result
+
+    @staticmethod
+    def _select(result, rows):
+        """Замечания об отдельных строках - только для строк из rows; разделы без замечаний убираются"""
+        selected = []
+        for line in RuleEngine.select(result, rows) + ['--- ---']:
+            if line.startswith('--- ') and selected and selected[-1].startswith('--- '):
+                selected.pop()
+            selected.append(line)
+        return selected[:-1]
@@ -1,7 +1,11 @@
 """ Модуль для токенизации и разбора исходного кода """
 import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from enum import Enum
-from collections import defaultdict
+from functools import lru_cache
+from collections.abc import Sequence
 
 TokenType = Enum('TokenType', ['Symbol', 'Keyword', 'NumberConstant',
                                'StringConstant', 'Character', 'Identifier',
@@ -9,6 +13,8 @@ TokenType = Enum('TokenType', ['Symbol', 'Keyword', 'NumberConstant',
 
 
 class Token:
+    __slots__ = ('value', 'token_type', 'row', 'column')
+
     def __init__(self, value, token_type, row=0, column=0):
         self.value = value
         self.token_type = token_type
@@ -16,32 +22,410 @@ class Token:
         self.column = column
 
     def __str__(self):
-        return ', '.join(f'{k}:=\'{v}\''
-                         for k, v in vars(self).items()
-                         if k[0] != '_')
+        return ', '.join(f'{k}:=\'{getattr(self, k)}\''
+                         for k in self.__slots__)
+
+
+class TokenStream(Sequence):
+    """Токены файла в компактном виде
+
+    Вместо объекта Token на каждый токен хранятся массивы: начало и конец токена в исходном коде, строка,
+    столбец и однобайтовый код типа (TokenType.value). Значение токена вырезается из кода только при
+    обращении, а объекты Token создаются по запросу (stream[i])"""
+
+    def __init__(self, code):
+        self.code = code
+        self.starts = array('I')
+        self.ends = array('I')
+        self.rows = array('I')
+        self.columns = array('I')
+        self.types = bytearray()
+        # строка с номером k - это токены с индексами [line_offsets[k], line_offsets[k + 1])
+        self.line_offsets = array('I', [0])
+        # индексы строковых констант и многострочных комментариев без закрывающих символов
+        self.unterminated = array('I')
+        # начала строк кода: строка с номером first_row + k начинается с символа code[row_offsets[k]]
+        self.row_offsets = array('I', [0])
+        self.first_row = 1
+        self._line_numbers = None
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._make_token(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('token index out of range')
+        return self._make_token(index)
+
+    def _make_token(self, i):
+        return Token(self.code[self.starts[i]:self.ends[i]], _TOKEN_TYPES[self.types[i]],
+                     self.rows[i], self.columns[i])
+
+    def value(self, i):
+        return self.code[self.starts[i]:self.ends[i]]
+
+    def token_type(self, i):
+        return _TOKEN_TYPES[self.types[i]]
+
+    def is_value(self, i, value):
+        """Сравнение значения токена со строкой без вырезания значения из кода"""
+        return self.ends[i] - self.starts[i] == len(value) and self.code.startswith(value, self.starts[i])
+
+    def is_newline(self, i):
+        return self.types[i] == TokenType.Space.value and self.code[self.starts[i]] == '\n'
+
+    def positions_of(self, token_code, values=None):
+        """Индексы токенов с данным кодом типа (и значением из values, если оно задано)"""
+        types, code, starts, ends = self.types, self.code, self.starts, self.ends
+        i = types.find(token_code)
+        while i != -1:
+            if values is None or code[starts[i]:ends[i]] in values:
+                yield i
+            i = types.find(token_code, i + 1)
+
+    def line_of(self, i):
+        """Номер строки (индекс в lines), в которой находится токен"""
+        if self._line_numbers is None:
+            self._line_numbers = array('I')
+            for line in range(len(self.line_offsets) - 1):
+                self._line_numbers.extend([line] * (self.line_offsets[line + 1] - self.line_offsets[line]))
+        return self._line_numbers[i]
+
+    def is_same_line(self, i, j):
+        return 0 <= i and j < len(self.types) and self.line_of(i) == self.line_of(j)
+
+    def is_line_start(self, i):
+        return self.line_offsets[self.line_of(i)] == i
+
+    def position(self, offset):
+        """(строка, столбец) символа code[offset] - двоичный поиск по началам строк кода"""
+        k = bisect_right(self.row_offsets, offset) - 1
+        return k + self.first_row, offset - self.row_offsets[k] + 1
+
+    def is_terminated(self, i):
+        """Закрыт ли токен (незакрытые строковые константы и комментарии отмечаются во время разбора)"""
+        k = bisect_left(self.unterminated, i)
+        return k == len(self.unterminated) or self.unterminated[k] != i
+
+    def span(self, i):
+        """Позиции первого и последнего символов токена (многострочный токен занимает несколько строк кода)"""
+        return (self.rows[i], self.columns[i]), self.position(self.ends[i] - 1)
+
+    @property
+    def lines(self):
+        return Lines(self)
+
+    @staticmethod
+    def from_lines(token_lines):
+        """Поток, построенный по уже готовым строкам токенов (например, созданным вручную)"""
+        stream = TokenStream('')
+        values = []
+        position = 0
+        for line in token_lines:
+            for token in line:
+                stream.starts.append(position)
+                position += len(token.value)
+                stream.ends.append(position)
+                stream.rows.append(token.row)
+                stream.columns.append(token.column)
+                stream.types.append(token.token_type.value)
+                if token.token_type in (TokenType.StringConstant, TokenType.Comment) and \
+                        not _LiteralScanner.is_terminated(token.value):
+                    stream.unterminated.append(len(values))
+                values.append(token.value)
+            stream.line_offsets.append(len(stream.types))
+        stream.code = ''.join(values)
+        # начала строк кода - по переводам строк в значениях токенов
+        if stream.rows:
+            stream.first_row = stream.rows[0]
+        position = stream.code.find('\n')
+        while position != -1:
+            stream.row_offsets.append(position + 1)
+            position = stream.code.find('\n', position + 1)
+        return stream
+
+
+class Lines(Sequence):
+    """Строки токенов файла поверх TokenStream (строка - диапазон индексов токенов)
+
+    Токены строки создаются при обращении к ней, последние прочитанные строки кэшируются. Вместе со строками
+    хранятся построенные по ним индексы (см. BracketIndex.of), чтобы каждый из них вычислялся один раз на файл"""
+    CACHE_SIZE = 256
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.indexes = {}
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.stream.line_offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        line = self._cache.get(index)
+        if line is not None:
+            return line
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('line index out of range')
+        line = self.stream[self.stream.line_offsets[index]:self.stream.line_offsets[index + 1]]
+        if len(self._cache) >= self.CACHE_SIZE:
+            del self._cache[next(iter(self._cache))]
+        self._cache[index] = line
+        return line
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @staticmethod
+    def of(lines):
+        """Строки в виде Lines: строки из Tokenizer.get_lines возвращаются как есть, остальные переводятся в поток"""
+        if isinstance(lines, Lines):
+            return lines
+        return TokenStream.from_lines(lines).lines
+
+    def row(self, line):
+        return self.stream.rows[self.stream.line_offsets[line]]
+
+    def line_indexes(self, positions):
+        """Номера строк (по возрастанию, без повторов), в которых находятся токены с данными индексами"""
+        offsets = self.stream.line_offsets
+        line = -1
+        for position in positions:
+            if line == -1 or position >= offsets[line + 1]:
+                line = bisect_right(offsets, position, line + 1) - 1
+                yield line
+
+    def contains(self, line, token_code, values):
+        stream = self.stream
+        for i in range(stream.line_offsets[line], stream.line_offsets[line + 1]):
+            if stream.types[i] == token_code and stream.value(i) in values:
+                return True
+        return False
+
+    def continues_string(self, line):
+        """Продолжает ли строка многострочную строковую константу, начатую в предыдущих строках"""
+        stream = self.stream
+        i = stream.line_offsets[line]
+        return i > 0 and stream.types[i - 1] == TokenType.StringConstant.value and stream.rows[i - 1] != stream.rows[i]
+
+    def count_not_spaces(self, line):
+        begin, end = self.stream.line_offsets[line], self.stream.line_offsets[line + 1]
+        return end - begin - self.stream.types.count(TokenType.Space.value, begin, end)
+
+    def first_not_space(self, line):
+        stream = self.stream
+        for i in range(stream.line_offsets[line], stream.line_offsets[line + 1]):
+            if stream.types[i] != TokenType.Space.value:
+                return i
+        return None
+
+    def find_value(self, line, value, begin=None, end=None):
+        """Индекс первого токена строки на отрезке [begin, end) со значением value или None"""
+        stream = self.stream
+        begin = stream.line_offsets[line] if begin is None else begin
+        end = stream.line_offsets[line + 1] if end is None else end
+        for i in range(begin, end):
+            if stream.is_value(i, value):
+                return i
+        return None
+
+
+_TOKEN_TYPES = [None] + list(TokenType)
+
+
+class _LiteralScanner:
+    """Поиск конца строковых констант и многострочных комментариев в коде code
+
+    Каждый литерал просматривается один раз слева направо, без откатов. Поиск конца незакрытого литерала
+    доходит до конца файла, поэтому запоминается, откуда он уже закончился неудачей: для обычных строк,
+    символьных констант и комментариев неудача с позиции p означает неудачу с любой позиции дальше p
+    (экранирование '\\' разбивает текст после p на те же пары), а у буквальной строки (@"...") после неудачи
+    конец может быть только в идущих сразу за открывающей кавычкой кавычках. После первой незакрытой
+    интерполированной строки ($"...") следующие разбираются без выражений {...}, как обычные строки, -
+    иначе каждая из них может заново просматривать весь файл. Незакрытый литерал, как и раньше,
+    продолжается до пробела или перевода строки"""
+    _TEXT = re.compile(r'[\\"{]')
+    _VERBATIM_TEXT = re.compile(r'["{]')
+    _HOLE = re.compile(r'[{}"\']')
+    _QUOTES = re.compile(r'"*')
+    _UNTERMINATED = re.compile(r'[^\n ]*')
+    _OPENING = re.compile(r'(?:\$@|@\$|@|\$)?["\']|/\*')
+
+    def __init__(self, code, interpolation=True):
+        self.code = code
+        self.interpolation = interpolation
+        self.failed = {}  # вид литерала -> начало текста литерала, для которого конец не нашёлся
+
+    @staticmethod
+    def is_interpolated(value):
+        return value.startswith(('$"', '$@"', '@$"'))
+
+    @staticmethod
+    def is_terminated(value):
+        """Закрыт ли литерал, взятый отдельно от кода (для потоков, собранных из готовых токенов)"""
+        opening = _LiteralScanner._OPENING.match(value)
+        if opening is None:
+            return True
+        kind, end, terminated = _LiteralScanner(value).scan(0, opening.end())
+        return terminated and end == len(value)
+
+    def scan(self, start, text_start):
+        """(вид токена, конец токена, закрыт ли литерал) для литерала, открывающегося code[start:text_start]"""
+        opening = self.code[start:text_start]
+        if opening == '/*':
+            kind, end = 'Comment', self._comment(text_start)
+        elif opening[-1] == "'" or opening == '"':
+            kind, end = 'StringConstant', self._regular(text_start, opening[-1])
+        elif opening == '@"':
+            kind, end = 'StringConstant', self._verbatim(text_start)
+        elif self.interpolation:
+            kind, end = 'StringConstant', self._interpolated(text_start, '@' in opening)
+            if end == -1:
+                self.interpolation = False
+        else:
+            kind = 'StringConstant'
+            end = self._verbatim(text_start) if '@' in opening else self._regular(text_start, '"')
+        if end == -1:
+            return kind, self._UNTERMINATED.match(self.code, text_start).end(), False
+        return kind, end, True
+
+    def _fail(self, kind, position):
+        self.failed[kind] = min(self.failed.get(kind, position), position)
+        return -1
+
+    def _regular(self, position, quote):
+        """Строка (или символ) с экранированием '\\': конец - первая кавычка, перед которой чётное число '\\'"""
+        failed = self.failed.get(quote)
+        if failed is not None and position >= failed:
+            return -1
+        code = self.code
+        prev = position
+        i = code.find(quote, position)
+        while i != -1:
+            # отрезки между соседними кавычками не пересекаются, поэтому всего просматривается O(n) символов
+            segment = code[prev:i]
+            if (len(segment) - len(segment.rstrip('\\'))) % 2 == 0:
+                return i + 1
+            prev = i + 1
+            i = code.find(quote, prev)
+        return self._fail(quote, position)
+
+    def _comment(self, position):
+        """Многострочный комментарий: конец - первые '*/', перед которыми чётное число '\\'"""
+        failed = self.failed.get('/*')
+        if failed is not None and position >= failed:
+            return -1
+        code = self.code
+        prev = position
+        i = code.find('*/', position)
+        while i != -1:
+            segment = code[prev:i]
+            if (len(segment) - len(segment.rstrip('\\'))) % 2 == 0:
+                return i + 2
+            prev = i + 1
+            i = code.find('*/', prev)
+        return self._fail('/*', position)
+
+    def _verbatim(self, position):
+        """Буквальная строка: '\\' - обычный символ, "" - кавычка внутри строки"""
+        code = self.code
+        failed = self.failed.get('@"')
+        if failed is not None and position >= failed:
+            # после неудачи все группы кавычек дальше чётные, то есть состоят из пар ""
+            end = self._QUOTES.match(code, position).end()
+            return end if (end - position) % 2 == 1 else -1
+        i = code.find('"', position)
+        while i != -1:
+            if not code.startswith('"', i + 1):
+                return i + 1
+            i = code.find('"', i + 2)
+        return self._fail('@"', position)
+
+    def _interpolated(self, position, verbatim):
+        """Интерполированная строка: выражения {...} могут содержать строки и символы, {{ - скобка в тексте"""
+        code = self.code
+        text = self._VERBATIM_TEXT if verbatim else self._TEXT
+        while True:
+            match = text.search(code, position)
+            if match is None:
+                return -1
+            i = match.start()
+            if code[i] == '\\':
+                position = i + 2
+            elif code[i] == '"':
+                if not verbatim or not code.startswith('"', i + 1):
+                    return i + 1
+                position = i + 2
+            elif code.startswith('{', i + 1):
+                position = i + 2
+            else:
+                position = self._hole(i + 1)
+                if position == -1:
+                    return -1
+
+    def _hole(self, position):
+        """Конец выражения {...} (позиция после '}'); вложенные интерполированные строки разбираются как обычные"""
+        code = self.code
+        depth = 0
+        while True:
+            match = self._HOLE.search(code, position)
+            if match is None:
+                return -1
+            i = match.start()
+            c = code[i]
+            if c == '{':
+                depth += 1
+                position = i + 1
+            elif c == '}':
+                if depth == 0:
+                    return i + 1
+                depth -= 1
+                position = i + 1
+            else:
+                if c == '"' and code[i - 1] == '@':
+                    position = self._verbatim(i + 1)
+                else:
+                    position = self._regular(i + 1, c)
+                if position == -1:
+                    return -1
+
+
+@lru_cache(maxsize=4)
+def _ones(count):
+    """Число, в котором каждый из count 4-байтовых элементов равен 1"""
+    return int.from_bytes((1).to_bytes(4, sys.byteorder) * count, sys.byteorder)
+
+
+def _shifted(values, delta):
+    """Массив array('I') с прибавленным ко всем элементам delta (результат не должен быть отрицательным)
+
+    Массив складывается как одно большое число, в котором каждому элементу отведено 4 байта: так сдвиг
+    делается целиком на C, а переносов между элементами не бывает, потому что результат помещается в 4 байта"""
+    if delta == 0 or len(values) == 0:
+        return values
+    assert values.itemsize == 4
+    ones = _ones(len(values))
+    number = int.from_bytes(values.tobytes(), sys.byteorder)
+    number = number + delta * ones if delta > 0 else number - (-delta) * ones
+    result = array('I')
+    result.frombytes(number.to_bytes(4 * len(values), sys.byteorder))
+    return result
 
 
 class Tokenizer:
     def __init__(self):
         self.__compile_regular_expressions()
 
-        # К сожалению, эта красивая конструкция не нужна, так как методы нужно вызывать в определённом порядке :(
-        # self.__read_methods = [getattr(Tokenizer, m)
-        #                       for m in dir(Tokenizer)
-        #                       if re.match(r'^_try_read_', m)] + [getattr(Tokenizer, '_read_symbol')]
-        self.__read_methods = \
-            [self._try_read_space_token,
-             self._try_read_number,
-             self._try_read_token_word,
-             self._try_read_comment,
-             self._try_read_string_constant,
-             self._try_read_operator,
-             self._read_symbol]
-
     def __compile_regular_expressions(self):
         """Предварительная компиляция регулярных выражений"""
-        self.__regx_read_spaces = re.compile(r'\s+')
-        self.__regx_read_token_word = re.compile(r'\w+')
         ops = ("#".join(self.OPERATIONS)
                .replace('+', r'\+')
                .replace('*', r'\*')
@@ -50,151 +434,272 @@ class Tokenizer:
                .replace('/', r'\/')
                .replace('|', r'\|')
                .replace('#', r'|'))
-        self.__regx_read_operator = re.compile(ops)
 
-        regx_string_constant = r"""(?:(?:\$@)|(?:@\$)|(?:@)|(?:\$))?(["'])[\W\w]*?(?<!\\)(?:\\\\)*\1"""
-        regx_string_constant_without_end_quote = r"""(?:(?:\$@)|(?:@\$)|(?:@)|(?:\$))?(["'])[\W\w]*?(?=\n|$| )"""
-        self.__regx_read_string_constant = \
-            re.compile(f'(?:{regx_string_constant})|(?:{regx_string_constant_without_end_quote})')
-        self.__regx_read_oneline_comment = re.compile(r'//.*?(?=\n|$)')
+        # Строки и многострочные комментарии разбираются отдельными сканерами (_LiteralScanner),
+        # выражение находит только их начало
+        regx_literal_start = r'(?:\$@|@\$|@|\$)?["\']|/\*'
+        regx_oneline_comment = r'//[^\n]*'
 
-        regx_multiline_comment = r'\/\*[\w\W]*?(?<!\\)(?:\\\\)*\*\/'
-        regx_multiline_comment_without_closing_symbols = r'/\*.*?(?=\n|$| )'
-        self.__regx_read_multiline_comment = (
-            re.compile(f'(?:{regx_multiline_comment})|(?:{regx_multiline_comment_without_closing_symbols})'))
+        # Из двух вариантов числа (вещественное и целое) раньше выбирался самый длинный.
+        # Целое длиннее вещественного только тогда, когда у него есть суффикс u/l
+        regx_integer_number = r'[0-9]+(?:UL|Ul|uL|ul|LU|Lu|lU|lu|[uUlL])'
+        regx_real_number = r'(?:[0-9]*[.,][0-9]+|[0-9]+[.,]?)(?:[eE][-+]?[0-9]+)?[fFdDmM]?'
 
-        self.__regx_read_real_numbers = re.compile(r'(([0-9]*[.,][0-9]+)|([0-9]+[.,]?))(?:[eE][-+]?[0-9]+)?[fFdDmM]?')
-        self.__regx_read_integer_numbers = re.compile(r'([0-9]+((UL)|(Ul)|(uL)|(ul)|(LU)|(Lu)|(lU)|(lu)|[uUlL]?))')
+        # Порядок альтернатив совпадает с порядком, в котором раньше перебирались методы _try_read_*
+        self.__regx_token = re.compile('|'.join([
+            r'(?P<Space>[^\S\n]+|\n)',
+            f'(?P<NumberConstant>{regx_integer_number}|{regx_real_number})',
+            r'(?P<Word>\w+)',
+            f'(?P<Comment>{regx_oneline_comment})',
+            f'(?P<Literal>{regx_literal_start})',
+            f'(?P<Operation>{ops})',
+            r'(?P<Symbol>.)',
+        ]), re.DOTALL)
+        self.__keywords = frozenset(self.KEYWORDS)
+        self.__token_codes = {token_type.name: token_type.value for token_type in TokenType}
 
     def get_tokens(self, code):
         """Получение кода в виде токенов"""
-        self._index = 0
-        self._tokens = []
-        self._row = 1
-        self._code = code
-
-        while self._index < len(self._code):
-            for method in self.__read_methods:
-                if method():
+        return list(self.get_stream(code))
+
+    def get_stream(self, code):
+        """Получение кода в виде компактного потока токенов (TokenStream)"""
+        stream = TokenStream(code)
+        for _ in self._scan(stream, 0):
+            pass
+        self._group_lines(stream)
+        if len(stream) > 0:
+            stream.line_offsets.append(len(stream))
+        return stream
+
+    def _scan(self, stream, position, interpolation=True):
+        """Разбор stream.code с позиции position (начала строки кода, последней в stream.row_offsets):
+        токены и их позиции дописываются в массивы потока, после каждого токена выдаётся позиция его конца.
+        interpolation - см. _LiteralScanner"""
+        code = stream.code
+        literals = _LiteralScanner(code, interpolation)
+        starts, ends, types = stream.starts, stream.ends, stream.types
+        rows, columns, row_offsets = stream.rows, stream.columns, stream.row_offsets
+        row = len(row_offsets) - 1 + stream.first_row
+        line_start = row_offsets[-1]
+        keywords = self.__keywords
+        token_codes = self.__token_codes
+        finished = False
+        while not finished:
+            finished = True
+            for match in self.__regx_token.finditer(code, position):
+                kind = match.lastgroup
+                start, end = match.span()
+                if kind == 'Word':
+                    token_code = token_codes['Keyword' if match.group() in keywords else 'Identifier']
+                elif kind == 'Literal':
+                    kind, end, terminated = literals.scan(start, end)
+                    token_code = token_codes[kind]
+                    if not terminated:
+                        stream.unterminated.append(len(types))
+                else:
+                    token_code = token_codes[kind]
+                starts.append(start)
+                ends.append(end)
+                types.append(token_code)
+                rows.append(row)
+                columns.append(start - line_start + 1)
+                # перевод строки может быть только в пробельном токене '\n', строковой константе или комментарии
+                if kind == 'Space':
+                    if code[start] == '\n':
+                        row += 1
+                        line_start = end
+                        row_offsets.append(end)
+                elif kind == 'StringConstant' or kind == 'Comment':
+                    newline = code.find('\n', start, end)
+                    while newline != -1:
+                        row += 1
+                        line_start = newline + 1
+                        row_offsets.append(line_start)
+                        newline = code.find('\n', line_start, end)
+                yield end
+                # конец литерала нашёл сканер, дальше разбор продолжается с него
+                if end != match.end():
+                    position = end
+                    finished = False
                     break
-        self._calculate_token_positions()
-        return self._tokens
-
-    def _calculate_token_positions(self):
-        row, column = 1, 1
-        prev_token = None
-        for token in self._tokens:
-            token.row = row
-            token.column = column
-            if prev_token is not None and \
-                    prev_token.token_type == TokenType.StringConstant and \
-                    prev_token.value == token.value:
-                continue
-            row += token.value.count('\n')
-            if '\n' in token.value:
-                column = len(token.value) - token.value.rfind('\n')
-            else:
-                column += len(token.value)
-            prev_token = token
 
-    def get_lines(self, code):
-        """Группировка токенов по строкам как в исходном коде"""
-        lines = defaultdict(list)
-        for token in self.get_tokens(code):
-            lines[token.row].append(token)
-        return [sorted(line[1], key=lambda t: t.column) for line in sorted(lines.items())]
-
-    def _try_read_space_token(self):
-        space = self._read_spaces()
-        if space == None:
-            return False
-        spaces = filter(None, space.replace('\n', '#\n#').split('#'))
-        for s in spaces:
-            self._tokens.append(Token(s, TokenType.Space))
-        self._index += len(space)
-        return True
+    @staticmethod
+    def _group_lines(stream, begin=0, end=None):
+        """Токены уже упорядочены по строкам и столбцам, поэтому строки - это отрезки подряд идущих токенов.
+        Дописывает в line_offsets начала строк среди токенов (begin, end)"""
+        rows, line_offsets = stream.rows, stream.line_offsets
+        for i in range(begin + 1, len(rows) if end is None else end):
+            if rows[i] != rows[i - 1]:
+                line_offsets.append(i)
 
-    def _read_spaces(self):
-        spaces = self.__regx_read_spaces.match(self._code, self._index)
-        return spaces.group(0) if spaces else None
+    def update_stream(self, stream, begin, end, text):
+        """Повторный разбор после правки: stream.code[begin:end] заменяется на text
 
-    def _try_read_token_word(self):
-        char = self._code[self._index]
-        if not (char.isalnum() or char == '_'):
-            return False
-        current_token = self._read_word()
-        self._tokens.append(Token(current_token,
-                                  TokenType.Keyword if current_token in self.KEYWORDS else TokenType.Identifier))
-        return True
+        Разбор начинается с начала строки, в которой находится правка (или раньше - с незакрытой строковой
+        константы или комментария, если правка их закрыла), и идёт до тех пор, пока очередной
+        токен не закончится на границе токена из старого потока после правки. Дальше разбор совпадёт со
+        старым, поэтому остальные токены берутся из старого потока со сдвинутыми позициями, а столбцы
+        пересчитываются только до конца строки кода, в которой разбор сошёлся"""
+        old = stream
+        code = old.code[:begin] + text + old.code[end:]
+        delta = len(text) - (end - begin)
 
-    def _read_word(self):
-        word = self.__regx_read_token_word.match(self._code, self._index).group(0)
-        self._index += len(word)
-        return word
+        first = self._line_start(old, max(bisect_right(old.starts, begin) - 1, 0))
+        interpolation = True
+        for i in old.unterminated:
+            if i >= first:
+                break
+            if not self._is_same_unterminated(code, old, i, interpolation):
+                first = self._line_start(old, i)
+                break
+            interpolation = interpolation and not _LiteralScanner.is_interpolated(old.value(i))
+        interpolation = self._interpolation_before(old, first, True, 0)
 
-    def _try_read_string_constant(self):
-        current_token = self._read_string_constant()
-        if current_token is None:
-            return False
-        self._tokens.append(Token(current_token, TokenType.StringConstant))
-        if current_token.count('\n') > 0:
-            self._tokens.append(Token(current_token, TokenType.StringConstant))
-        return True
+        position = old.starts[first] if first < len(old) else 0
+        new = TokenStream(code)
+        new.starts, new.ends, new.types = old.starts[:first], old.ends[:first], old.types[:first]
+        new.rows, new.columns = old.rows[:first], old.columns[:first]
+        new.row_offsets = old.row_offsets[:bisect_right(old.row_offsets, position)]
+        new.first_row = old.first_row
+        new.unterminated = array('I', (i for i in old.unterminated if i < first))
+        # токен old[tail] совпадает с токеном new[tail + shift]
+        tail = len(old)
+        edit_end = begin + len(text)
+        # после незакрытой интерполированной строки остальные разбираются иначе (см. _LiteralScanner),
+        # поэтому разбор сходится со старым, только если это состояние у них одинаковое
+        for token_end in self._scan(new, position, interpolation):
+            if token_end >= edit_end:
+                j = bisect_left(old.starts, token_end - delta, first)
+                if j < len(old) and old.starts[j] == token_end - delta and \
+                        self._interpolation_before(new, len(new), interpolation, first) == \
+                        self._interpolation_before(old, j, interpolation, first):
+                    tail = j
+                    break
+        shift = len(new) - tail
+        new.starts.extend(_shifted(old.starts[tail:], delta))
+        new.ends.extend(_shifted(old.ends[tail:], delta))
+        new.types.extend(old.types[tail:])
+        new.unterminated.extend(_shifted(array('I', (i for i in old.unterminated if i >= tail)), shift))
 
-    def _read_string_constant(self):
-        string = self.__regx_read_string_constant.match(self._code, self._index)
-        if string is None:
-            return None
-        string = string.group(0)
-        self._index += len(string)
-        return string
-
-    def _try_read_operator(self):
-        op = self.__regx_read_operator.match(self._code, self._index)
-        if op is None:
-            return False
-        op = op.group(0)
-        self._tokens.append(Token(op, TokenType.Operation))
-        self._index += len(op)
-        return True
+        # у токенов из той же строки кода, что и old[tail], меняются столбцы, у остальных - только номер строки
+        row = len(new.row_offsets) - 1 + new.first_row
+        line_start = new.row_offsets[-1]
+        same_row_end = len(old) if tail == len(old) else old.line_offsets[bisect_right(old.line_offsets, tail)]
+        for i in range(tail, same_row_end):
+            new.rows.append(row)
+            new.columns.append(old.starts[i] + delta - line_start + 1)
+        if tail < len(old):
+            new.rows.extend(_shifted(old.rows[same_row_end:], row - old.rows[tail]))
+            new.columns.extend(old.columns[same_row_end:])
+            row_offset = bisect_right(old.row_offsets, old.starts[tail])
+            new.row_offsets.extend(_shifted(old.row_offsets[row_offset:], delta))
 
-    def _read_symbol(self):
-        char = self._code[self._index]
-        self._tokens.append(Token(char, TokenType.Symbol))
-        self._index += 1
-        return True
+        recalculated = same_row_end + shift
+        new.line_offsets = old.line_offsets[:max(bisect_left(old.line_offsets, first), 1)]
+        if 0 < first < len(new):
+            new.line_offsets.append(first)
+        self._group_lines(new, first, recalculated)
+        if same_row_end < len(old):
+            new.line_offsets.append(recalculated)
+            line = bisect_right(old.line_offsets, same_row_end)
+            new.line_offsets.extend(_shifted(old.line_offsets[line:-1], shift))
+        if len(new) > 0:
+            new.line_offsets.append(len(new))
+        return new
 
-    def _try_read_comment(self):
-        return self._read_oneline_comment() or self._read_multiline_comment()
+    @staticmethod
+    def _line_start(stream, i):
+        """Индекс первого токена строки кода, в которой начинается токен stream[i]"""
+        while i > 0 and not stream.is_newline(i - 1):
+            i -= 1
+        return i
 
-    def _read_oneline_comment(self):
-        result = self.__regx_read_oneline_comment.match(self._code, self._index)
-        if result is None:
+    def _is_same_unterminated(self, code, stream, i, interpolation):
+        """Остался ли незакрытый токен stream[i] (находящийся до правки) таким же в новом коде"""
+        match = self.__regx_token.match(code, stream.starts[i])
+        if match.lastgroup != 'Literal':
             return False
-        comment = result.group(0)
-        self._tokens.append(Token(comment, TokenType.Comment, self._row))
-        self._index += len(comment)
-        return True
+        kind, end, terminated = _LiteralScanner(code, interpolation).scan(*match.span())
+        return end == stream.ends[i] and not terminated
 
-    def _read_multiline_comment(self):
-        result = self.__regx_read_multiline_comment.match(self._code, self._index)
-        if result is None:
+    @staticmethod
+    def _interpolation_before(stream, index, interpolation, begin):
+        """Состояние interpolation сканера перед токеном stream[index], если перед stream[begin] оно было таким"""
+        if not interpolation:
             return False
-        comment = result.group(0)
-        self._tokens.append(Token(comment, TokenType.Comment, self._row))
-        self._index += len(comment)
+        for i in stream.unterminated:
+            if begin <= i < index and _LiteralScanner.is_interpolated(stream.value(i)):
+                return False
         return True
 
-    def _try_read_number(self):
-        real_number = self.__regx_read_real_numbers.match(self._code, self._index)
-        integer_number = self.__regx_read_integer_numbers.match(self._code, self._index)
-        result = max(filter(None, [real_number, integer_number]), key=lambda res: len(res.group(0)), default=None)
-        if result is None:
-            return False
-        number = result.group(0)
-        self._tokens.append(Token(number, TokenType.NumberConstant, self._row))
-        self._index += len(number)
-        return True
+    def get_lines(self, code):
+        """Группировка токенов по строкам как в исходном коде"""
+        return self.get_stream(code).lines
+
+    STREAM_CHUNK_SIZE = 1 << 16
+
+    def iter_lines(self, file_obj, chunk_size=STREAM_CHUNK_SIZE):
+        """Постепенный разбор файла: строки токенов (как в get_lines) выдаются по мере чтения файла"""
+        for stream in self.iter_streams(file_obj, chunk_size):
+            yield from stream.lines
+
+    def iter_streams(self, file_obj, chunk_size=STREAM_CHUNK_SIZE):
+        """Разбор файла частями: каждый поток содержит очередные законченные строки с номерами строк в файле
+
+        В памяти держится только непрочитанный до конца хвост. Строка считается законченной, если она
+        заканчивается переводом строки и до неё нет незакрытых строковых констант и комментариев: дальнейший
+        текст может их закрыть, и тогда разбор изменится. Пока такой хвост не закончен, он читается
+        кусками удваивающегося размера, чтобы разбирать его заново не слишком часто"""
+        pending = ''
+        row = 0
+        size = chunk_size
+        while True:
+            chunk = file_obj.read(size)
+            if not chunk:
+                break
+            pending += chunk
+            stream = self.get_stream(pending)
+            cut = self._find_complete_lines(stream)
+            if cut == 0:
+                size *= 2
+                continue
+            size = chunk_size
+            consumed = stream.starts[stream.line_offsets[cut]] if cut < len(stream.lines) else len(pending)
+            yield self._shift_rows(self._head_lines(stream, cut), row)
+            row += bisect_right(stream.row_offsets, consumed) - 1
+            pending = pending[consumed:]
+        if pending:
+            yield self._shift_rows(self.get_stream(pending), row)
+
+    @staticmethod
+    def _find_complete_lines(stream):
+        """Количество первых строк потока, разбор которых не изменится при дописывании текста"""
+        offsets = stream.line_offsets
+        lines_count = len(offsets) - 1
+        if stream.unterminated:
+            lines_count = bisect_right(offsets, stream.unterminated[0]) - 1
+        while lines_count > 0 and not stream.is_newline(offsets[lines_count] - 1):
+            lines_count -= 1
+        return lines_count
+
+    @staticmethod
+    def _head_lines(stream, lines_count):
+        """Поток из первых lines_count строк"""
+        end = stream.line_offsets[lines_count]
+        head = TokenStream(stream.code[:stream.ends[end - 1]])
+        head.starts, head.ends = stream.starts[:end], stream.ends[:end]
+        head.rows, head.columns, head.types = stream.rows[:end], stream.columns[:end], stream.types[:end]
+        head.line_offsets = stream.line_offsets[:lines_count + 1]
+        head.row_offsets = stream.row_offsets[:bisect_right(stream.row_offsets, len(head.code))]
+        head.unterminated = array('I', (i for i in stream.unterminated if i < end))
+        return head
+
+    @staticmethod
+    def _shift_rows(stream, row):
+        stream.rows = _shifted(stream.rows, row)
+        stream.first_row += row
+        return stream
 
     KEYWORDS = ['abstract', 'as', 'base', 'bool', 'break', 'byte', 'case',
                 'catch', 'char', 'checked', 'class', 'const', 'continue',
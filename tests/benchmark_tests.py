@@ -0,0 +1,82 @@
+import copy
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.benchmark import Benchmark
+from linter.tokenizer import Tokenizer
+from linter.errors_checker import ErrorsChecker
+
+
+class MyTestCase(unittest.TestCase):
+    def test_corpus(self):
+        generator = CorpusGenerator(seed=5, strings=0.5, comments=0.5)
+        code = generator.generate(1000)
+        self.assertEqual(code, generator.generate(1000))
+        self.assertNotEqual(code, CorpusGenerator(seed=6).generate(1000))
+        self.assertGreaterEqual(code.count('\n'), 1000)
+        self.assertLess(code.count('\n'), 1100)
+        # сгенерированный код без ошибок, пока не заданы непарные скобки
+        self.assertEqual([], ErrorsChecker.checking_for_errors(Tokenizer().get_lines(code)))
+        self.assertIn('/*', code)
+        self.assertIn('@"', code)
+        broken = CorpusGenerator(seed=5, unpaired=0.05).generate(1000)
+        self.assertNotEqual([], ErrorsChecker.checking_for_errors(Tokenizer().get_lines(broken)))
+        # без вложенных конструкций - только объявления, присваивания и вызовы
+        flat = CorpusGenerator(seed=5, depth=0).generate(300)
+        self.assertNotIn('if (', flat)
+        self.assertNotIn('for (', flat)
+
+    def test_run(self):
+        benchmark = Benchmark(CorpusGenerator(), [300, 100], repeat=1)
+        results = benchmark.run(['tokenizer.get_lines', 'settings.max_line_length', 'errors_checker'])
+        self.assertEqual(['tokenizer.get_lines', 'settings.max_line_length', 'errors_checker'], list(results))
+        measurement = results['errors_checker']['sizes']['300']
+        self.assertGreaterEqual(measurement['lines'], 300)
+        self.assertGreater(measurement['seconds'], 0)
+        self.assertIn('peak_kb', measurement)
+        self.assertEqual(['100', '300'], list(results['tokenizer.get_lines']['sizes']))
+
+    def test_exponent(self):
+        self.assertEqual(1.0, Benchmark.exponent({'1': {'lines': 1000, 'seconds': 0.01},
+                                                  '10': {'lines': 10000, 'seconds': 0.1}}))
+        self.assertEqual(2.0, Benchmark.exponent({'1': {'lines': 1000, 'seconds': 0.01},
+                                                  '10': {'lines': 10000, 'seconds': 1.0}}))
+        # слишком короткие замеры не сравниваются
+        self.assertIsNone(Benchmark.exponent({'1': {'lines': 1000, 'seconds': 0.0001},
+                                              '10': {'lines': 10000, 'seconds': 0.1}}))
+        self.assertIsNone(Benchmark.exponent({'1': {'lines': 1000, 'seconds': 0.01}}))
+
+    def test_compare(self):
+        baseline = {'corpus': CorpusGenerator().options(), 'style': 'digest', 'calibration': 0.1,
+                    'phases': {'errors_checker': {
+                        'sizes': {'100': {'lines': 100, 'seconds': 0.01, 'peak_kb': 100},
+                                  '1000': {'lines': 1000, 'seconds': 0.1, 'peak_kb': 1000}},
+                        'exponent': 1.0}}}
+        self.assertEqual([], Benchmark.compare(baseline, baseline, 0.5))
+
+        report = copy.deepcopy(baseline)
+        report['phases']['errors_checker']['sizes']['1000']['seconds'] = 0.2
+        self.assertEqual(1, len(Benchmark.compare(report, baseline, 0.5)))
+        # на машине вдвое медленнее то же время - не ухудшение
+        report['calibration'] = 0.2
+        self.assertEqual([], Benchmark.compare(report, baseline, 0.5))
+
+        report = copy.deepcopy(baseline)
+        report['phases']['errors_checker']['sizes']['1000']['peak_kb'] = 2000
+        report['phases']['errors_checker']['exponent'] = 1.5
+        regressions = Benchmark.compare(report, baseline, 0.5)
+        self.assertEqual(2, len(regressions))
+        self.assertIn('peak memory', regressions[0])
+        self.assertIn('lines^1.5', regressions[1])
+
+        report = copy.deepcopy(baseline)
+        report['corpus']['seed'] = 1
+        self.assertIn('corpus', Benchmark.compare(report, baseline, 0.5)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.tokenizer import Tokenizer
+from linter.brackets import BracketIndex
+
+
+class MyTestCase(unittest.TestCase):
+    parser = Tokenizer()
+
+    def test_partners_and_depths(self):
+        tokens = self.parser.get_tokens('f(a[1], {b})')
+        index = BracketIndex(tokens)
+        values = [token.value for token in tokens]
+        open_round, open_square, open_curly = values.index('('), values.index('['), values.index('{')
+        self.assertEqual(len(values) - 1, index.partner(open_round))
+        self.assertEqual(values.index(']'), index.partner(open_square))
+        self.assertEqual(open_curly, index.partner(values.index('}')))
+        self.assertEqual([0, 1, 1, 1, 1, 0], [index.depth(position) for position in index.positions])
+        self.assertEqual([], index.unpaired)
+
+    def test_unpaired_brackets(self):
+        tokens = self.parser.get_tokens('{ ( } )')
+        index = BracketIndex(tokens)
+        self.assertEqual(index.positions, index.unpaired)
+        self.assertIsNone(index.partner(index.positions[0]))
+
+    def test_index_is_built_once_for_lines(self):
+        lines = self.parser.get_lines('if (a)\n{\n    f(\n        b);\n}')
+        index = BracketIndex.of(lines)
+        self.assertIs(index, BracketIndex.of(lines))
+        self.assertEqual((0, 4), index.partner_in_lines(0, 2))
+        self.assertEqual((3, 2), index.partner_in_lines(2, 2))
+        self.assertEqual((1, 0), index.partner_in_lines(4, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
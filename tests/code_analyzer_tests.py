@@ -4,7 +4,7 @@ import unittest
 
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
 
-from linter.code_analyzer import CodeAnalyzer
+from linter.code_analyzer import CodeAnalyzer, CodeModel, FunctionCache
 from linter.tokenizer import Tokenizer
 
 
@@ -53,5 +53,75 @@ class MyTestCase(unittest.TestCase):
                               "Function: 'SecondFunction', cyclomatic complexity: 5"], cyclomatic_complexity)
 
 
+    def test_code_model(self):
+        with open("code_analyzer_test_code/test_get_cyclomatic_complexity.txt") as f:
+            code = f.read()
+        lines = self.parser.get_lines(code)
+        model = CodeModel.of(lines)
+        # модель строится один раз на файл
+        self.assertIs(model, CodeModel.of(lines))
+        self.assertEqual([('Main', 2), ('SecondFunction', 4)],
+                         [(function.name_token.value, function.decisions) for function in model.functions])
+        for function in model.functions:
+            self.assertEqual('{', model.tokens[function.begin_body_pos].value)
+            self.assertEqual('}', model.tokens[function.end_body_pos].value)
+        # для обычного списка строк модель та же
+        copy = CodeModel.of([list(line) for line in lines])
+        self.assertEqual([function.name_token.value for function in model.functions],
+                         [function.name_token.value for function in copy.functions])
+
+
+    def test_occurrences_index(self):
+        code = 'int F(int a, int b) { return G(b); }\nint G(int c) { return F(1, 1); }'
+        model = CodeModel.of(self.parser.get_lines(code))
+        self.assertEqual(2, model.count('F'))
+        self.assertEqual(0, model.count('H'))
+        self.assertEqual([('a', 1), ('c', 2)],
+                         [(token.value, token.row)
+                          for token in CodeAnalyzer._find_unused_function_arguments(model.tokens, model)])
+
+
+    def test_symbol_table_scopes(self):
+        code = '''void F(int a, int b) {
+    var x = b;
+    { var y = x; var z = 1; }
+    { var y = 2; Use(y); }
+}'''
+        tokens = CodeAnalyzer._remove_excess_tokens(self.parser.get_tokens(code))
+        unused_vars, unused_arguments = CodeAnalyzer._resolve_symbols(tokens)
+        # y из первого блока не используется, хотя в соседнем блоке есть другая y
+        self.assertEqual([('y', 3), ('z', 3)], [(token.value, token.row) for token in unused_vars])
+        self.assertEqual(['a'], [token.value for token in unused_arguments])
+
+    def test_symbol_table_deep_nesting(self):
+        depth = 3000
+        code = 'void F(int a) {\n' + ''.join(f'{{ var v{i} = a; var w{i} = v{i};\n' for i in range(depth)) + \
+               '}' * depth + '}'
+        unused = CodeAnalyzer.find_unused_objects(self.parser.get_lines(code))
+        self.assertEqual(depth + 1, len(unused))
+        self.assertEqual("Line 2: local variable 'w0' value is not used", unused[-2])
+
+
+    def test_function_cache(self):
+        with open("code_analyzer_test_code/test_find_unused_objects.txt") as f:
+            code = f.read()
+        cache = FunctionCache()
+
+        def analyze(code):
+            tokens = CodeAnalyzer._remove_excess_tokens(self.parser.get_tokens(code))
+            unused_vars, unused_arguments = CodeAnalyzer._resolve_symbols(tokens, cache=cache)
+            return [(token.value, token.row) for token in unused_vars + unused_arguments]
+
+        expected = analyze(code)
+        functions = cache.misses
+        self.assertEqual((0, functions), (cache.hits, len(cache)))
+        # форматирование не меняет ключи, строки в результате - новые
+        self.assertEqual([(value, row + 1) for value, row in expected], analyze('\n' + code.replace(' = ', '=')))
+        self.assertEqual((functions, functions), (cache.hits, cache.misses))
+        # после правки одной функции заново анализируется только она
+        analyze(code.replace('leftHalf', 'left_half'))
+        self.assertEqual(functions + 1, cache.misses)
+
+
 if __name__ == '__main__':
     unittest.main()
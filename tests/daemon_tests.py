@@ -0,0 +1,130 @@
+import json
+import io
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.tokenizer import Tokenizer
+from linter.stylecheck import Stylecheck
+from linter.daemon import Daemon
+
+
+class MyTestCase(unittest.TestCase):
+    def _call(self, daemon, method, params=None):
+        return json.loads(daemon.handle(json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method,
+                                                    'params': params or {}})))
+
+    def test_check_and_fix(self):
+        daemon = Daemon()
+        with open('example.cs', encoding='utf-8') as f:
+            code = f.read()
+        expected = Stylecheck().check(Tokenizer().get_lines(code), 'default.style')
+        self.assertEqual(expected, self._call(daemon, 'check', {'path': 'example.cs'})['result']['result'])
+        self.assertEqual(expected, self._call(daemon, 'check', {'path': 'a.cs', 'code': code})['result']['result'])
+        self.assertEqual({'fixed': 1, 'code': 'int a, b;\n'},
+                         self._call(daemon, 'fix', {'code': 'int a,b;\n'})['result'])
+        # уведомление (без id) выполняется без ответа
+        self.assertIsNone(daemon.handle('{"jsonrpc": "2.0", "method": "stats"}'))
+
+    def test_errors(self):
+        daemon = Daemon()
+        self.assertEqual(Daemon.PARSE_ERROR, json.loads(daemon.handle('{"id": 1'))['error']['code'])
+        self.assertEqual(Daemon.INVALID_REQUEST, json.loads(daemon.handle('[1, 2]'))['error']['code'])
+        self.assertEqual(Daemon.METHOD_NOT_FOUND, self._call(daemon, 'lint')['error']['code'])
+        self.assertEqual(Daemon.INVALID_PARAMS, self._call(daemon, 'check', {'file': 'example.cs'})['error']['code'])
+        self.assertEqual(Daemon.SERVER_ERROR, self._call(daemon, 'check', {'path': 'missing.cs'})['error']['code'])
+        self.assertEqual(Daemon.SERVER_ERROR,
+                         self._call(daemon, 'check', {'code': '', 'style': 'missing.style'})['error']['code'])
+        # после ошибок процесс продолжает отвечать
+        self.assertEqual(6, self._call(daemon, 'stats')['result']['requests'])
+
+    def test_style_reload(self):
+        daemon = Daemon()
+        with tempfile.TemporaryDirectory() as directory:
+            style = os.path.join(directory, 'my.style')
+            shutil.copy('default.style', style)
+            params = {'code': 'int a,b;\n', 'style': style}
+            self.assertEqual(1, self._call(daemon, 'fix', params)['result']['fixed'])
+            profile = daemon.profile(style)
+            # без изменения файла настройки не перечитываются
+            self.assertIs(profile, daemon.profile(style))
+
+            with open(style, encoding='utf-8') as f:
+                properties = json.load(f)
+            properties['space_after_comma'] = False
+            with open(style, 'w', encoding='utf-8') as f:
+                json.dump(properties, f)
+            os.utime(style, ns=(0, 0))
+            self.assertIsNot(profile, daemon.profile(style))
+            self.assertEqual(0, self._call(daemon, 'fix', params)['result']['fixed'])
+
+    def test_serve_stream(self):
+        daemon = Daemon()
+        requests = io.StringIO('{"id": 1, "method": "check", "params": {"code": "int a;\\n"}}\n\n'
+                               '{"id": 2, "method": "shutdown"}\n'
+                               '{"id": 3, "method": "stats"}\n')
+        output = io.StringIO()
+        daemon.serve_stream(requests, output)
+        responses = [json.loads(line) for line in output.getvalue().splitlines()]
+        # после shutdown запросы не читаются
+        self.assertEqual([1, 2], [response['id'] for response in responses])
+        stats = responses[1]['result']
+        self.assertEqual(1, stats['requests'])
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+    def _start_socket(self, daemon, path):
+        thread = threading.Thread(target=daemon.serve_socket, args=(path,), daemon=True)
+        thread.start()
+        # сокет готов, когда к нему можно подключиться
+        for _ in range(500):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                if client.connect_ex(path) == 0:
+                    break
+            time.sleep(0.01)
+        return thread
+
+    def test_serve_socket(self):
+        daemon = Daemon()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'linter.sock')
+            # сокет, оставшийся от завершившегося процесса, заменяется
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+                stale.bind(path)
+            thread = self._start_socket(daemon, path)
+            response = Daemon.request(path, 'check', {'path': 'example.cs'})
+            self.assertEqual(self._call(Daemon(), 'check', {'path': 'example.cs'}), response)
+            self.assertEqual(1, Daemon.request(path, 'shutdown', request_id=2)['result']['requests'])
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+            self.assertFalse(os.path.exists(path))
+
+    def test_socket_path_in_use(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # файл, который не является сокетом, не удаляется
+            path = os.path.join(directory, 'linter.sock')
+            with open(path, 'w') as f:
+                f.write('data')
+            with self.assertRaises(FileExistsError):
+                Daemon().serve_socket(path)
+            with open(path) as f:
+                self.assertEqual('data', f.read())
+
+            # сокет работающего процесса не перехватывается
+            path = os.path.join(directory, 'running.sock')
+            thread = self._start_socket(Daemon(), path)
+            with self.assertRaises(FileExistsError):
+                Daemon().serve_socket(path)
+            self.assertEqual(0, Daemon.request(path, 'shutdown')['result']['requests'])
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
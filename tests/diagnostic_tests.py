@@ -0,0 +1,39 @@
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.diagnostic import Diagnostic
+
+
+class MyTestCase(unittest.TestCase):
+    def test_text(self):
+        diagnostic = Diagnostic(3, 7, 'expected ;', 'require_semicolons')
+        self.assertEqual('Line 3: expected ;', diagnostic)
+        self.assertEqual((3, 7, 'expected ;', 'require_semicolons'),
+                         (diagnostic.row, diagnostic.column, diagnostic.message, diagnostic.rule))
+        self.assertEqual('Line 3, column 7: expected ;', Diagnostic(3, 7, 'expected ;', with_column=True))
+
+    def test_parse(self):
+        diagnostic = Diagnostic.parse("Line 12, column 4: it looks like this bracket doesn't have a pair")
+        self.assertEqual((12, 4, "it looks like this bracket doesn't have a pair"),
+                         (diagnostic.row, diagnostic.column, diagnostic.message))
+        diagnostic = Diagnostic.parse("Line 26: expected '{'")
+        self.assertEqual((26, None, "expected '{'"), (diagnostic.row, diagnostic.column, diagnostic.message))
+        self.assertIsNone(Diagnostic.parse('--- ERRORS ---'))
+        self.assertIsNone(Diagnostic.parse('Total errors: 1'))
+
+    def test_dump_and_pickle(self):
+        lines = ['--- require_semicolons ---', Diagnostic(3, 7, 'expected ;', 'require_semicolons'),
+                 Diagnostic(5, 1, "it looks like this bracket doesn't have a pair", 'errors', with_column=True)]
+        for restored in (Diagnostic.load(Diagnostic.dump(lines)), pickle.loads(pickle.dumps(lines))):
+            self.assertEqual(lines, restored)
+            self.assertEqual([type(line) for line in lines], [type(line) for line in restored])
+            self.assertEqual([(line.row, line.column, line.rule, line.with_column) for line in lines[1:]],
+                             [(line.row, line.column, line.rule, line.with_column) for line in restored[1:]])
+
+
+if __name__ == '__main__':
+    unittest.main()
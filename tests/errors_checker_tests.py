@@ -1,4 +1,5 @@
 import os
+import random
 import sys
 import unittest
 
@@ -26,6 +27,16 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(1, len(errors), msg="The number of errors does not match")
         self.assertEqual('Line 3: the multiline comment has no closing characters', errors[0])
 
+    def test_unterminated_flags(self):
+        code = 'a = @"C:\\";\nb = /* c\nd = \'e\nf = "g'
+        lines = self.parser.get_lines(code)
+        expected = ['Line 3: the string does not have a closing quotation mark',
+                    'Line 4: the string does not have a closing quotation mark',
+                    'Line 2: the multiline comment has no closing characters']
+        self.assertEqual(expected, ErrorsChecker.checking_for_errors(lines))
+        # строки, собранные из готовых токенов, проверяются так же
+        self.assertEqual(expected, ErrorsChecker.checking_for_errors([list(line) for line in lines]))
+
     def test_correct_brackets(self):
         code = '({[]})'
         lines = self.parser.get_lines(code)
@@ -51,5 +62,70 @@ class MyTestCase(unittest.TestCase):
         # Нашло 0 ошибок: разные типы скобок проверяются отдельно друг от друга. На данном примере ошибок "нет"
         self.assertEqual(0, len(errors))
 
+    def test_windows_same_as_dp(self):
+        """Сравнение быстрого алгоритма с точным ДП на случайных скобочных последовательностях"""
+        generator = random.Random(42)
+        for _ in range(1500):
+            if generator.random() < 0.5:
+                code = ''.join(generator.choice('()[]{}') for _ in range(generator.randint(0, 24)))
+            else:
+                # правильная последовательность с несколькими лишними или удалёнными скобками
+                brackets = list(self._balanced(generator, 0))
+                for _ in range(generator.randint(1, 3)):
+                    position = generator.randint(0, len(brackets))
+                    if brackets and generator.random() < 0.5:
+                        del brackets[min(position, len(brackets) - 1)]
+                    else:
+                        brackets.insert(position, generator.choice('()[]{}'))
+                code = ''.join(brackets)
+            lines = self.parser.get_lines(code)
+            expected_count, expected = ErrorsChecker._checking_brackets_by_dp(lines)
+            count, wrong_brackets = ErrorsChecker._checking_brackets_by_windows(lines)
+            self.assertEqual(expected_count, count, msg=code)
+            # не только столько же, но и те же самые скобки
+            self.assertEqual(sorted((bracket.row, bracket.column) for bracket in expected),
+                             [(bracket.row, bracket.column) for bracket in wrong_brackets], msg=code)
+
+    def _balanced(self, generator, depth):
+        for _ in range(generator.randint(0, 3)):
+            opening, closing = generator.choice(['()', '[]', '{}'])
+            yield opening
+            if depth < 4:
+                yield from self._balanced(generator, depth + 1)
+            yield closing
+
+    def test_missing_closing_brace(self):
+        # виновата скобка, которую забыли закрыть, а не самая внешняя
+        code = 'namespace N\n{\n    class C\n    {\n        void F()\n        {\n            if (x) {\n' \
+               '                f();\n        }\n    }\n}\n'
+        lines = self.parser.get_lines(code)
+        self.assertEqual([(7, 20)], [(bracket.row, bracket.column)
+                                     for bracket in ErrorsChecker._checking_brackets_by_dp(lines)[1]])
+        self.assertEqual(["Line 7, column 20: it looks like this bracket doesn't have a pair"],
+                         ErrorsChecker.checking_for_errors(lines))
+
+    def test_large_window(self):
+        # участок больше прежнего предела в 100 скобок ДП решает точно
+        generator = random.Random(7)
+        code = ''.join(generator.choice('([{') + generator.choice(')]}') for _ in range(90))
+        lines = self.parser.get_lines(code)
+        self.assertEqual(ErrorsChecker._checking_brackets_by_dp(lines)[0],
+                         ErrorsChecker._checking_brackets_by_windows(lines)[0])
+        # на участке больше DP_WINDOW_LIMIT ответ может быть не минимальным - об этом есть сообщение
+        limit = ErrorsChecker.DP_WINDOW_LIMIT
+        try:
+            ErrorsChecker.DP_WINDOW_LIMIT = 10
+            errors = ErrorsChecker.checking_for_errors(lines)
+        finally:
+            ErrorsChecker.DP_WINDOW_LIMIT = limit
+        self.assertIn('too many brackets without a pair', errors[0])
+
+    def test_windows_on_large_code(self):
+        code = '{\n' + '    if (a) { f(x[1]); }\n' * 3000 + '    ( }\n' * 20 + '}\n'
+        lines = self.parser.get_lines(code)
+        count, wrong_brackets = ErrorsChecker._checking_brackets_by_windows(lines)
+        self.assertEqual(40, count)
+        self.assertEqual((3002, 5), (wrong_brackets[0].row, wrong_brackets[0].column))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.fixer import Fixer
+from linter.style_profile import StyleProfile
+
+
+class MyTestCase(unittest.TestCase):
+    fixer = Fixer('default.style')
+    CODE = ('class A\n'
+            '{\n'
+            '    void F(int a,int b)   \n'
+            '    {\n'
+            '        if(a) {x = 1;}\n'
+            '        int c  =  2;\n'
+            '        return;\n'
+            '    }\n'
+            '}\n')
+    FIXED = ('class A\n'
+             '{\n'
+             '    void F(int a, int b)\n'
+             '    {\n'
+             '        if (a) {x = 1;}\n'
+             '        int c = 2;\n'
+             '\n'
+             '        return;\n'
+             '    }\n'
+             '}\n')
+
+    def test_fix_code(self):
+        self.assertEqual((self.FIXED, 6), self.fixer.fix_code(self.CODE))
+        self.assertEqual((self.FIXED, 0), self.fixer.fix_code(self.FIXED))
+        # код с ошибками не исправляется
+        self.assertEqual(('int a,b = "c;\n', None), self.fixer.fix_code('int a,b = "c;\n'))
+
+    def test_only_profile_rules(self):
+        fixer = Fixer(StyleProfile({'space_after_comma': True}))
+        self.assertEqual(self.CODE.replace('a,int', 'a, int'), fixer.fix_code(self.CODE)[0])
+
+    def test_apply(self):
+        code = 'abcdef'
+        # пересекающиеся правки и повторная вставка в то же место пропускаются
+        edits = [(4, 6, 'X'), (1, 3, ''), (2, 5, 'Y'), (1, 1, '['), (1, 1, '('), (6, 6, '!')]
+        self.assertEqual(('a[dX!', 4), Fixer.apply(code, edits))
+        self.assertEqual((code, 0), Fixer.apply(code, []))
+
+    def test_fix_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.cs')
+            with open(path, 'wb') as f:
+                f.write(self.CODE.replace('\n', '\r\n').encode('utf-8'))
+            self.assertEqual(6, self.fixer.fix_file(path))
+            with open(path, 'rb') as f:
+                self.assertEqual(self.FIXED.replace('\n', '\r\n').encode('utf-8'), f.read())
+            modified = os.stat(path).st_mtime_ns
+            self.assertEqual(0, self.fixer.fix_file(path))
+            self.assertEqual(modified, os.stat(path).st_mtime_ns)
+            self.assertEqual(['a.cs'], os.listdir(directory))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.git_diff import GitDiff, GitError
+from linter.runner import Runner
+
+
+class MyTestCase(unittest.TestCase):
+    DIFF = '''diff --git a/src/A.cs b/src/A.cs
+index 1111111..2222222 100644
+--- a/src/A.cs
++++ b/src/A.cs
+@@ -3 +3 @@ class A
+-int a;
++int a,b;
+@@ -10,0 +11,2 @@ class A
+++++ c;
++++ d;
+@@ -20,2 +21,0 @@ class A
+-x;
+-y;
+diff --git a/Old.cs b/Old.cs
+deleted file mode 100644
+--- a/Old.cs
++++ /dev/null
+@@ -1 +0,0 @@
+-int a;
+diff --git "a/\\320\\257 \\"q\\".cs" "b/\\320\\257 \\"q\\".cs"
+--- "a/\\320\\257 \\"q\\".cs"
++++ "b/\\320\\257 \\"q\\".cs"
+@@ -1,0 +1 @@
++int a;
+diff --git a/Removed.cs b/Removed.cs
+--- a/Removed.cs
++++ b/Removed.cs
+@@ -5 +4,0 @@
+-int a;
+'''
+
+    def test_parse(self):
+        # строки фрагмента, похожие на заголовок ('+++ d;'), заголовком не считаются
+        self.assertEqual({'src/A.cs': {3, 11, 12}, 'Я "q".cs': {1}, 'Removed.cs': set()}, GitDiff.parse(self.DIFF))
+
+    def _git(self, directory, *arguments):
+        subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@test'] + list(arguments),
+                       cwd=directory, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    @unittest.skipUnless(shutil.which('git'), 'git is not installed')
+    def test_repository(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self._git(directory, 'init', '-q')
+            os.mkdir(os.path.join(directory, 'src'))
+            for name in ('a.cs', 'b.cs', 'c.txt'):
+                shutil.copy('example.cs', os.path.join(directory, 'src', name))
+            self._git(directory, 'add', '.')
+            self._git(directory, 'commit', '-q', '-m', 'init')
+
+            with open(os.path.join(directory, 'src', 'a.cs'), 'a', encoding='utf-8') as f:
+                f.write('int a,b;\n')
+            for name in ('a.cs', 'c.txt'):
+                self._git(directory, 'add', os.path.join('src', name))
+            with open(os.path.join(directory, 'src', 'a.cs'), 'a', encoding='utf-8') as f:
+                f.write('int c,d;\n')
+            # в рабочей папке изменена первая строка b.cs
+            with open(os.path.join(directory, 'src', 'b.cs'), 'r+', encoding='utf-8') as f:
+                f.write('#')
+
+            diff = GitDiff('HEAD', cwd=directory)
+            self.assertEqual({os.path.join('src', 'a.cs'): {84, 85}, os.path.join('src', 'b.cs'): {1}}, diff.changes)
+            self.assertEqual({}, diff.contents)
+            self.assertEqual([os.path.join('src', 'a.cs')], list(GitDiff('HEAD', pathspecs=['src/a.cs'],
+                                                                         cwd=directory).changes))
+
+            # в индексе - только первая добавленная строка, файл читается из индекса
+            staged = GitDiff(staged=True, cwd=directory)
+            path = os.path.join('src', 'a.cs')
+            self.assertEqual({path: {84}}, staged.changes)
+            self.assertTrue(staged.contents[path].endswith(b'int a,b;\n'))
+
+            with self.assertRaises(GitError):
+                GitDiff('no-such-revision', cwd=directory)
+
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                staged = GitDiff(staged=True)
+                _, (_, result) = next(Runner(os.path.join(cwd, 'default.style'), 1, changes=staged.changes,
+                                             contents=staged.contents).check_files([path]))
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(['--- space_after_comma ---', "Line 84: expected space after ','", '',
+                              'Total errors: 1'], result[3:7])
+
+
+if __name__ == '__main__':
+    unittest.main()
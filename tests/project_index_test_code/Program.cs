@@ -0,0 +1,13 @@
+using System;
+
+namespace Project
+{
+    class Program
+    {
+        static void Main(string[] args)
+        {
+            var text = Helper.Format(args[0]);
+            Console.WriteLine(text);
+        }
+    }
+}
@@ -0,0 +1,32 @@
+namespace Project
+{
+    static class Helper
+    {
+        private static readonly string Prefix = MakePrefix();
+
+        public static string Format(string text)
+        {
+            return Prefix + Trim(text);
+        }
+
+        private static string Trim(string text)
+        {
+            return text.Trim();
+        }
+
+        private static string MakePrefix()
+        {
+            return "> ";
+        }
+
+        public static void Unused(string text)
+        {
+            Dead(text);
+        }
+
+        private static void Dead(string text)
+        {
+            Console.WriteLine(text);
+        }
+    }
+}
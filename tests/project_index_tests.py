@@ -0,0 +1,94 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.code_analyzer import CodeAnalyzer
+from linter.project_index import ProjectIndex
+from linter.tokenizer import Tokenizer
+
+
+class MyTestCase(unittest.TestCase):
+    parser = Tokenizer()
+    ROOT = 'project_index_test_code'
+    HELPER = os.path.join(ROOT, 'Utils', 'Helper.cs')
+
+    def setUp(self):
+        self.index = ProjectIndex()
+        self.index.update(ProjectIndex.find_sources(self.ROOT))
+
+    def get_helper_lines(self):
+        with open(self.HELPER) as f:
+            return self.parser.get_lines(f.read())
+
+    def test_find_sources(self):
+        self.assertEqual([os.path.join(self.ROOT, 'Program.cs'), self.HELPER], ProjectIndex.find_sources(self.ROOT))
+
+    def test_references_from_other_files(self):
+        lines = self.get_helper_lines()
+        # без индекса Format считается неиспользуемым: его вызывают только из Program.cs
+        self.assertIn("Line 7: method 'Format' is not used", CodeAnalyzer.find_unused_objects(lines))
+        self.assertEqual(["Line 22: method 'Unused' is not used"],
+                         CodeAnalyzer.find_unused_objects(lines, self.index))
+        self.assertTrue(self.index.is_referenced('Dead'))
+
+    def test_reachability(self):
+        self.assertEqual({'Main', 'Format', 'Trim', 'MakePrefix'}, self.index.reachable())
+        self.assertEqual(["Line 22: method 'Unused' is not reachable from the entry point",
+                          "Line 27: method 'Dead' is not reachable from the entry point"],
+                         CodeAnalyzer.find_unreachable_methods(self.get_helper_lines(), self.index))
+
+    def test_update_file(self):
+        with open(self.HELPER) as f:
+            code = f.read()
+        self.assertFalse(self.index.update_file(self.HELPER, code))
+        self.assertTrue(self.index.update_file(self.HELPER, code.replace('Dead(text);', 'Format(text);')))
+        self.assertFalse(self.index.is_referenced('Dead'))
+        self.assertTrue(self.index.is_referenced('Format'))
+
+        self.index.remove_file(os.path.join(self.ROOT, 'Program.cs'))
+        self.assertFalse(self.index.has_entry_point())
+        # код вне методов (инициализатор поля) достижим и без точки входа
+        self.assertEqual({'MakePrefix'}, self.index.reachable())
+
+    def test_save_and_load(self):
+        root = tempfile.mkdtemp()
+        try:
+            shutil.copytree(self.ROOT, os.path.join(root, 'project'))
+            project = os.path.join(root, 'project')
+            index = ProjectIndex.open(project)
+            self.assertTrue(os.path.exists(os.path.join(project, ProjectIndex.FILE_NAME)))
+
+            loaded = ProjectIndex.load(os.path.join(project, ProjectIndex.FILE_NAME))
+            self.assertEqual(index.references, loaded.references)
+            self.assertEqual(index.definitions, loaded.definitions)
+            # неизменённые файлы повторно не разбираются
+            self.assertEqual(0, loaded.update(ProjectIndex.find_sources(project)))
+            with open(os.path.join(project, 'Program.cs'), 'a') as f:
+                f.write('\n')
+            self.assertEqual(1, loaded.update(ProjectIndex.find_sources(project)))
+        finally:
+            shutil.rmtree(root)
+
+    def test_parallel_same_as_sequential(self):
+        paths = ProjectIndex.find_sources(self.ROOT) * 5
+        copies = [os.path.join(self.ROOT, f'copy_{i}.cs') for i in range(len(paths))]
+        try:
+            for source, copy in zip(paths, copies):
+                shutil.copyfile(source, copy)
+            sequential = ProjectIndex()
+            sequential.update(copies, jobs=1)
+            parallel = ProjectIndex()
+            parallel.update(copies, jobs=2)
+            self.assertEqual(sequential.files, parallel.files)
+            self.assertEqual(sequential.references, parallel.references)
+        finally:
+            for copy in copies:
+                os.remove(copy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.reporters import Reporter
+from linter.stylecheck import Stylecheck
+from linter.tokenizer import Tokenizer
+
+
+class MyTestCase(unittest.TestCase):
+    with open('settings_test_code/test_all_expected.txt', encoding='utf-8') as f:
+        RESULT = f.read().split('\n')
+
+    def _report(self, name, results):
+        output = io.StringIO()
+        reporter = Reporter.create(name, output, 'default.style')
+        reporter.start()
+        for path, result in results:
+            reporter.report(path, result)
+        reporter.finish()
+        return output.getvalue()
+
+    def test_diagnostics(self):
+        diagnostics = list(Reporter.diagnostics('example.cs', self.RESULT))
+        self.assertEqual(8, len(diagnostics))
+        self.assertEqual({'file': 'example.cs', 'line': 26, 'column': None, 'rule': 'always_use_braces',
+                          'level': 'warning', 'message': "expected '{'"}, diagnostics[0])
+        self.assertEqual(['always_use_braces'] * 3 + ['unused_objects'] * 5, [item['rule'] for item in diagnostics])
+        self.assertEqual("method 'Main' is not used", diagnostics[-1]['message'])
+
+        result = ['The file cannot be checked: no such file']
+        self.assertEqual([(None, 'linter', 'error', result[0])],
+                         [(item['line'], item['rule'], item['level'], item['message'])
+                          for item in Reporter.diagnostics('a.cs', result)])
+        result = ['#' * 5, 'TITLE', '#' * 5, '--- ERRORS ---', 'Line 3: the string does not have a closing quotation mark',
+                  '--- CYCLOMATIC COMPLEXITY ---', 'The indentation style check cannot be performed']
+        self.assertEqual([(3, 'errors', 'error')],
+                         [(item['line'], item['rule'], item['level']) for item in Reporter.diagnostics('a.cs', result)])
+
+    def test_location(self):
+        # место берётся из замечаний проверки, а не из текста: у ошибок скобок и правил есть и столбец
+        code = 'class A\n{\n    void M()\n    {\n        int x = (1;\n    }\n}\n'
+        result = Stylecheck().check(Tokenizer().get_lines(code), 'default.style')
+        self.assertIn("Line 5, column 17: it looks like this bracket doesn't have a pair", result)
+        expected = {'file': 'a.cs', 'line': 5, 'column': 17, 'rule': 'errors', 'level': 'error',
+                    'message': "it looks like this bracket doesn't have a pair"}
+        lines = self._report('jsonl', [('a.cs', result)]).splitlines()
+        self.assertEqual([expected], [json.loads(line) for line in lines])
+        sarif = json.loads(self._report('sarif', [('a.cs', result)]))
+        self.assertEqual([{'ruleId': 'errors', 'level': 'error', 'message': {'text': expected['message']},
+                           'locations': [{'physicalLocation': {'artifactLocation': {'uri': 'a.cs'},
+                                                               'region': {'startLine': 5, 'startColumn': 17}}}]}],
+                         sarif['runs'][0]['results'])
+
+        with open('example.cs', encoding='utf-8') as f:
+            result = Stylecheck().check(Tokenizer().get_lines(f.read()), 'default.style')
+        self.assertEqual([(26, 9, 'always_use_braces'), (20, 17, 'unused_objects')],
+                         [(item['line'], item['column'], item['rule'])
+                          for item in Reporter.diagnostics('example.cs', result)][::7])
+        # строки результата без замечаний (например, из файла) разбираются по тексту
+        self.assertEqual([(5, 17), (6, None)], [(item['line'], item['column']) for item in Reporter.diagnostics(
+            'a.cs', ['--- ERRORS ---', "Line 5, column 17: it looks like this bracket doesn't have a pair",
+                     'Line 6: the string does not have a closing quotation mark'])])
+
+    def test_text(self):
+        text = self._report('text', [('a.cs', ['x', 'y']), ('b.cs', iter(['z']))])
+        self.assertEqual('Your file: "a.cs"\nYour style: "default.style"\n\nx\ny\n\n'
+                         'Your file: "b.cs"\nYour style: "default.style"\n\nz', text)
+
+    def test_json_lines(self):
+        lines = self._report('jsonl', [('a.cs', self.RESULT), ('b.cs', []), ('c.cs', self.RESULT)]).splitlines()
+        self.assertEqual(16, len(lines))
+        self.assertEqual(list(Reporter.diagnostics('c.cs', self.RESULT)), [json.loads(line) for line in lines[8:]])
+
+    def test_sarif(self):
+        for count, results in ((0, []), (0, [('a.cs', [])]),
+                               (16, [('a.cs', self.RESULT), (os.path.join('d', 'b.cs'), self.RESULT)])):
+            sarif = json.loads(self._report('sarif', results))
+            self.assertEqual('2.1.0', sarif['version'])
+            self.assertEqual(count, len(sarif['runs'][0]['results']))
+        result = sarif['runs'][0]['results'][-1]
+        self.assertEqual('unused_objects', result['ruleId'])
+        self.assertEqual({'artifactLocation': {'uri': 'd/b.cs'}, 'region': {'startLine': 20}},
+                         result['locations'][0]['physicalLocation'])
+
+
+if __name__ == '__main__':
+    unittest.main()
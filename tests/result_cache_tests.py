@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.result_cache import ResultCache
+
+
+class MyTestCase(unittest.TestCase):
+    def test_key(self):
+        key = ResultCache.key(b'int a;', 'style', 'check')
+        self.assertEqual(key, ResultCache.key(b'int a;', 'style', 'check'))
+        self.assertNotEqual(key, ResultCache.key(b'int b;', 'style', 'check'))
+        self.assertNotEqual(key, ResultCache.key(b'int a;', 'other style', 'check'))
+        self.assertNotEqual(key, ResultCache.key(b'int a;', 'style', 'fix'))
+        self.assertEqual(40, len(ResultCache.linter_version()))
+
+    def test_get_and_put(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+            key = ResultCache.key(b'int a;')
+            self.assertIsNone(cache.get(key))
+            cache.put(key, [None, ['Total errors: 0']])
+            self.assertEqual([None, ['Total errors: 0']], cache.get(key))
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+            # испорченный результат считается отсутствующим
+            with open(cache._path(key), 'w') as f:
+                f.write('[null, ["Total')
+            self.assertIsNone(cache.get(key))
+
+    def test_prune(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+            keys = [ResultCache.key(str(i).encode()) for i in range(5)]
+            for i, key in enumerate(keys):
+                cache.put(key, ['x' * 100])
+                os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+            # чтение обновляет время использования
+            cache.get(keys[0])
+            cache.max_size = 3 * os.path.getsize(cache._path(keys[0]))
+            self.assertEqual(2, cache.prune())
+            self.assertEqual([True, False, False, True, True], [cache.get(key) is not None for key in keys])
+
+    def test_prune_only_own_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            # кэш в папке, где есть чужие файлы (например, --cache .)
+            cache = ResultCache(directory, max_size=0)
+            key = ResultCache.key(b'code')
+            cache.put(key, ['x' * 100])
+            temp_path = os.path.join(os.path.dirname(cache._path(key)), 'tmpab12cd_3.tmp')
+            own = [os.path.join(directory, 'notes.txt'), os.path.join(directory, 'src', 'Program.cs'),
+                   os.path.join(directory, 'ab', 'readme.json'), os.path.dirname(cache._path(key)) + '.json']
+            for path in own + [temp_path]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w') as f:
+                    f.write('x' * 1000)
+            self.assertEqual(2, cache.prune())
+            self.assertFalse(os.path.exists(cache._path(key)))
+            self.assertFalse(os.path.exists(temp_path))
+            self.assertTrue(all(os.path.exists(path) for path in own))
+
+
+if __name__ == '__main__':
+    unittest.main()
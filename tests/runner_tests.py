@@ -0,0 +1,110 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.tokenizer import Tokenizer
+from linter.stylecheck import Stylecheck
+from linter.runner import Runner
+from linter.result_cache import ResultCache
+from linter.style_profile import StyleProfile
+from linter.reporters import Reporter
+
+
+class MyTestCase(unittest.TestCase):
+    FILES = [os.path.join('project_index_test_code', 'Program.cs'),
+             os.path.join('project_index_test_code', 'Utils', 'Helper.cs')]
+
+    def test_find_files(self):
+        self.assertEqual(self.FILES, Runner.find_files(['project_index_test_code']))
+        self.assertEqual(self.FILES[1:], Runner.find_files([os.path.join('project_index_test_code', '*', '*.cs')]))
+        self.assertEqual(self.FILES, Runner.find_files([os.path.join('project_index_test_code', '**', '*.cs')]))
+        # порядок - как в списке источников, повторы пропускаются
+        stdin = io.StringIO('\0'.join(reversed(self.FILES)) + '\0')
+        self.assertEqual(['example.cs'] + self.FILES[::-1], Runner.find_files(['example.cs', '-', 'example.cs'], stdin))
+
+    def test_check_files(self):
+        paths = (self.FILES + ['example.cs', 'missing.cs']) * 3
+        expected = []
+        for path in paths:
+            if path == 'missing.cs':
+                expected.append((path, None))
+                continue
+            with open(path, encoding='utf-8') as f:
+                expected.append((path, Stylecheck().check(Tokenizer().get_lines(f.read()), 'default.style')))
+
+        for jobs in (1, 3):
+            runner = Runner('default.style', jobs)
+            runner.PARALLEL_THRESHOLD = 2
+            result = list(runner.check_files(paths))
+            self.assertEqual([path for path, check in expected], [path for path, check in result])
+            for (path, check), (result_path, (fixed, result_check)) in zip(expected, result):
+                self.assertIsNone(fixed)
+                if check is None:
+                    self.assertTrue(result_check[0].startswith('The file cannot be checked'))
+                else:
+                    self.assertEqual(check, result_check)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name in ('a.cs', 'b.cs', 'c.cs'):
+                paths.append(os.path.join(directory, name))
+                shutil.copy('example.cs', paths[-1])
+            expected = list(Runner('default.style', 1).check_files(paths))
+
+            # одинаковые файлы проверяются один раз
+            cache = ResultCache(os.path.join(directory, 'cache'))
+            self.assertEqual(expected, list(Runner('default.style', 1, cache=cache).check_files(paths)))
+            self.assertEqual((0, 1), (cache.hits, cache.misses))
+            cached = list(Runner('default.style', 1, cache=cache).check_files(paths))
+            self.assertEqual(expected, cached)
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+            # место и правило замечаний сохраняются в кэше
+            self.assertEqual(list(Reporter.diagnostics('a.cs', expected[0][1][1])),
+                             list(Reporter.diagnostics('a.cs', cached[0][1][1])))
+
+            # результат зависит от настроек и режима
+            key = Runner('default.style', 1)._key(b'')
+            self.assertNotEqual(key, Runner(StyleProfile({'max_line_length': 10}), 1)._key(b''))
+            self.assertNotEqual(key, Runner('default.style', 1, fix=True)._key(b''))
+
+    def test_fix_with_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.cs')
+            with open(path, 'w') as f:
+                f.write('int a,b;\n')
+            cache = ResultCache(os.path.join(directory, 'cache'))
+            fixed, result = next(Runner('default.style', 1, fix=True, cache=cache).check_files([path]))[1]
+            self.assertEqual(1, fixed)
+            # после исправления результат не сохраняется: следующий запуск проверяет, что исправлять больше нечего
+            self.assertEqual((0, result), next(Runner('default.style', 1, fix=True, cache=cache).check_files([path]))[1])
+            self.assertEqual(0, cache.hits)
+            self.assertEqual((0, result), next(Runner('default.style', 1, fix=True, cache=cache).check_files([path]))[1])
+            self.assertEqual(1, cache.hits)
+
+    def test_fix_overlapping_edits_with_cache(self):
+        # правка trim_whitespace пересекается с правкой allow_trailing_whitespace, вторая применяется следующим запуском
+        profile = StyleProfile({'trim_whitespace': True, 'allow_trailing_whitespace': True})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'a.cs')
+            with open(path, 'w') as f:
+                f.write('int a;   \n')
+            cache = ResultCache(os.path.join(directory, 'cache'))
+            for expected_fixed, expected_code in ((1, 'int a; \n'), (1, 'int a;\n'), (0, 'int a;\n'), (0, 'int a;\n')):
+                fixed, result = next(Runner(profile, 1, fix=True, cache=cache).check_files([path]))[1]
+                with open(path) as f:
+                    self.assertEqual((expected_fixed, expected_code), (fixed, f.read()))
+            self.assertEqual(1, cache.hits)
+
+    def test_available_cpus(self):
+        self.assertGreaterEqual(Runner.available_cpus(), 1)
+        self.assertGreaterEqual(Runner('default.style').jobs, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import os
 import sys
 import unittest
@@ -23,6 +24,20 @@ class TestSettings(unittest.TestCase):
         result = self.settings.max_line_length(20, self.parser.get_lines(lines))
         self.assertEqual(["Line 1: the number of characters in the line has been exceeded (55 > 20)"], result)
 
+    def test_max_line_length_multiline_literal(self):
+        # многострочная строка и комментарий - один токен, но каждая строка кода измеряется отдельно
+        code = ('class A\n{\n    string s = @"first\nsecond row ' + 'x' * 130 + '";\n    /* a\n' + 'y' * 150 +
+                ' */\n    string t = @"a\n' + 'z' * 125 + '\nb";\n}')
+        expected = ['Line 4: the number of characters in the line has been exceeded (143 > 120)',
+                    'Line 6: the number of characters in the line has been exceeded (153 > 120)',
+                    'Line 8: the number of characters in the line has been exceeded (125 > 120)']
+        self.assertEqual(expected, self.settings.max_line_length(120, self.parser.get_lines(code)))
+        self.assertEqual(expected, [message for name, message in self.settings.iter_local_rules(
+            {'max_line_length': 120}, self.parser.iter_lines(io.StringIO(code)), 2)])
+        diagnostics = self.settings.compile_rules({'max_line_length': 120}).run(self.parser.get_lines(code),
+                                                                              diagnostics=True)['max_line_length']
+        self.assertEqual([(8, 121)], [(message.row, message.column) for message in diagnostics][2:])
+
     def test_indent_style_and_size(self):
         lines = "\t\tif (true) { return; }"
         result = self.settings.indent_style_and_size('spaces', 4, self.parser.get_lines(lines))
@@ -164,6 +179,52 @@ class TestSettings(unittest.TestCase):
         self.assertEqual(result, ['--- always_use_braces ---', "Line 26: expected '{'", "Line 33: expected '{'",
                                   "Line 40: expected '{'", '', 'Total errors: 3'])
 
+    def test_local_rules_by_windows(self):
+        code = 'int a,b;  \nf(x :y ,z);\n/* a,b\n  c:d */ s = "e,f\ng:h";\nx  = 1;\n' * 5
+        properties = {'max_line_length': 10, 'trim_whitespace': True, 'space_after_comma': True,
+                      'space_before_comma': True, 'space_after_colon': True, 'allow_trailing_whitespace': True,
+                      'camel_case': True}
+        lines = self.parser.get_lines(code)
+        expected = [(name, message) for name in Settings.LOCAL_RULES if name in properties
+                    for message in getattr(self.settings, name)(properties[name], lines)]
+        self.assertEqual(45, len(expected))
+        for window_size in (1, 3, 100):
+            result = list(self.settings.iter_local_rules(properties, self.parser.iter_lines(io.StringIO(code), 8),
+                                                         window_size))
+            result.sort(key=lambda item: Settings.LOCAL_RULES.index(item[0]))
+            self.assertEqual(expected, result)
+
+    def test_check_rules(self):
+        code = 'int a,b;  \nf(x :y ,z);\n\t\tif (a) { return; }\nx  = 1\ny = 2;\n'
+        properties = {'max_line_length': 10, 'space_after_comma': True, 'space_before_colon': False,
+                      'indent_style_and_size': ['spaces', 4], 'require_semicolons': True, 'camel_case': True}
+        lines = self.parser.get_lines(code)
+        result = self.settings.check_rules(properties, lines)
+        self.assertEqual(list(properties), list(result))
+        # правила проверяются за один проход, но результат такой же, как при проверке каждого правила отдельно
+        for name, value in properties.items():
+            self.assertEqual(self.settings.check_rules({name: value}, lines)[name], result[name])
+        self.assertEqual(["Line 1: expected space after ','", "Line 2: expected space after ','"],
+                         result['space_after_comma'])
+        self.assertEqual(['Line 4: expected ;'], result['require_semicolons'])
+        # правила без обхода токенов вызываются как обычные методы Settings
+        self.assertEqual(self.settings.indent_style_and_size('spaces', 4, lines), result['indent_style_and_size'])
+
+    def test_check_rules_in_rows(self):
+        code = 'int a,b;\nint c,d;\n\nreturn e,f;\nx  = g,h\n'
+        properties = {'space_after_comma': True, 'newline_before_return': 2, 'require_semicolons': True,
+                      'indent_style_and_size': ['spaces', 4]}
+        engine = self.settings.compile_rules(properties)
+        full = engine.run(self.parser.get_lines(code))
+        # проверяются только строки 2 и 4, результат - как у полной проверки без замечаний о других строках
+        result = engine.run(self.parser.get_lines(code), rows={2, 4})
+        self.assertEqual({name: [message for message in messages if message.startswith(('Line 2:', 'Line 4:'))]
+                          for name, messages in full.items()}, result)
+        self.assertEqual(["Line 2: expected space after ','", "Line 4: expected space after ','"],
+                         result['space_after_comma'])
+        self.assertEqual(['Line 4: there must be 2 empty line before the return (was: 1)'],
+                         result['newline_before_return'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.tokenizer import Tokenizer
+from linter.settings import Settings
+from linter.statement_index import StatementIndex
+
+
+class MyTestCase(unittest.TestCase):
+    parser = Tokenizer()
+    CODE = ('void F()\n'
+            '{\n'
+            '    if (a &&\n'
+            '        b) {\n'
+            '        for (;;) /* c */\n'
+            '\n'
+            '            f();\n'
+            '    } else if (c) { g(); }\n'
+            '    while (d\n'
+            '}')
+
+    def test_statements(self):
+        lines = self.parser.get_lines(self.CODE)
+        index = StatementIndex.of(lines)
+        self.assertIs(index, StatementIndex.of(lines))
+        # у while нет пары для '(' - такая конструкция не попадает в индекс
+        self.assertEqual({2: (3, 3, True), 4: (4, 6, False), 7: (7, 7, True)}, index.statements)
+        self.assertEqual([0, 1, 0, 1, 0, 0, 0, -1, 0, -1], list(index.braces))
+
+    def test_plain_lines(self):
+        # строки не из Tokenizer.get_lines переводятся в поток
+        lines = [self.parser.get_tokens('if (a)\n'), self.parser.get_tokens('    b();')]
+        self.assertEqual({0: (0, 1, False)}, StatementIndex.of(lines).statements)
+
+    def test_indent_style_and_size(self):
+        lines = self.parser.get_lines(self.CODE)
+        # строка с ') {' многострочного условия проверяется как обычная строка
+        self.assertEqual(['Line 4: the number of indents (spaces) per line is different (Yours 8 > 4 in code style)'],
+                         Settings().indent_style_and_size('spaces', 4, lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
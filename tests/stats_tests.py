@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.tokenizer import Tokenizer
+from linter.stylecheck import Stylecheck
+from linter.style_profile import StyleProfile
+from linter.runner import Runner
+from linter.result_cache import ResultCache
+from linter.stats import Stats
+
+
+class MyTestCase(unittest.TestCase):
+    FILES = [os.path.join('project_index_test_code', 'Program.cs'),
+             os.path.join('project_index_test_code', 'Utils', 'Helper.cs'), 'example.cs']
+
+    def test_take_and_merge(self):
+        stats = Stats()
+        with stats.phase('tokenize'):
+            pass
+        with Stats.measure(None, 'rules'):
+            pass
+        stats.rules['max_line_length'] = 0.5
+        stats.count(10, Tokenizer().get_lines('int a = 1;\nint b = 2;\n'))
+        data = stats.take()
+        # после take счётчики обнуляются
+        self.assertEqual({}, stats.phases)
+        self.assertEqual(0, stats.checked)
+        self.assertEqual(['tokenize'], list(data['phases']))
+        self.assertEqual((1, 10, 2), (data['checked'], data['bytes'], data['lines']))
+        stats.merge(data)
+        stats.merge(data)
+        self.assertEqual((2, 20, 4), (stats.checked, stats.bytes, stats.lines))
+        self.assertEqual(1.0, stats.rules['max_line_length'])
+        self.assertEqual(2 * data['tokens'], stats.tokens)
+
+    def test_report(self):
+        stats = Stats()
+        stats.phases = {'rules': 0.2, 'read': 0.1}
+        stats.rules = {'camel_case': 0.05, 'max_line_length': 0.15}
+        summary = json.loads(stats.report('json'))
+        # этапы - в порядке проверки, настройки - самые медленные первыми
+        self.assertEqual(['read', 'rules'], list(summary['phases']))
+        self.assertEqual(['max_line_length', 'camel_case'], list(summary['rules']))
+        self.assertTrue(summary['peak_memory'])
+        text = stats.report()
+        self.assertTrue(text.startswith('--- STATS ---'))
+        self.assertIn('max_line_length', text)
+        self.assertIn('Peak memory', text)
+        self.assertIn('%', text)
+        # время процессов-исполнителей сложено - доля от общего времени не выводится
+        stats.workers = 3
+        text = stats.report()
+        self.assertIn('Phases (CPU seconds summed over 3 worker processes):', text)
+        self.assertNotIn('%', text)
+        self.assertEqual(3, json.loads(stats.report('json'))['workers'])
+
+    def test_rule_timings(self):
+        # с замером времени каждой настройки результат тот же
+        profile = StyleProfile.of('default.style')
+        with open('example.cs', encoding='utf-8') as f:
+            lines = Tokenizer().get_lines(f.read())
+        timings = {}
+        self.assertEqual(Stylecheck().check(lines, profile), Stylecheck().check(lines, profile, stats=Stats()))
+        edits = []
+        self.assertEqual(profile.check(lines), profile.check(lines, edits, timings=timings))
+        self.assertEqual(set(profile.properties), set(timings))
+
+    def test_runner(self):
+        expected = list(Runner('default.style', 1).check_files(self.FILES * 2))
+        for jobs in (1, 2):
+            stats = Stats()
+            runner = Runner('default.style', jobs, stats=stats)
+            runner.PARALLEL_THRESHOLD = 1
+            self.assertEqual(expected, list(runner.check_files(self.FILES * 2)))
+            # замеры процессов-исполнителей складываются, одинаковые файлы проверяются один раз
+            self.assertEqual((6, 3, 0), (stats.files, stats.checked, stats.cached))
+            self.assertGreater(stats.tokens, 0)
+            # чтение для ключа кэша в основном процессе - отдельный этап
+            self.assertEqual({'hash', 'read', 'tokenize', 'rules', 'checking_for_errors', 'code_analyzer'},
+                             set(stats.phases))
+            self.assertEqual(jobs, stats.workers)
+
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ResultCache(directory)
+            list(Runner('default.style', 1, cache=cache).check_files(self.FILES))
+            stats = Stats()
+            self.assertEqual(expected, list(Runner('default.style', 1, cache=cache, stats=stats)
+                                            .check_files(self.FILES * 2)))
+            self.assertEqual((6, 0, 3), (stats.files, stats.checked, stats.cached))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_profiles(self):
+        directory = tempfile.mkdtemp()
+        try:
+            stats = Stats(directory)
+            list(Runner('default.style', 1, stats=stats).check_files(self.FILES))
+            stats.dump_profiles()
+            self.assertIn('rules.prof', os.listdir(directory))
+            self.assertIn(os.path.join(directory, 'rules.prof'), stats.summary()['profiles'])
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.tokenizer import Tokenizer
+from linter.settings import Settings
+from linter.stylecheck import Stylecheck
+from linter.style_profile import StyleProfile, StyleError
+
+
+class MyTestCase(unittest.TestCase):
+    parser = Tokenizer()
+
+    def test_unknown_settings(self):
+        with self.assertRaises(StyleError) as context:
+            StyleProfile({'max_line_length': 100, 'max_line_lenght': 100, 'check_rules': True, '_get_indent': 1})
+        self.assertEqual(['style: unknown setting "max_line_lenght"', 'style: unknown setting "check_rules"',
+                          'style: unknown setting "_get_indent"'], str(context.exception).split('\n'))
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(StyleError) as context:
+            StyleProfile({'indent_style_and_size': 'spaces', 'camel_case': [True, False]})
+        self.assertEqual(['style: wrong number of arguments for "indent_style_and_size": 1',
+                          'style: wrong number of arguments for "camel_case": 2'],
+                         str(context.exception).split('\n'))
+        with self.assertRaises(StyleError):
+            StyleProfile([1, 2])
+
+    def test_load(self):
+        profile = StyleProfile.load('default.style')
+        self.assertEqual('default.style', profile.source)
+        self.assertIs(profile, StyleProfile.of(profile))
+        self.assertEqual(['max_line_length', 'space_after_comma', 'space_before_comma', 'space_after_colon',
+                          'space_before_colon', 'allow_trailing_whitespace', 'trim_whitespace'],
+                         list(profile.local()))
+
+    def test_reuse(self):
+        profile = StyleProfile.load('default.style')
+        stylecheck = Stylecheck()
+        codes = ['int a,b;\nx  = 1\n', '\t\tif (a) b();\n', 'class A { void F() { return; } }\n']
+        for code in codes * 2:
+            lines = self.parser.get_lines(code)
+            self.assertEqual(stylecheck._check_style(lines, 'default.style'), stylecheck._check_style(lines, profile))
+            self.assertEqual(Settings().check_rules(profile.properties, lines), profile.check(lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
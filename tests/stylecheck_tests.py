@@ -23,6 +23,18 @@ class MyTestCase(unittest.TestCase):
         result = stylecheck.check(lines, 'default.style')
         self.assertEqual(expected, result)
 
+    def test_changed_rows(self):
+        with open('example.cs', encoding='utf-8') as file:
+            code = file.read()
+        result = Stylecheck().check(Tokenizer().get_lines(code), 'default.style', rows={20, 26, 27})
+        # только замечания об этих строках; раздел без замечаний не выводится, сложность выводится всегда
+        self.assertEqual(['--- always_use_braces ---', "Line 26: expected '{'", '', 'Total errors: 1'], result[3:7])
+        self.assertEqual(['--- UNUSED VARIABLES ---', "Line 20: local variable 'args' value is not used",
+                          "Line 20: method 'Main' is not used", '--- CYCLOMATIC COMPLEXITY ---'], result[10:14])
+        self.assertEqual(Stylecheck().check(Tokenizer().get_lines(code), 'default.style')[-3:], result[-3:])
+        self.assertEqual(['--- CYCLOMATIC COMPLEXITY ---'],
+                         Stylecheck().check(Tokenizer().get_lines(code), 'default.style', rows={1})[8:9])
+
 
 if __name__ == '__main__':
     unittest.main()
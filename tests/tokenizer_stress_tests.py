@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from linter.tokenizer import Tokenizer, TokenType
+
+
+class MyTestCase(unittest.TestCase):
+    """Разбор плохих входных данных: время должно расти линейно от размера кода"""
+    parser = Tokenizer()
+    SIZE = 20000
+    # с запасом: на обычной машине любой из случаев разбирается за десятки миллисекунд
+    TIME_LIMIT = 2.0
+
+    CASES = {
+        'escaped_quotes': lambda n: '"' + '\\"' * n,
+        'backslashes': lambda n: '"' + '\\' * (2 * n + 1) + '"' + '"a" ' * n,
+        'unterminated_strings': lambda n: '"a\n' * n,
+        'unterminated_chars': lambda n: "'a " * n,
+        'stray_comment': lambda n: '/*' + ' a = "b"; /' * n,
+        'comment_starts': lambda n: '/*' * n,
+        'verbatim_quotes': lambda n: '@"' + '""' * n,
+        'verbatim_unterminated': lambda n: '@"a\\" ' * n,
+        'interpolated_holes': lambda n: '$"{' * n,
+        'interpolated_strings': lambda n: '$"{"a"}' * n,
+        'huge_string': lambda n: '"' + 'a' * (50 * n) + '"',
+        'huge_comment': lambda n: '/*' + 'a\n' * (25 * n) + '*/',
+        'unterminated_at_top': lambda n: '"\n' + 'int a = 5;\n' * n,
+    }
+
+    def _time(self, code):
+        begin = time.perf_counter()
+        self.parser.get_stream(code)
+        return time.perf_counter() - begin
+
+    def test_time_limit(self):
+        for name, make_code in self.CASES.items():
+            with self.subTest(name):
+                self.assertLess(self._time(make_code(self.SIZE)), self.TIME_LIMIT)
+
+    def test_linear_time(self):
+        for name, make_code in self.CASES.items():
+            with self.subTest(name):
+                small = min(self._time(make_code(self.SIZE // 4)) for _ in range(3))
+                big = min(self._time(make_code(self.SIZE)) for _ in range(3))
+                # при квадратичном разборе отношение было бы около 16
+                self.assertLess(big, 8 * small + 0.05)
+
+    def test_verbatim_string(self):
+        tokens = self.parser.get_tokens('@"a""b" @"C:\\" x')
+        self.assertEqual(['@"a""b"', ' ', '@"C:\\"', ' ', 'x'], [token.value for token in tokens])
+        self.assertEqual(TokenType.StringConstant, tokens[2].token_type)
+
+    def test_interpolated_string(self):
+        tokens = self.parser.get_tokens('$"{d["k"]} {{x}}" + 1')
+        self.assertEqual('$"{d["k"]} {{x}}"', tokens[0].value)
+        self.assertEqual(TokenType.StringConstant, tokens[0].token_type)
+
+    def test_unterminated_literals(self):
+        stream = self.parser.get_stream('a = "b\nc = \'d\ne = /*f g')
+        self.assertEqual(['"b', "'d", '/*f'], [stream.value(i) for i in stream.unterminated])
+
+
+if __name__ == '__main__':
+    unittest.main()
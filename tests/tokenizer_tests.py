@@ -1,10 +1,11 @@
+import io
 import os
 import sys
 import unittest
 
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
 
-from linter.tokenizer import Tokenizer, TokenType
+from linter.tokenizer import Tokenizer, TokenType, TokenStream
 
 
 class MyTestCase(unittest.TestCase):
@@ -84,9 +85,11 @@ class MyTestCase(unittest.TestCase):
     def test_dont_delete_newline_character_in_string(self):
         with open("tokenizer_test_code/test_dont_delete_newline_character_in_string.txt") as f:
             string = f.read()
-        result = self.parser.get_tokens(string)
-        self.assertEqual(2, len(result))
-        self.assertEqual('\n', result[0].value[12])
+        stream = self.parser.get_stream(string)
+        self.assertEqual(1, len(stream))
+        self.assertEqual('\n', stream[0].value[12])
+        self.assertEqual(((1, 1), (2, 23)), stream.span(0))
+        self.assertEqual((2, 5), stream.position(17))
 
     def test_without_closing_quotation_mark(self):
         string = "'very big string without closing quotation mark"
@@ -188,6 +191,51 @@ class MyTestCase(unittest.TestCase):
             self.assertEqual(TokenType.NumberConstant, result[i].token_type)
             self.assertEqual(expected[i // 2 - 1], result[i].value)
 
+    def test_integer_literal_before_real_number(self):
+        code = """5UL.5 1,5 var_1"""
+        result = self._filter_space_tokens(self.parser.get_tokens(code))
+        self.assertEqual(['5UL', '.5', '1,5', 'var_1'], [token.value for token in result])
+        self.assertEqual([TokenType.NumberConstant] * 3 + [TokenType.Identifier],
+                         [token.token_type for token in result])
+
+    def test_token_stream_lines(self):
+        code = 'int a = 5;\n    a++;'
+        lines = self.parser.get_lines(code)
+        self.assertEqual(2, len(lines))
+        self.assertEqual(['int', ' ', 'a', ' ', '=', ' ', '5', ';', '\n'], [token.value for token in lines[0]])
+        self.assertEqual([(2, 1), (2, 5)], [(token.row, token.column) for token in lines[1][:2]])
+        stream = lines.stream
+        self.assertTrue(stream.is_same_line(0, 8))
+        self.assertFalse(stream.is_same_line(8, 9))
+        self.assertTrue(stream.is_line_start(9))
+
+        copy = TokenStream.from_lines([list(line) for line in lines])
+        self.assertEqual([[str(token) for token in line] for line in lines],
+                         [[str(token) for token in line] for line in copy.lines])
+
+    def test_iter_lines_same_as_get_lines(self):
+        with open('tokenizer_test_code/test_large_csharp_code.txt') as f:
+            code = f.read()
+        code += 'a = "not closed\nb = @"multi\nline"; /* comment\n */ c = "not closed'
+        expected = [[str(token) for token in line] for line in self.parser.get_lines(code)]
+        for chunk_size in (1, 5, 64, 1 << 16):
+            result = self.parser.iter_lines(io.StringIO(code), chunk_size)
+            self.assertEqual(expected, [[str(token) for token in line] for line in result])
+
+    def test_update_stream_same_as_get_stream(self):
+        def arrays(stream):
+            return (stream.code, stream.starts, stream.ends, stream.rows, stream.columns, stream.types,
+                    stream.line_offsets, stream.unterminated)
+
+        with open('tokenizer_test_code/test_large_csharp_code.txt') as f:
+            code = f.read()
+        stream = self.parser.get_stream(code + '\ns = "not closed\n')
+        edits = [(10, 10, 'x'), (100, 105, ''), (0, 0, '\n\n'), (200, 201, '"'), (200, 201, ''),
+                 (len(code) + 20, len(code) + 20, '"'), (50, 50, '/*'), (50, 52, ''), (300, 300, '@"a\nb"')]
+        for begin, end, text in edits:
+            stream = self.parser.update_stream(stream, begin, end, text)
+            self.assertEqual(arrays(self.parser.get_stream(stream.code)), arrays(stream))
+
     def test_check_negative_numbers(self):
         code = """var n = -.42f;"""
         result = self._filter_space_tokens(self.parser.get_tokens(code))